@@ -0,0 +1,290 @@
+"""Daily fact tables for hospital analytics.
+
+Revenue, visit and alert facts hold one row per day and dimension combination. Document
+events add or subtract their contribution with a single upsert, a nightly job rebuilds the
+recent days from the source tables to repair any drift, and ``get_analytics`` answers
+date-range/group-by questions from the facts alone.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, flt, get_datetime, getdate, now_datetime, nowdate
+
+# Alert Logs can be archived after 7 days (the smallest retention Healthx Settings allows),
+# so reconciliation never reaches further back than that.
+RECONCILE_DAYS = 7
+MAX_ANALYTICS_DAYS = 3660
+PERIODS = {
+    "day": "`date`",
+    "week": "DATE_SUB(`date`, INTERVAL WEEKDAY(`date`) DAY)",
+    "month": "DATE_FORMAT(`date`, '%%Y-%%m-01')",
+}
+# Source queries group by the COALESCE expressions, not their aliases: MariaDB resolves a GROUP BY
+# name against table columns first, which would split NULL and '' into two rows with one fact name.
+FACTS = {
+    "revenue": {
+        "doctype": "Revenue Daily Fact",
+        "dimensions": ("payment_mode", "currency"),
+        "measures": ("invoice_count", "invoiced_amount", "paid_count", "paid_amount"),
+        "first_date": "SELECT MIN(`date`) FROM `tabInvoice` WHERE docstatus = 1",
+        "source": """
+            SELECT `date` AS fact_date, COALESCE(payment_mode, '') AS payment_mode,
+                COALESCE(currency, '') AS currency,
+                COUNT(*) AS invoice_count,
+                SUM(amount_after_discount) AS invoiced_amount,
+                SUM(payment_status = 'Paid') AS paid_count,
+                SUM(IF(payment_status = 'Paid', amount_after_discount, 0)) AS paid_amount
+            FROM `tabInvoice`
+            WHERE docstatus = 1 AND `date` BETWEEN %(from_date)s AND %(to_date)s
+            GROUP BY `date`, COALESCE(payment_mode, ''), COALESCE(currency, '')
+        """,
+    },
+    "visits": {
+        "doctype": "Visit Daily Fact",
+        "dimensions": ("doctor",),
+        "measures": ("visit_count", "completed_count"),
+        "first_date": "SELECT MIN(creation) FROM `tabClinic Visit`",
+        "source": """
+            SELECT DATE(creation) AS fact_date, COALESCE(doctor, '') AS doctor,
+                COUNT(*) AS visit_count,
+                SUM(consultation_status = 'Completed') AS completed_count
+            FROM `tabClinic Visit`
+            WHERE creation >= %(from_date)s AND creation < %(to_date_exclusive)s
+            GROUP BY DATE(creation), COALESCE(doctor, '')
+        """,
+    },
+    "alerts": {
+        "doctype": "Alert Daily Fact",
+        "dimensions": ("alert_type",),
+        "measures": ("raised_count", "resolved_count", "resolution_minutes"),
+        "first_date": "SELECT MIN(COALESCE(timestamp_deails, creation)) FROM `tabAlert Log`",
+        "source": """
+            SELECT DATE(COALESCE(timestamp_deails, creation)) AS fact_date,
+                COALESCE(alert_type, '') AS alert_type,
+                COUNT(*) AS raised_count,
+                SUM(status = 'Resolved') AS resolved_count,
+                SUM(IF(status = 'Resolved' AND resolved_on IS NOT NULL,
+                    TIMESTAMPDIFF(SECOND, COALESCE(timestamp_deails, creation), resolved_on) / 60, 0))
+                    AS resolution_minutes
+            FROM `tabAlert Log`
+            WHERE COALESCE(timestamp_deails, creation) >= %(from_date)s
+                AND COALESCE(timestamp_deails, creation) < %(to_date_exclusive)s
+            GROUP BY DATE(COALESCE(timestamp_deails, creation)), COALESCE(alert_type, '')
+        """,
+    },
+}
+
+
+def _fact_name(fact_date, dimension_values):
+    return "|".join([str(getdate(fact_date)), *(str(value or "") for value in dimension_values)])
+
+
+def add_to_facts(fact, rows):
+    """Add measure deltas to fact rows with one multi-row upsert.
+
+    ``rows`` is a list of ``(date, {dimension: value}, {measure: delta})``; rows that do not
+    exist yet are created with the delta as their value.
+    """
+    config = FACTS[fact]
+    rows = [row for row in rows if any(row[2].values())]
+    if not rows:
+        return
+
+    dimensions, measures = config["dimensions"], config["measures"]
+    columns = ("name", "creation", "modified", "owner", "modified_by", "docstatus", "idx", "date", *dimensions, *measures)
+    now, user = now_datetime(), frappe.session.user
+    values = []
+    for fact_date, dimension_values, deltas in rows:
+        dimension_row = [dimension_values.get(dimension) or "" for dimension in dimensions]
+        values.append(
+            (
+                _fact_name(fact_date, dimension_row),
+                now,
+                now,
+                user,
+                user,
+                0,
+                0,
+                getdate(fact_date),
+                *dimension_row,
+                *(deltas.get(measure, 0) for measure in measures),
+            )
+        )
+
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * len(columns)) + ")"] * len(values))
+    updates = ", ".join(f"`{measure}` = `{measure}` + VALUES(`{measure}`)" for measure in measures)
+    frappe.db.sql(
+        f"""
+        INSERT INTO `tab{config["doctype"]}` ({", ".join(f"`{column}`" for column in columns)})
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE {updates}, `modified` = VALUES(`modified`)
+        """,
+        [value for row in values for value in row],
+    )
+
+
+def apply_contribution_change(fact, before, after):
+    """Move a document's contribution from ``before`` to ``after`` (either may be None).
+
+    A contribution is ``(date, {dimension: value}, {measure: value})`` as returned by the
+    ``*_contribution`` helpers below.
+    """
+    rows = []
+    if before:
+        rows.append((before[0], before[1], {measure: -value for measure, value in before[2].items()}))
+    if after:
+        rows.append(after)
+    if before and after and _fact_name(before[0], before[1].values()) == _fact_name(after[0], after[1].values()):
+        # Same fact row: net the two into a single delta.
+        rows = [(after[0], after[1], {measure: after[2][measure] - before[2][measure] for measure in after[2]})]
+    add_to_facts(fact, rows)
+
+
+def invoice_contribution(invoice):
+    paid = invoice.payment_status == "Paid"
+    amount = flt(invoice.amount_after_discount)
+    return (
+        invoice.date,
+        {"payment_mode": invoice.payment_mode, "currency": invoice.currency},
+        {"invoice_count": 1, "invoiced_amount": amount, "paid_count": int(paid), "paid_amount": amount if paid else 0},
+    )
+
+
+def visit_contribution(visit):
+    return (
+        getdate(visit.creation),
+        {"doctor": visit.doctor},
+        {"visit_count": 1, "completed_count": int(visit.consultation_status == "Completed")},
+    )
+
+
+def alert_contribution(alert):
+    raised_at = get_datetime(alert.timestamp_deails or alert.creation)
+    resolved = alert.status == "Resolved"
+    minutes = 0
+    if resolved and alert.resolved_on:
+        minutes = (get_datetime(alert.resolved_on) - raised_at).total_seconds() / 60
+    return (
+        raised_at.date(),
+        {"alert_type": alert.alert_type},
+        {"raised_count": 1, "resolved_count": int(resolved), "resolution_minutes": minutes},
+    )
+
+
+def rebuild_facts(fact, from_date, to_date):
+    """Replace the fact rows for ``from_date``..``to_date`` with a fresh aggregate of the source."""
+    config = FACTS[fact]
+    from_date, to_date = getdate(from_date), getdate(to_date)
+    dimensions, measures = config["dimensions"], config["measures"]
+    table = f"tab{config['doctype']}"
+    name_expression = "CONCAT_WS('|', fact_date, " + ", ".join(f"source.`{dimension}`" for dimension in dimensions) + ")"
+
+    frappe.db.sql(f"DELETE FROM `{table}` WHERE `date` BETWEEN %s AND %s", (from_date, to_date))
+    frappe.db.sql(
+        f"""
+        INSERT INTO `{table}`
+            (name, creation, modified, owner, modified_by, docstatus, idx, `date`,
+            {", ".join(f"`{column}`" for column in (*dimensions, *measures))})
+        SELECT {name_expression}, %(now)s, %(now)s, %(user)s, %(user)s, 0, 0, fact_date,
+            {", ".join(f"source.`{column}`" for column in (*dimensions, *measures))}
+        FROM ({config["source"]}) source
+        """,
+        {
+            "from_date": from_date,
+            "to_date": to_date,
+            "to_date_exclusive": add_days(to_date, 1),
+            "now": now_datetime(),
+            "user": frappe.session.user,
+        },
+    )
+
+
+def reconcile_facts(days=RECONCILE_DAYS):
+    """Nightly job: rebuild the last ``days`` days of every fact from the source tables."""
+    to_date = getdate(nowdate())
+    from_date = add_days(to_date, -int(days))
+    for fact in FACTS:
+        try:
+            rebuild_facts(fact, from_date, to_date)
+            frappe.db.commit()
+        except Exception:
+            frappe.db.rollback()
+            frappe.log_error(title=f"healthx.analytics.reconcile_{fact}")
+
+
+def rebuild_all_facts():
+    """Backfill every fact from its oldest source row, one month per transaction.
+
+    Meant for the initial backfill: days whose Alert Logs were archived since would lose
+    their alert facts if rebuilt.
+    """
+    to_date = getdate(nowdate())
+    for fact, config in FACTS.items():
+        first_date = frappe.db.sql(config["first_date"])[0][0]
+        if not first_date:
+            continue
+        from_date = getdate(first_date)
+        while from_date <= to_date:
+            month_end = min(getdate(add_days(from_date, 30)), to_date)
+            rebuild_facts(fact, from_date, month_end)
+            frappe.db.commit()
+            from_date = getdate(add_days(month_end, 1))
+
+
+def _parse_group_by(group_by, dimensions):
+    if not group_by:
+        return []
+    fields = frappe.parse_json(group_by) if str(group_by).startswith("[") else str(group_by).split(",")
+    fields = [field.strip() for field in fields if field and field.strip()]
+    invalid = [field for field in fields if field not in dimensions]
+    if invalid:
+        frappe.throw(_("Cannot group by {0}. Allowed: {1}").format(", ".join(invalid), ", ".join(dimensions)))
+    return fields
+
+
+@frappe.whitelist()
+def get_analytics(fact, from_date=None, to_date=None, group_by=None, period="day"):
+    """Summed fact measures for a date range, optionally per period and per dimension.
+
+    ``fact`` is one of revenue, visits or alerts; ``period`` is day, week, month or none;
+    ``group_by`` lists the fact's dimensions (e.g. ``payment_mode``, ``doctor``).
+    """
+    if fact not in FACTS:
+        frappe.throw(_("Unknown analytics fact {0}.").format(fact))
+    config = FACTS[fact]
+    frappe.has_permission(config["doctype"], "read", throw=True)
+
+    to_date = getdate(to_date or nowdate())
+    from_date = getdate(from_date or add_days(to_date, -29))
+    if from_date > to_date:
+        frappe.throw(_("From Date must not be after To Date."))
+    if (to_date - from_date).days > MAX_ANALYTICS_DAYS:
+        frappe.throw(_("Analytics can cover at most {0} days.").format(MAX_ANALYTICS_DAYS))
+
+    group_fields = _parse_group_by(group_by, config["dimensions"])
+    select, group = [], []
+    if period and period != "none":
+        if period not in PERIODS:
+            frappe.throw(_("Period must be one of day, week, month or none."))
+        select.append(f"{PERIODS[period]} AS period")
+        group.append("period")
+    select += [f"`{field}`" for field in group_fields]
+    group += [f"`{field}`" for field in group_fields]
+    select += [f"SUM(`{measure}`) AS `{measure}`" for measure in config["measures"]]
+
+    rows = frappe.db.sql(
+        f"""
+        SELECT {", ".join(select)}
+        FROM `tab{config["doctype"]}`
+        WHERE `date` BETWEEN %(from_date)s AND %(to_date)s
+        {f"GROUP BY {', '.join(group)} ORDER BY {', '.join(group)}" if group else ""}
+        """,
+        {"from_date": from_date, "to_date": to_date},
+        as_dict=True,
+    )
+    if fact == "alerts":
+        for row in rows:
+            row.avg_resolution_minutes = (
+                round(flt(row.resolution_minutes) / row.resolved_count, 1) if row.resolved_count else None
+            )
+    return {"fact": fact, "from_date": from_date, "to_date": to_date, "rows": rows}
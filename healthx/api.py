@@ -1,13 +1,39 @@
+import base64
+import binascii
+import hashlib
 import json
 import re
-from typing import Any, Iterable, List, Tuple
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, List, NamedTuple, Tuple
 
 import frappe
 from frappe import _
 from frappe.utils import get_fullname
 
+from healthx.error_log import record_error
+
 DOCNAME_PATTERN = re.compile(r"^[A-Za-z0-9 _-]+$")
 FIELD_PATTERN = re.compile(r"^[A-Za-z0-9_]+$")
+AGGREGATE_METRICS = {"count": "COUNT", "sum": "SUM", "avg": "AVG"}
+MAX_AGGREGATE_SPECS = 50
+MAX_AGGREGATE_GROUPS = 1000
+SCHEMA_CACHE_KEY = "healthx:doctype_schema"
+SCHEMA_VERSION_KEY = "healthx:doctype_schema_version"
+MAX_SCHEMA_CACHE_ENTRIES = 512
+MAX_QUERY_PLANS = 256
+# Master DocTypes that can have list results cached: the ones hooks.py invalidates on change.
+RESULT_CACHE_DOCTYPES = (
+    "Doctor",
+    "Speciality",
+    "Drug",
+    "Device Type",
+    "Home Service",
+    "Pharmacy",
+    "Treatement Package",
+)
+RESULT_VERSION_KEY = "healthx:result_version"
+RESULT_CACHE_KEY = "healthx:result"
+RESULT_CACHE_TTL = 6 * 60 * 60
 ALLOWED_OPERATORS = {
     "=": "=",
     "!=": "!=",
@@ -19,6 +45,10 @@ ALLOWED_OPERATORS = {
     "in": "IN",
 }
 
+_schema_cache: dict = {}
+_query_plan_cache: "OrderedDict[tuple, QueryPlan]" = OrderedDict()
+_query_plan_stats = {"hits": 0, "misses": 0}
+
 
 @frappe.whitelist(allow_guest=True)
 def web_login(usr: str, pwd: str):
@@ -123,31 +153,30 @@ def _build_filter_clause(field: str, operator: Any, value: Any) -> Tuple[str, Li
     return f"{column} {sql_operator} %s", [value]
 
 
-def _parse_filters(filters: Any) -> Tuple[str, List[Any]]:
+def _normalize_filters(filters: Any) -> List[Tuple[Any, Any, Any]]:
+    """Decode ``filters`` into ``(field, operator, value)`` entries without validating them."""
     if not filters:
-        return "", []
+        return []
 
     if isinstance(filters, str):
         stripped = filters.strip()
         if not stripped:
-            return "", []
+            return []
         try:
             parsed = json.loads(stripped)
         except (TypeError, ValueError, json.JSONDecodeError):
-            return "", []
+            return []
     else:
         parsed = filters
 
-    clauses: List[str] = []
-    values: List[Any] = []
-
     if isinstance(parsed, dict):
         items = parsed.items()
     elif isinstance(parsed, (list, tuple)):
         items = parsed
     else:
-        return "", []
+        return []
 
+    entries: List[Tuple[Any, Any, Any]] = []
     for entry in items:
         if isinstance(parsed, dict):
             field, raw_value = entry
@@ -162,7 +191,15 @@ def _parse_filters(filters: Any) -> Tuple[str, List[Any]]:
             if not isinstance(entry, (list, tuple)) or len(entry) < 3:
                 continue
             field, operator, value = entry[:3]
+        entries.append((field, operator, value))
 
+    return entries
+
+
+def _compile_filters(entries: List[Tuple[Any, Any, Any]]) -> Tuple[str, List[Any]]:
+    clauses: List[str] = []
+    values: List[Any] = []
+    for field, operator, value in entries:
         field = _validate_field(str(field))
         clause, clause_values = _build_filter_clause(field, operator, value)
         clauses.append(clause)
@@ -173,15 +210,19 @@ def _parse_filters(filters: Any) -> Tuple[str, List[Any]]:
     return "", values
 
 
-def _parse_order_by(order_by: Any) -> str:
+def _parse_filters(filters: Any) -> Tuple[str, List[Any]]:
+    return _compile_filters(_normalize_filters(filters))
+
+
+def _parse_order_fields(order_by: Any) -> List[Tuple[str, str]]:
     if not order_by:
-        return ""
+        return []
 
     parsed = order_by
     if isinstance(order_by, str):
         stripped = order_by.strip()
         if not stripped:
-            return ""
+            return []
         try:
             parsed = json.loads(stripped)
         except (TypeError, ValueError, json.JSONDecodeError):
@@ -192,9 +233,9 @@ def _parse_order_by(order_by: Any) -> str:
     elif isinstance(parsed, (list, tuple)):
         parts = parsed
     else:
-        return ""
+        return []
 
-    clauses: List[str] = []
+    order_fields: List[Tuple[str, str]] = []
     for part in parts:
         if isinstance(part, str):
             tokens = part.split()
@@ -209,53 +250,119 @@ def _parse_order_by(order_by: Any) -> str:
         field = _validate_field(str(field))
         if direction not in {"ASC", "DESC"}:
             continue
-        clauses.append(f"`{field}` {direction}")
+        order_fields.append((field, direction))
+
+    return order_fields
 
+
+def _parse_order_by(order_by: Any) -> str:
+    clauses = [f"`{field}` {direction}" for field, direction in _parse_order_fields(order_by)]
     if clauses:
         return " ORDER BY " + ", ".join(clauses)
     return ""
 
 
-def _parse_limit(limit: Any, start: Any) -> str:
+def _parse_limit_value(limit: Any) -> int:
     try:
         limit_value = int(limit or 20)
     except (TypeError, ValueError):
         limit_value = 20
-    limit_value = max(1, min(limit_value, 1000))
+    return max(1, min(limit_value, 1000))
 
+
+def _parse_start_value(start: Any) -> int:
     try:
         offset_value = int(start or 0)
     except (TypeError, ValueError):
         offset_value = 0
-    offset_value = max(0, offset_value)
+    return max(0, offset_value)
 
-    clause = f" LIMIT {limit_value}"
-    if offset_value:
-        clause += f" OFFSET {offset_value}"
-    return clause
 
+def _encode_cursor(sort_field: str, direction: str, sort_value: Any, name: str) -> str:
+    payload = json.dumps([sort_field, direction, sort_value, name], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
 
-@frappe.whitelist(allow_guest=True)
-def fetch_docs_sql(doctype: str, fields=None, filters=None, order_by=None, limit: Any = 20, start: Any = 0):
-    """Return DocType data via parameterized SQL (guest safe, ignores DocType perms)."""
-    if not doctype:
-        return []
 
-    if not frappe.db.exists("DocType", doctype):
-        frappe.log_error(
-            title="healthx.fetch_docs_sql.missing_doctype",
-            message=f"DocType {doctype} not found",
-        )
-        return []
+def _decode_cursor(cursor: str) -> Tuple[str, str, Any, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_field, direction, sort_value, name = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError, binascii.Error):
+        frappe.throw(_("Invalid cursor."))
+    return sort_field, direction, sort_value, name
 
-    table_name = f"tab{doctype}"
-    if not frappe.db.has_table(doctype):
-        frappe.log_error(
-            title="healthx.fetch_docs_sql.missing_table",
-            message=f"DocType {doctype} does not have physical table {table_name}",
-        )
-        return []
 
+def _get_schema_version() -> str:
+    version = getattr(frappe.local, "healthx_schema_version", None)
+    if version is None:
+        version = frappe.cache().get_value(SCHEMA_VERSION_KEY) or "0"
+        frappe.local.healthx_schema_version = version
+    return version
+
+
+def _load_doctype_schema(doctype: str) -> dict:
+    exists = bool(frappe.db.exists("DocType", doctype))
+    has_table = exists and bool(frappe.db.has_table(doctype))
+    columns = list(frappe.db.get_table_columns(doctype) or []) if has_table else []
+    return {"exists": exists, "has_table": has_table, "columns": columns}
+
+
+def _get_doctype_schema(doctype: str) -> dict:
+    """Return cached existence flags and columns for ``doctype``.
+
+    Entries live in a process-local dict tagged with the Redis schema version, backed by a
+    Redis hash shared by all workers, so a warm lookup costs no database round trips.
+    """
+    version = _get_schema_version()
+    cached = _schema_cache.get(doctype)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    schema = frappe.cache().hget(SCHEMA_CACHE_KEY, doctype)
+    if schema is None:
+        schema = _load_doctype_schema(doctype)
+        frappe.cache().hset(SCHEMA_CACHE_KEY, doctype, schema)
+
+    schema = dict(schema, columns=frozenset(schema["columns"]))
+    if len(_schema_cache) >= MAX_SCHEMA_CACHE_ENTRIES:
+        _schema_cache.clear()
+    _schema_cache[doctype] = (version, schema)
+    return schema
+
+
+def clear_schema_cache(doc=None, method=None):
+    """Invalidate cached DocType schemas in every worker (DocType/Custom Field hooks, after_migrate)."""
+    _schema_cache.clear()
+    _query_plan_cache.clear()
+    frappe.cache().delete_value(SCHEMA_CACHE_KEY)
+    frappe.cache().set_value(SCHEMA_VERSION_KEY, frappe.generate_hash(length=10))
+    frappe.local.healthx_schema_version = None
+
+
+def _get_table_columns(doctype: str, source: str):
+    """Return the physical column set for ``doctype`` or None when it cannot be queried."""
+    schema = _get_doctype_schema(doctype)
+    if not schema["exists"]:
+        record_error(f"healthx.{source}.missing_doctype", doctype)
+        return None
+
+    if not schema["has_table"]:
+        record_error(f"healthx.{source}.missing_table", doctype)
+        return None
+
+    return schema["columns"]
+
+
+class QueryPlan(NamedTuple):
+    sql: str
+    extract_values: Callable[[List[Tuple[Any, Any, Any]]], List[Any]]
+    sort_field: str
+    direction: str
+    extra_fields: Tuple[str, ...]
+    columns: Tuple[str, ...] = ()
+
+
+def _parse_fields(fields: Any) -> List[Any]:
     parsed_fields = fields
     if isinstance(fields, str):
         stripped = fields.strip()
@@ -271,29 +378,347 @@ def fetch_docs_sql(doctype: str, fields=None, filters=None, order_by=None, limit
         parsed_fields = ["name"]
     elif isinstance(parsed_fields, str):
         parsed_fields = [parsed_fields]
-
-    table_columns = set(frappe.db.get_table_columns(doctype) or [])
+    return list(parsed_fields)
+
+
+def _filter_shape(entries: List[Tuple[Any, Any, Any]]) -> Tuple:
+    shape = []
+    for field, operator, value in entries:
+        operator_key = operator.strip().lower() if isinstance(operator, str) else str(operator)
+        arity = len(value) if isinstance(value, (list, tuple)) else -1
+        shape.append((str(field), operator_key, arity))
+    return tuple(shape)
+
+
+def _make_value_extractor(expands: Tuple[bool, ...]):
+    def extract_values(entries: List[Tuple[Any, Any, Any]]) -> List[Any]:
+        values: List[Any] = []
+        for expand, (_field, _operator, value) in zip(expands, entries, strict=True):
+            if expand:
+                values.extend(value)
+            else:
+                values.append(value)
+        return values
+
+    return extract_values
+
+
+def _compile_query_plan(
+    doctype: str,
+    table_columns: frozenset,
+    parsed_fields: List[Any],
+    entries: List[Tuple[Any, Any, Any]],
+    order_by: Any,
+    mode: str,
+) -> QueryPlan:
     selected_fields: List[str] = []
     for field in parsed_fields:
         fieldname = str(field)
         if fieldname not in table_columns:
-            frappe.log_error(
-                title="healthx.fetch_docs_sql.invalid_column",
-                message=f"DocType: {doctype}, field: {fieldname}",
-            )
+            record_error("healthx.fetch_docs_sql.invalid_column", doctype, fieldname)
             continue
         selected_fields.append(f"`{_validate_field(fieldname)}`")
 
     if not selected_fields:
         selected_fields = ["`name`"]
-    select_clause = ", ".join(selected_fields)
+    columns = tuple(field.strip("`") for field in selected_fields)
+
+    where_clause, _values = _compile_filters(entries)
+    expands = tuple(
+        isinstance(operator, str) and operator.strip().lower() == "in" for _field, operator, _value in entries
+    )
+    extract_values = _make_value_extractor(expands)
+
+    if mode == "offset":
+        order_clause = _parse_order_by(order_by) or " ORDER BY `modified` DESC"
+        sql = (
+            f"SELECT {', '.join(selected_fields)} FROM `tab{doctype}`"
+            + where_clause
+            + order_clause
+            + " LIMIT %s OFFSET %s"
+        )
+        return QueryPlan(sql, extract_values, "", "", (), columns)
+
+    order_fields = _parse_order_fields(order_by)
+    sort_field, direction = order_fields[0] if order_fields else ("modified", "DESC")
+    if sort_field not in table_columns:
+        frappe.throw(_("Invalid field name: {0}").format(sort_field))
+
+    if mode == "export":
+        # The whole result in a stable order and no LIMIT: the caller streams it.
+        sql = (
+            f"SELECT {', '.join(selected_fields)} FROM `tab{doctype}`"
+            + where_clause
+            + f" ORDER BY `{sort_field}` {direction}, `name` {direction}"
+        )
+        return QueryPlan(sql, extract_values, sort_field, direction, (), columns)
+
+    # Seek key columns are always selected; strip them again if the caller did not ask for them.
+    extra_fields = tuple(field for field in (sort_field, "name") if f"`{field}`" not in selected_fields)
+    select_clause = ", ".join(selected_fields + [f"`{field}`" for field in extra_fields])
+
+    if mode == "seek":
+        comparison = "<" if direction == "DESC" else ">"
+        seek_clause = f"(`{sort_field}`, `name`) {comparison} (%s, %s)"
+        where_clause = f"{where_clause} AND {seek_clause}" if where_clause else f" WHERE {seek_clause}"
+
+    sql = (
+        f"SELECT {select_clause} FROM `tab{doctype}`"
+        + where_clause
+        + f" ORDER BY `{sort_field}` {direction}, `name` {direction}"
+        + " LIMIT %s"
+    )
+    return QueryPlan(sql, extract_values, sort_field, direction, extra_fields, columns)
+
+
+def _get_query_plan(
+    doctype: str,
+    table_columns: frozenset,
+    parsed_fields: List[Any],
+    entries: List[Tuple[Any, Any, Any]],
+    order_by: Any,
+    mode: str,
+) -> QueryPlan:
+    """Return the compiled plan for this request shape, compiling it on an LRU miss.
+
+    Only the shape (fields, filter fields/operators/IN arity, order, pagination mode) is part
+    of the key, so calls that differ only by filter values reuse the validated SQL.
+    """
+    order_key = order_by if isinstance(order_by, str) or order_by is None else json.dumps(order_by, default=str)
+    key = (
+        _get_schema_version(),
+        doctype,
+        tuple(str(field) for field in parsed_fields),
+        _filter_shape(entries),
+        order_key,
+        mode,
+    )
+
+    plan = _query_plan_cache.get(key)
+    if plan is not None:
+        _query_plan_stats["hits"] += 1
+        try:
+            _query_plan_cache.move_to_end(key)
+        except KeyError:
+            pass
+        return plan
+
+    _query_plan_stats["misses"] += 1
+    plan = _compile_query_plan(doctype, table_columns, parsed_fields, entries, order_by, mode)
+    _query_plan_cache[key] = plan
+    while len(_query_plan_cache) > MAX_QUERY_PLANS:
+        try:
+            _query_plan_cache.popitem(last=False)
+        except KeyError:
+            break
+    return plan
+
+
+@frappe.whitelist()
+def get_query_plan_stats():
+    """Return this worker's fetch_docs_sql plan cache hit/miss counters."""
+    frappe.only_for("System Manager")
+    lookups = _query_plan_stats["hits"] + _query_plan_stats["misses"]
+    return {
+        "hits": _query_plan_stats["hits"],
+        "misses": _query_plan_stats["misses"],
+        "size": len(_query_plan_cache),
+        "capacity": MAX_QUERY_PLANS,
+        "hit_ratio": _query_plan_stats["hits"] / lookups if lookups else 0.0,
+    }
+
+
+def _get_result_cache_doctypes() -> frozenset:
+    """DocTypes whose list results are cached, opted into via ``healthx_result_cache_doctypes``.
+
+    Off by default: writes that bypass document hooks (raw SQL, imports) do not bump the version.
+    """
+    return frozenset(frappe.conf.get("healthx_result_cache_doctypes") or ()) & frozenset(RESULT_CACHE_DOCTYPES)
+
+
+def _get_result_version(doctype: str) -> str:
+    key = f"{RESULT_VERSION_KEY}:{doctype}"
+    version = frappe.cache().get_value(key)
+    if version is None:
+        # A missing key (first use, Redis flush or eviction) gets a fresh random version, so an
+        # ETag issued before it was lost can never match again.
+        version = frappe.generate_hash(length=10)
+        frappe.cache().set_value(key, version)
+    return version
+
+
+def bump_result_cache_version(doc, method=None):
+    """Invalidate cached fetch_docs_sql results for ``doc.doctype`` (on_update/on_trash hook)."""
+    frappe.cache().set_value(f"{RESULT_VERSION_KEY}:{doc.doctype}", frappe.generate_hash(length=10))
+
+
+def _set_response_header(key: str, value: str):
+    headers = getattr(frappe.local, "response_headers", None)
+    if headers is not None:
+        headers[key] = value
 
-    query = f"SELECT {select_clause} FROM `{table_name}`"
-    where_clause, values = _parse_filters(filters)
-    order_clause = _parse_order_by(order_by) or " ORDER BY `modified` DESC"
-    limit_clause = _parse_limit(limit, start)
 
-    rows = frappe.db.sql(query + where_clause + order_clause + limit_clause, values, as_dict=True)
+def _get_if_none_match():
+    request = getattr(frappe.local, "request", None)
+    if request is None:
+        return None
+    return request.headers.get("If-None-Match")
+
+
+def _fetch_cached_rows(doctype: str, sql: str, values: List[Any]):
+    """Serve a master-data query from Redis, answering 304 when the client's ETag is current.
+
+    The ETag is derived from the DocType's version key and the bound query, so a conditional
+    request is answered without touching the database or the cached rows at all.
+    """
+    version = _get_result_version(doctype)
+    digest = hashlib.sha1(json.dumps([doctype, version, sql, values], default=str).encode()).hexdigest()
+    etag = f'"{digest}"'
+    _set_response_header("ETag", etag)
+    _set_response_header("Cache-Control", "private, no-cache")
+
+    if _get_if_none_match() == etag:
+        frappe.local.response["http_status_code"] = 304
+        return None
+
+    cache_key = f"{RESULT_CACHE_KEY}:{digest}"
+    rows = frappe.cache().get_value(cache_key)
+    if rows is None:
+        rows = frappe.db.sql(sql, values, as_dict=True)
+        frappe.cache().set_value(cache_key, rows, expires_in_sec=RESULT_CACHE_TTL)
     return rows
 
 
+@frappe.whitelist(allow_guest=True)
+def fetch_docs_sql(
+    doctype: str, fields=None, filters=None, order_by=None, limit: Any = 20, start: Any = 0, cursor=None
+):
+    """Return DocType data via parameterized SQL (guest safe, ignores DocType perms).
+
+    Passing ``cursor`` (an empty string for the first page) switches to keyset pagination:
+    the response becomes ``{"rows": [...], "next_cursor": ...}`` and each page seeks past the
+    previous page's last ``(sort key, name)`` instead of scanning an OFFSET.
+    """
+    if not doctype:
+        return []
+
+    table_columns = _get_table_columns(doctype, "fetch_docs_sql")
+    if table_columns is None:
+        return []
+
+    parsed_fields = _parse_fields(fields)
+    entries = _normalize_filters(filters)
+    limit_value = _parse_limit_value(limit)
+
+    if cursor is None:
+        plan = _get_query_plan(doctype, table_columns, parsed_fields, entries, order_by, "offset")
+        values = [*plan.extract_values(entries), limit_value, _parse_start_value(start)]
+        if doctype in _get_result_cache_doctypes():
+            return _fetch_cached_rows(doctype, plan.sql, values)
+        return frappe.db.sql(plan.sql, values, as_dict=True)
+
+    plan = _get_query_plan(doctype, table_columns, parsed_fields, entries, order_by, "seek" if cursor else "first")
+    values = plan.extract_values(entries)
+    if cursor:
+        cursor_field, cursor_direction, sort_value, last_name = _decode_cursor(cursor)
+        if (cursor_field, cursor_direction) != (plan.sort_field, plan.direction):
+            frappe.throw(_("Cursor does not match the requested sort order."))
+        values.extend([sort_value, last_name])
+    values.append(limit_value + 1)
+
+    rows = frappe.db.sql(plan.sql, values, as_dict=True)
+
+    next_cursor = None
+    if len(rows) > limit_value:
+        rows = rows[:limit_value]
+        last_row = rows[-1]
+        next_cursor = _encode_cursor(plan.sort_field, plan.direction, last_row[plan.sort_field], last_row["name"])
+
+    for row in rows:
+        for field in plan.extra_fields:
+            row.pop(field, None)
+
+    return {"rows": rows, "next_cursor": next_cursor}
+
+
+def _parse_json_arg(value: Any) -> Any:
+    if isinstance(value, str):
+        stripped = value.strip()
+        if not stripped:
+            return None
+        try:
+            return json.loads(stripped)
+        except (TypeError, ValueError, json.JSONDecodeError):
+            return None
+    return value
+
+
+def _run_aggregate(spec: dict) -> Any:
+    doctype = spec.get("doctype")
+    if not doctype:
+        return None
+
+    table_columns = _get_table_columns(doctype, "fetch_aggregates_sql")
+    if table_columns is None:
+        return None
+
+    metric = str(spec.get("metric") or "count").strip().lower()
+    if metric not in AGGREGATE_METRICS:
+        frappe.throw(_("Unsupported metric: {0}").format(metric))
+
+    field = spec.get("field")
+    if field:
+        field = _validate_field(str(field))
+        if field not in table_columns:
+            frappe.throw(_("Invalid field name: {0}").format(field))
+        target = f"`{field}`"
+    elif metric == "count":
+        target = "*"
+    else:
+        frappe.throw(_("Metric {0} requires a field.").format(metric))
+
+    expression = f"{AGGREGATE_METRICS[metric]}({target})"
+    where_clause, values = _parse_filters(spec.get("filters"))
+
+    group_by = spec.get("group_by")
+    if not group_by:
+        query = f"SELECT {expression} FROM `tab{doctype}`" + where_clause
+        result = frappe.db.sql(query, values)[0][0]
+        return result or 0
+
+    group_by = _validate_field(str(group_by))
+    if group_by not in table_columns:
+        frappe.throw(_("Invalid field name: {0}").format(group_by))
+
+    query = (
+        f"SELECT `{group_by}` AS `group`, {expression} AS `value` FROM `tab{doctype}`"
+        + where_clause
+        + f" GROUP BY `{group_by}` ORDER BY `value` DESC LIMIT {MAX_AGGREGATE_GROUPS}"
+    )
+    return frappe.db.sql(query, values, as_dict=True)
+
+
+@frappe.whitelist(allow_guest=True)
+def fetch_aggregates_sql(specs=None):
+    """Evaluate a batch of COUNT/SUM/AVG specs in one round trip (guest safe, ignores DocType perms).
+
+    Each spec is ``{"doctype", "filters", "metric", "field", "group_by", "key"}``. Results are
+    returned as a dict keyed by ``key`` (or the spec's position) so dashboards can render every
+    stat card from a single request instead of fetching rows just to count them.
+    """
+    parsed = _parse_json_arg(specs)
+    if isinstance(parsed, dict):
+        parsed = [parsed]
+    if not isinstance(parsed, (list, tuple)):
+        return {}
+
+    if len(parsed) > MAX_AGGREGATE_SPECS:
+        frappe.throw(_("At most {0} aggregates can be requested at once.").format(MAX_AGGREGATE_SPECS))
+
+    results = {}
+    for index, spec in enumerate(parsed):
+        if not isinstance(spec, dict):
+            continue
+        key = str(spec.get("key") or index)
+        results[key] = _run_aggregate(spec)
+    return results
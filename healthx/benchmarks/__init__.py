@@ -0,0 +1 @@
+"""Developer benchmarks, run with ``bench --site <site> execute healthx.benchmarks.<module>.run``."""
@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import Counter
+
+import frappe
+
+from healthx.benchmarks.utils import print_table
+from healthx.healthx.doctype.doctor_appointment.doctor_appointment import book_slot
+
+
+def _worker(site, doctor, date, start_times, patient, booked, errors):
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        for start_time in start_times:
+            try:
+                booked.append(book_slot(doctor, date, start_time, patient, booking_source="Web")["appointment"])
+                frappe.db.commit()
+            except Exception as exc:
+                frappe.db.rollback()
+                errors.append(type(exc).__name__)
+    finally:
+        frappe.destroy()
+
+
+def run(doctor, patient, date, workers=8):
+    """Race parallel workers for every free slot of one doctor/day and check for double bookings.
+
+    Every worker tries every slot, so all but one attempt per slot must fail. Appointments
+    created by the run are deleted afterwards.
+    """
+    from healthx.healthx.doctype.doctor_schedule.doctor_schedule import get_available_slots
+
+    workers = int(workers)
+    site = frappe.local.site
+    date = str(frappe.utils.getdate(date))
+    slots = get_available_slots(doctor=doctor, from_date=date, to_date=date).get(doctor, {}).get(date, [])
+    start_times = [slot.split(" - ")[0] for slot in slots]
+    if not start_times:
+        print(f"No free slots for {doctor} on {date}")
+        return
+
+    booked, errors = [], []
+    threads = [
+        threading.Thread(target=_worker, args=(site, doctor, date, start_times, patient, booked, errors))
+        for _ in range(workers)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    double_booked = frappe.db.sql(
+        """
+        SELECT slot_key FROM `tabDoctor Appointment`
+        WHERE doctor = %s AND date = %s AND slot_key IS NOT NULL
+        GROUP BY slot_key HAVING COUNT(*) > 1
+        """,
+        (doctor, date),
+    )
+    attempts = workers * len(start_times)
+    print_table(
+        f"book_slot with {workers} workers racing for {len(start_times)} slots",
+        [
+            ("attempts", attempts),
+            ("booked", len(booked)),
+            ("rejected", len(errors)),
+            ("rejections by type", dict(Counter(errors))),
+            ("elapsed (s)", f"{elapsed:.2f}"),
+            ("attempts/sec", f"{attempts / elapsed:.0f}" if elapsed else "n/a"),
+            ("double-booked slots", len(double_booked)),
+        ],
+    )
+
+    for name in booked:
+        frappe.delete_doc("Doctor Appointment", name, ignore_permissions=True, force=True)
+    frappe.db.commit()
@@ -0,0 +1,116 @@
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+import frappe
+from frappe.utils import now_datetime
+
+from healthx.benchmarks.utils import print_table
+from healthx.export import export_rows
+from healthx.healthx.doctype.vitals_reading.vitals_reading import MAX_INGEST_BATCH, insert_readings
+
+
+def _seed(device, patient, rows, start):
+    for offset in range(0, rows, MAX_INGEST_BATCH):
+        size = min(MAX_INGEST_BATCH, rows - offset)
+        insert_readings(
+            device,
+            patient,
+            [
+                {
+                    "heart_rate": random.randint(55, 130),
+                    "spo2": round(random.uniform(88, 100), 1),
+                    "bp": f"{random.randint(100, 150)}/{random.randint(60, 95)}",
+                    "tempreature": round(random.uniform(36.0, 38.5), 1),
+                    "fall_detected": 0,
+                    "timestamp": start + timedelta(seconds=offset + index),
+                }
+                for index in range(size)
+            ],
+        )
+        frappe.db.commit()
+
+
+RSS_SAMPLE_INTERVAL = 0.05
+
+
+def _current_rss_mb():
+    # Resident pages are the second field of /proc/self/statm (Linux only). Unlike ru_maxrss this
+    # is the current size, not the process's lifetime peak, so seeding does not mask the export.
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1048576
+
+
+class RssSample:
+    def __init__(self):
+        self.before = self.peak = _current_rss_mb()
+
+
+@contextmanager
+def sample_rss():
+    """Track the highest current RSS seen, from a background thread, while the block runs."""
+    sample = RssSample()
+    done = threading.Event()
+
+    def poll():
+        while not done.wait(RSS_SAMPLE_INTERVAL):
+            sample.peak = max(sample.peak, _current_rss_mb())
+
+    thread = threading.Thread(target=poll, daemon=True)
+    thread.start()
+    try:
+        yield sample
+    finally:
+        done.set()
+        thread.join()
+        sample.peak = max(sample.peak, _current_rss_mb())
+
+
+def run(device=None, rows=1000000, formats="csv,xlsx", keep=False):
+    """Measure export_rows rows/sec and peak memory for Vitals Readings of one Device.
+
+    ``rows`` synthetic readings are inserted first and deleted again unless ``keep`` is set.
+    Current RSS is polled while each export runs, so a flat export shows no growth over the
+    RSS it started with.
+    """
+    rows = int(rows)
+    device = device or frappe.db.get_value("Device", {}, "name")
+    if not device:
+        frappe.throw("Create a Device before running the export benchmark.")
+    patient = frappe.db.get_value("Device", device, "patient")
+
+    start = now_datetime()
+    _seed(device, patient, rows, start)
+    filters = {"device": device, "timestamp": [">=", start]}
+    fields = ["name", "patient", "heart_rate", "spo2", "bp", "tempreature", "fall_detected", "timestamp"]
+
+    directory = tempfile.mkdtemp(prefix="healthx-export-")
+    try:
+        for file_format in str(formats).split(","):
+            path = os.path.join(directory, f"vitals.{file_format}")
+            with sample_rss() as rss:
+                started = time.perf_counter()
+                count = export_rows("Vitals Reading", fields, filters, "timestamp asc", file_format, path)
+                elapsed = time.perf_counter() - started
+
+            print_table(
+                f"export_rows: {count} Vitals Readings as {file_format}",
+                [
+                    ("elapsed (s)", f"{elapsed:.2f}"),
+                    ("rows/sec", f"{count / elapsed:.0f}" if elapsed else "n/a"),
+                    ("file size (MB)", f"{os.path.getsize(path) / 1048576:.1f}"),
+                    ("RSS before (MB)", f"{rss.before:.0f}"),
+                    ("peak RSS during export (MB)", f"{rss.peak:.0f}"),
+                    ("growth (MB)", f"{rss.peak - rss.before:.0f}"),
+                ],
+            )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+        if not keep:
+            frappe.db.delete("Vitals Reading", {"device": device, "timestamp": [">=", start]})
+            frappe.db.commit()
@@ -0,0 +1,36 @@
+import time
+
+import frappe
+
+from healthx.api import clear_schema_cache, fetch_docs_sql
+from healthx.benchmarks.utils import count_queries, print_table
+
+
+def _measure(doctype, iterations, cold):
+    with count_queries() as counter:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            if cold:
+                clear_schema_cache()
+            fetch_docs_sql(doctype, fields=["name"], limit=1)
+        elapsed = time.perf_counter() - started
+    return counter.count / iterations, elapsed / iterations * 1000
+
+
+def run(doctype="Doctor", iterations=200):
+    """Compare queries per fetch_docs_sql call with a cold and a warm schema cache."""
+    iterations = int(iterations)
+    cold_queries, cold_ms = _measure(doctype, iterations, cold=True)
+    fetch_docs_sql(doctype, fields=["name"], limit=1)
+    warm_queries, warm_ms = _measure(doctype, iterations, cold=False)
+
+    print_table(
+        f"fetch_docs_sql({doctype!r}) over {iterations} calls",
+        [
+            ("queries/call (uncached)", f"{cold_queries:.2f}"),
+            ("queries/call (cached)", f"{warm_queries:.2f}"),
+            ("ms/call (uncached)", f"{cold_ms:.3f}"),
+            ("ms/call (cached)", f"{warm_ms:.3f}"),
+        ],
+    )
+    frappe.db.rollback()
@@ -0,0 +1,71 @@
+import csv
+import os
+import random
+import tempfile
+import time
+
+import frappe
+
+from healthx.benchmarks.utils import count_queries, print_table
+from healthx.patient_import import import_patients
+
+BENCH_PREFIX = "BENCHPAT-"
+FIRST_NAMES = ("Asha", "Ravi", "Meera", "Arjun", "Fatima", "John", "Li", "Sofia", "Kwame", "Noor")
+LAST_NAMES = ("Rao", "Kumar", "Shah", "Patel", "Khan", "Smith", "Chen", "Garcia", "Mensah", "Ali")
+
+
+def _write_file(path, rows):
+    """Write synthetic patients: ~2% invalid rows and ~1% phones repeated within the file."""
+    with open(path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["Full Name", "Gender", "Phone Number", "Email", "Date of Birth"])
+        for index in range(rows):
+            phone = f"+999{index:010d}"
+            if index and random.random() < 0.01:
+                phone = f"+999{random.randrange(index):010d}"
+            name = f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}"
+            if random.random() < 0.02:
+                name = "X"
+            writer.writerow(
+                [
+                    name,
+                    random.choice(("Male", "Female", "Other")),
+                    phone,
+                    f"patient{index}@example.com",
+                    f"{random.randint(1940, 2020)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+                ]
+            )
+
+
+def _cleanup():
+    frappe.db.sql("DELETE FROM `tabPatient` WHERE name LIKE %s", (f"{BENCH_PREFIX}%",))
+    frappe.db.sql("DELETE FROM `tabSeries` WHERE name = %s", (BENCH_PREFIX,))
+    frappe.db.commit()
+
+
+def run(sizes="10000,100000,1000000", chunk_size=5000, dry_run=False):
+    """Measure import_patients rows/sec for each file size; imported patients are removed again.
+
+    Phones use the unassigned +999 country code so they never collide with real patients.
+    """
+    directory = tempfile.mkdtemp(prefix="healthx-patient-import-")
+    for size in (int(size) for size in str(sizes).split(",")):
+        path = os.path.join(directory, f"patients-{size}.csv")
+        _write_file(path, size)
+
+        with count_queries() as counter:
+            started = time.perf_counter()
+            summary = import_patients(path, chunk_size=chunk_size, prefix=BENCH_PREFIX, dry_run=dry_run)
+            elapsed = time.perf_counter() - started
+
+        print_table(
+            f"import_patients: {size} rows in chunks of {chunk_size}{' (dry run)' if dry_run else ''}",
+            [
+                ("inserted", summary["inserted"]),
+                ("rejected", summary["rejected"]),
+                ("elapsed (s)", f"{elapsed:.2f}"),
+                ("rows/sec", f"{summary['processed'] / elapsed:.0f}" if elapsed else "n/a"),
+                ("queries/chunk", f"{counter.count / max(summary['chunks'], 1):.1f}"),
+            ],
+        )
+        _cleanup()
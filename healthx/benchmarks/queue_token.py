@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import Counter
+
+import frappe
+
+from healthx.benchmarks.utils import print_table
+from healthx.healthx.doctype.queue_token.queue_token import allocate_token_number
+
+
+def _worker(site, date, priority, count, issued, errors):
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        for _ in range(count):
+            try:
+                issued.append(allocate_token_number(date, priority))
+                frappe.db.commit()
+            except Exception as exc:
+                frappe.db.rollback()
+                errors.append(repr(exc))
+    finally:
+        frappe.destroy()
+
+
+def run(workers=8, tokens_per_worker=250, priority="Normal"):
+    """Issue tokens from parallel workers and report throughput, duplicates and gaps.
+
+    Uses a far-future date so the run never collides with real queues; the counter row it
+    creates is deleted afterwards.
+    """
+    workers, tokens_per_worker = int(workers), int(tokens_per_worker)
+    site = frappe.local.site
+    date = "2099-12-31"
+    frappe.db.delete("Queue Token Counter", {"date": date})
+    frappe.db.commit()
+
+    issued, errors = [], []
+    threads = [
+        threading.Thread(target=_worker, args=(site, date, priority, tokens_per_worker, issued, errors))
+        for _ in range(workers)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    duplicates = sum(count - 1 for count in Counter(issued).values() if count > 1)
+    gaps = len(set(range(1, max(issued, default=0) + 1)) - set(issued))
+    print_table(
+        f"allocate_token_number with {workers} workers x {tokens_per_worker} tokens",
+        [
+            ("tokens issued", len(issued)),
+            ("errors", len(errors)),
+            ("elapsed (s)", f"{elapsed:.2f}"),
+            ("tokens/sec", f"{len(issued) / elapsed:.0f}" if elapsed else "n/a"),
+            ("duplicates", duplicates),
+            ("gaps", gaps),
+        ],
+    )
+
+    frappe.db.delete("Queue Token Counter", {"date": date})
+    frappe.db.commit()
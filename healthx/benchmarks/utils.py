@@ -0,0 +1,37 @@
+import time
+from contextlib import contextmanager
+
+import frappe
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
+
+
+@contextmanager
+def count_queries():
+    """Count statements sent through ``frappe.db.sql`` while the block runs."""
+    counter = QueryCounter()
+    original_sql = frappe.db.sql
+
+    def counting_sql(*args, **kwargs):
+        counter.count += 1
+        started = time.perf_counter()
+        try:
+            return original_sql(*args, **kwargs)
+        finally:
+            counter.elapsed += time.perf_counter() - started
+
+    frappe.db.sql = counting_sql
+    try:
+        yield counter
+    finally:
+        frappe.db.sql = original_sql
+
+
+def print_table(title, rows):
+    print(f"\n{title}")
+    for label, value in rows:
+        print(f"  {label:<32} {value}")
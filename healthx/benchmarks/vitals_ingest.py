@@ -0,0 +1,63 @@
+import json
+import random
+import time
+from datetime import timedelta
+
+import frappe
+from frappe.utils import now_datetime
+
+from healthx.benchmarks.utils import count_queries, print_table
+from healthx.healthx.doctype.vitals_reading.vitals_reading import ingest_vitals
+
+
+def _make_batch(size, start):
+    return [
+        {
+            "heart_rate": random.randint(55, 130),
+            "spo2": round(random.uniform(88, 100), 1),
+            "bp": f"{random.randint(100, 150)}/{random.randint(60, 95)}",
+            "temperature": round(random.uniform(36.0, 38.5), 1),
+            "fall_detected": random.random() < 0.001,
+            "timestamp": str(start + timedelta(seconds=index)),
+        }
+        for index in range(size)
+    ]
+
+
+def run(device=None, batches=20, batch_size=1000, ndjson=False, keep=False):
+    """Measure ingest_vitals readings/sec against the site's MariaDB.
+
+    Readings are deleted again afterwards unless ``keep`` is set.
+    """
+    batches, batch_size = int(batches), int(batch_size)
+    device = device or frappe.db.get_value("Device", {}, "name")
+    if not device:
+        frappe.throw("Create a Device before running the ingest benchmark.")
+
+    start = now_datetime()
+    payloads = []
+    for number in range(batches):
+        batch = _make_batch(batch_size, start + timedelta(seconds=number * batch_size))
+        payloads.append("\n".join(json.dumps(row) for row in batch) if ndjson else json.dumps(batch))
+
+    accepted = 0
+    with count_queries() as counter:
+        started = time.perf_counter()
+        for payload in payloads:
+            accepted += ingest_vitals(device, payload, battery_level=80)["accepted"]
+            frappe.db.commit()
+        elapsed = time.perf_counter() - started
+
+    print_table(
+        f"ingest_vitals: {batches} batches x {batch_size} readings ({'NDJSON' if ndjson else 'JSON'})",
+        [
+            ("readings accepted", accepted),
+            ("elapsed (s)", f"{elapsed:.2f}"),
+            ("readings/sec", f"{accepted / elapsed:.0f}" if elapsed else "n/a"),
+            ("queries/batch", f"{counter.count / batches:.1f}"),
+        ],
+    )
+
+    if not keep:
+        frappe.db.delete("Vitals Reading", {"device": device, "timestamp": [">=", start]})
+        frappe.db.commit()
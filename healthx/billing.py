@@ -0,0 +1,220 @@
+"""Batch billing: invoice every completed, unbilled Clinic Visit and Service Request.
+
+Every invoice created for a source document carries a ``billing_key`` ("<doctype>:<name>")
+with a unique index, so a run, a retried run and the single-document helpers can never bill
+the same document twice.
+"""
+
+import time
+
+import frappe
+from frappe.utils import flt, now_datetime, nowdate
+
+from healthx.utils import reserve_names
+
+DEFAULT_CHUNK_SIZE = 500
+SERIES_PREFIX = "INV-"
+INSERT_FIELDS = (
+    "name",
+    "naming_series",
+    "creation",
+    "modified",
+    "owner",
+    "modified_by",
+    "docstatus",
+    "idx",
+    "patient",
+    "date",
+    "currency",
+    "total_amount",
+    "discount",
+    "amount_after_discount",
+    "payment_status",
+    "payment_mode",
+    "visit",
+    "service_request",
+    "billing_key",
+)
+
+
+def get_billing_key(doctype, name):
+    return f"{frappe.scrub(doctype)}:{name}"
+
+
+def get_default_currency():
+    return frappe.defaults.get_global_default("currency") or "INR"
+
+
+def _unbilled_visits():
+    # Anti-join: completed visits with no draft or submitted invoice.
+    return frappe.db.sql(
+        """
+        SELECT visit.name, visit.patient, visit.doctor
+        FROM `tabClinic Visit` visit
+        LEFT JOIN `tabInvoice` invoice ON invoice.visit = visit.name AND invoice.docstatus < 2
+        WHERE visit.consultation_status = 'Completed' AND invoice.name IS NULL
+        ORDER BY visit.creation
+        """,
+        as_dict=True,
+    )
+
+
+def _unbilled_service_requests():
+    return frappe.db.sql(
+        """
+        SELECT request.name, request.patient, request.service_type, request.base_rate
+        FROM `tabService Request` request
+        LEFT JOIN `tabInvoice` invoice ON invoice.service_request = request.name AND invoice.docstatus < 2
+        WHERE request.status = 'Completed' AND request.patient IS NOT NULL AND invoice.name IS NULL
+        ORDER BY request.creation
+        """,
+        as_dict=True,
+    )
+
+
+def _get_rates(doctype, names, fieldname):
+    if not names:
+        return {}
+    return dict(
+        frappe.get_all(doctype, filters={"name": ["in", list(names)]}, fields=["name", fieldname], as_list=True)
+    )
+
+
+def collect_billable_items():
+    """Return one ``{patient, amount, visit, service_request, billing_key}`` dict per unbilled document."""
+    visits = _unbilled_visits()
+    requests = _unbilled_service_requests()
+    doctor_fees = _get_rates("Doctor", {visit.doctor for visit in visits if visit.doctor}, "consultation_fees")
+    service_rates = _get_rates(
+        "Home Service", {request.service_type for request in requests if request.service_type}, "base_rate"
+    )
+
+    items = [
+        {
+            "patient": visit.patient,
+            "amount": flt(doctor_fees.get(visit.doctor)),
+            "visit": visit.name,
+            "service_request": None,
+            "billing_key": get_billing_key("Clinic Visit", visit.name),
+        }
+        for visit in visits
+    ]
+    items += [
+        {
+            "patient": request.patient,
+            # The rate agreed on the request wins over the Home Service list rate.
+            "amount": flt(request.base_rate) or flt(service_rates.get(request.service_type)),
+            "visit": None,
+            "service_request": request.name,
+            "billing_key": get_billing_key("Service Request", request.name),
+        }
+        for request in requests
+    ]
+    return items
+
+
+def insert_invoices(items, posting_date, currency):
+    """Insert draft invoices for ``items`` in one statement; return how many were new.
+
+    Rows whose ``billing_key`` already exists (e.g. a concurrent run) are skipped by the
+    unique index instead of raising.
+    """
+    names = reserve_names(SERIES_PREFIX, len(items))
+    now = now_datetime()
+    user = frappe.session.user
+    values = [
+        (
+            name,
+            SERIES_PREFIX,
+            now,
+            now,
+            user,
+            user,
+            0,
+            0,
+            item["patient"],
+            posting_date,
+            currency,
+            item["amount"],
+            0,
+            item["amount"],
+            "Pending",
+            "Cash",
+            item["visit"],
+            item["service_request"],
+            item["billing_key"],
+        )
+        for name, item in zip(names, items, strict=True)
+    ]
+    frappe.db.bulk_insert("Invoice", INSERT_FIELDS, values, ignore_duplicates=True, chunk_size=len(values))
+    return frappe.db.count("Invoice", {"name": ["in", names]})
+
+
+def run_billing(posting_date=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Create draft invoices for all unbilled completed work, one transaction per chunk."""
+    started = time.perf_counter()
+    posting_date = posting_date or nowdate()
+    chunk_size = int(chunk_size)
+    currency = get_default_currency()
+
+    items = collect_billable_items()
+    created = failed = 0
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start : start + chunk_size]
+        try:
+            created += insert_invoices(chunk, posting_date, currency)
+            frappe.db.commit()
+        except Exception:
+            frappe.db.rollback()
+            failed += len(chunk)
+            frappe.log_error(title="healthx.billing.chunk_failed")
+
+    elapsed = time.perf_counter() - started
+    return {
+        "billable": len(items),
+        "created": created,
+        "skipped": len(items) - created - failed,
+        "failed": failed,
+        "elapsed": round(elapsed, 3),
+        "invoices_per_sec": round(created / elapsed, 1) if elapsed else None,
+    }
+
+
+@frappe.whitelist(methods=["POST"])
+def start_billing_run(posting_date=None):
+    """Queue a billing run; the summary is published on the ``billing_run_complete`` event."""
+    frappe.only_for(("System Manager", "Hospital Admin"))
+    job = frappe.enqueue(
+        "healthx.billing.run_billing_job",
+        queue="long",
+        job_id="healthx:billing_run",
+        deduplicate=True,
+        posting_date=posting_date,
+        user=frappe.session.user,
+    )
+    return {"job_id": job.id if job else None}
+
+
+def run_billing_job(posting_date=None, user=None):
+    summary = run_billing(posting_date)
+    frappe.publish_realtime("billing_run_complete", summary, user=user)
+    return summary
+
+
+def insert_invoice_once(invoice):
+    """Insert a single invoice carrying a ``billing_key``; return the name of the invoice that holds the key.
+
+    If another request billed the same document first, its invoice is returned instead.
+    """
+    existing = frappe.db.get_value("Invoice", {"billing_key": invoice.billing_key})
+    if existing:
+        return existing
+    try:
+        invoice.insert(ignore_permissions=True)
+    except (frappe.UniqueValidationError, frappe.DuplicateEntryError):
+        frappe.clear_last_message()
+        existing = frappe.db.get_value("Invoice", {"billing_key": invoice.billing_key})
+        if not existing:
+            raise
+        return existing
+    return invoice.name
@@ -0,0 +1,39 @@
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("healthx-index-advisor")
+@click.argument("log_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--min-rows", default=0, type=int, help="Ignore full scans estimated below this many rows.")
+@pass_context
+def index_advisor(context, log_file, min_rows=0):
+    """Replay a query log through EXPLAIN and report full scans on healthx tables."""
+    import frappe
+
+    from healthx.index_advisor import analyze_query_log
+
+    frappe.init(site=get_site(context))
+    frappe.connect()
+    try:
+        findings = analyze_query_log(log_file, min_rows=min_rows)
+    finally:
+        frappe.destroy()
+
+    for finding in findings:
+        if finding["type"] == "error":
+            click.secho(f"EXPLAIN failed ({finding['error']}): {finding['statement'][:200]}", fg="yellow")
+            continue
+        click.secho(
+            f"{finding['table']}: {finding['type']} scan, ~{finding['rows']} rows, "
+            f"{finding['executions']}x, possible keys: {finding['possible_keys'] or '-'}",
+            fg="red",
+        )
+        click.echo(f"    {finding['statement'][:300]}")
+
+    scans = [finding for finding in findings if finding["type"] != "error"]
+    click.echo(f"{len(scans)} full scan(s) found.")
+    if scans:
+        raise SystemExit(1)
+
+
+commands = [index_advisor]
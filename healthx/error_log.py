@@ -0,0 +1,120 @@
+"""Aggregated, rate-limited error logging for request-path validation errors.
+
+``record_error`` only increments an in-memory counter for ``(title, doctype, field)``; it never
+touches the database. The ``after_request``/``after_job`` hooks merge the counters into one
+Redis hash at most every ``FLUSH_INTERVAL`` seconds, and whatever a worker still holds is
+written when its process exits. A scheduled job drains that hash every ``WINDOW_MINUTES``
+minutes into a single summarized Error Log per title. However many bad requests a client
+sends, each title produces at most one Error Log row per window.
+"""
+
+import atexit
+import json
+import time
+from collections import Counter, defaultdict
+
+import frappe
+
+ERRORS_KEY = "healthx:error_events"
+DRAINING_KEY = "healthx:error_events:draining"
+FLUSH_INTERVAL = 10
+WINDOW_MINUTES = 5
+MAX_SUMMARY_LINES = 100
+# Bounds memory when a client sends many distinct bad names; the rest are counted as "(other)".
+MAX_PENDING_EVENTS = 1000
+MAX_NAME_LENGTH = 140
+
+# {site: Counter({(title, doctype, field): count})}, per worker process.
+_pending = defaultdict(Counter)
+_last_flush = {}
+
+
+def record_error(title, doctype, field=None):
+    """Count one occurrence of an error; it is reported in the next window's summary."""
+    events = _pending[frappe.local.site]
+    event = (title, str(doctype or "")[:MAX_NAME_LENGTH], str(field or "")[:MAX_NAME_LENGTH])
+    if event not in events and len(events) >= MAX_PENDING_EVENTS:
+        event = (title, "(other)", "")
+    events[event] += 1
+
+
+def flush(*args, force=False, **kwargs):
+    """Merge this worker's pending counts into Redis (after_request/after_job hook)."""
+    site = getattr(frappe.local, "site", None)
+    if not site or not _pending.get(site):
+        return
+    if not force and time.monotonic() - _last_flush.get(site, 0) < FLUSH_INTERVAL:
+        return
+
+    _last_flush[site] = time.monotonic()
+    _write_events(_pending.pop(site))
+
+
+def _write_events(events):
+    cache = frappe.cache()
+    pipeline = cache.pipeline()
+    key = cache.make_key(ERRORS_KEY)
+    for event, count in events.items():
+        pipeline.hincrby(key, json.dumps(event), count)
+    pipeline.execute()
+
+
+def _flush_on_exit():
+    """Write the counts an idle worker still holds for any site when its process exits."""
+    for site in list(_pending):
+        events = _pending.pop(site)
+        if not events:
+            continue
+        try:
+            frappe.init(site=site)
+            _write_events(events)
+        except Exception:
+            # Redis may already be gone during shutdown; these counts are best effort.
+            pass
+        finally:
+            frappe.destroy()
+
+
+atexit.register(_flush_on_exit)
+
+
+def format_summary(title, events):
+    """Return the Error Log message for one title's ``{(doctype, field): count}`` events."""
+    total = sum(events.values())
+    lines = [f"{total} occurrence(s) of {title} in the last {WINDOW_MINUTES} minutes.", ""]
+    ordered = sorted(events.items(), key=lambda item: (-item[1], item[0]))
+    for (doctype, field), count in ordered[:MAX_SUMMARY_LINES]:
+        lines.append(f"{count}\tDocType: {doctype}" + (f", field: {field}" if field else ""))
+    if len(ordered) > MAX_SUMMARY_LINES:
+        lines.append(f"... and {len(ordered) - MAX_SUMMARY_LINES} more distinct events")
+    return "\n".join(lines)
+
+
+def emit_error_summaries():
+    """Scheduled job: write one Error Log per title for the events counted since the last run."""
+    flush(force=True)
+    cache = frappe.cache()
+    if cache.exists(ERRORS_KEY):
+        # Counts flushed from now on land in a fresh hash while this window is drained. Each run
+        # drains under its own key and deletes it only after logging, so a run that fails midway
+        # leaves its events for the next one instead of having them overwritten.
+        draining_key = f"{DRAINING_KEY}:{frappe.generate_hash(length=10)}"
+        cache.rename(cache.make_key(ERRORS_KEY), cache.make_key(draining_key))
+    draining_keys = cache.get_keys(f"{DRAINING_KEY}:")
+    if not draining_keys:
+        return
+
+    pipeline = cache.pipeline()
+    for draining_key in draining_keys:
+        pipeline.hgetall(draining_key)
+    raw_events = pipeline.execute()
+
+    by_title = defaultdict(Counter)
+    for events in raw_events:
+        for event, count in events.items():
+            title, doctype, field = json.loads(event)
+            by_title[title][(doctype, field)] += int(count)
+
+    for title, events in by_title.items():
+        frappe.log_error(title=title, message=format_summary(title, events))
+    cache.delete(*draining_keys)
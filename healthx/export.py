@@ -0,0 +1,121 @@
+"""Streaming CSV/XLSX export of any DocType list.
+
+Fields, filters and ordering go through the same validation and compiled query plans as
+``fetch_docs_sql``. The export runs as a background job that reads the result through an
+unbuffered server-side cursor and writes each row to a private File as it arrives, so memory
+stays flat however many rows match. The File URL is published on the ``export_complete``
+realtime event.
+"""
+
+import csv
+import hashlib
+import os
+
+import frappe
+from frappe import _
+
+from healthx.api import _get_query_plan, _get_table_columns, _normalize_filters, _parse_fields
+from healthx.utils import save_private_file
+
+FORMATS = ("csv", "xlsx")
+PROGRESS_EVERY = 50000
+# An XLSX sheet holds 1,048,576 rows including the header; larger exports continue on a new sheet.
+XLSX_SHEET_ROWS = 1048575
+
+
+def _get_plan(doctype, fields, filters, order_by):
+    table_columns = _get_table_columns(doctype, "export")
+    if table_columns is None:
+        frappe.throw(_("DocType {0} cannot be exported.").format(doctype))
+    entries = _normalize_filters(filters)
+    plan = _get_query_plan(doctype, table_columns, _parse_fields(fields), entries, order_by, "export")
+    return plan, plan.extract_values(entries)
+
+
+def _write_csv(path, columns, rows):
+    with open(path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(columns)
+        for count, row in enumerate(rows, 1):
+            writer.writerow(row)
+            yield count
+
+
+def _write_xlsx(path, columns, rows):
+    from openpyxl import Workbook
+
+    # write_only sheets serialize each appended row instead of keeping the cells in memory.
+    workbook = Workbook(write_only=True)
+    sheet = None
+    count = 0
+    for row in rows:
+        if count % XLSX_SHEET_ROWS == 0:
+            sheet = workbook.create_sheet(f"Sheet{count // XLSX_SHEET_ROWS + 1}")
+            sheet.append(columns)
+        sheet.append(row)
+        count += 1
+        yield count
+    if sheet is None:
+        workbook.create_sheet("Sheet1").append(columns)
+    workbook.save(path)
+
+
+def export_rows(doctype, fields=None, filters=None, order_by=None, file_format="csv", path=None):
+    """Stream the matching rows into ``path`` and return how many were written."""
+    plan, values = _get_plan(doctype, fields, filters, order_by)
+    writer = _write_xlsx if file_format == "xlsx" else _write_csv
+    count = 0
+    with frappe.db.unbuffered_cursor():
+        rows = frappe.db.sql(plan.sql, values, as_iterator=True)
+        for count in writer(path, list(plan.columns), rows):
+            if count % PROGRESS_EVERY == 0:
+                frappe.publish_realtime(
+                    "export_progress", {"doctype": doctype, "rows": count}, user=frappe.session.user
+                )
+    return count
+
+
+def run_export(doctype, fields=None, filters=None, order_by=None, file_format="csv"):
+    """Background job: write the export to a private File and publish its URL."""
+    filename = f"{frappe.scrub(doctype)}-export-{frappe.generate_hash(length=8)}.{file_format}"
+    path = frappe.get_site_path("private", "files", filename)
+    try:
+        count = export_rows(doctype, fields, filters, order_by, file_format, path)
+        file = save_private_file(path, filename)
+        frappe.db.commit()
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    summary = {"doctype": doctype, "rows": count, "file_url": file.file_url}
+    frappe.publish_realtime("export_complete", summary, user=frappe.session.user)
+    return summary
+
+
+@frappe.whitelist(methods=["POST"])
+def start_export(doctype, fields=None, filters=None, order_by=None, file_format="csv"):
+    """Queue a CSV/XLSX export; the File URL arrives on the ``export_complete`` realtime event.
+
+    Unlike ``fetch_docs_sql`` this checks the caller's export permission on the DocType.
+    """
+    if file_format not in FORMATS:
+        frappe.throw(_("Export format must be csv or xlsx."))
+    frappe.has_permission(doctype, "export", throw=True)
+    # Compile now so invalid fields or ordering fail the request instead of the job.
+    _get_plan(doctype, fields, filters, order_by)
+
+    key = hashlib.sha1(frappe.as_json([doctype, fields, filters, order_by, file_format]).encode()).hexdigest()
+    job = frappe.enqueue(
+        "healthx.export.run_export",
+        queue="long",
+        timeout=4 * 60 * 60,
+        job_id=f"healthx:export:{frappe.session.user}:{key}",
+        deduplicate=True,
+        doctype=doctype,
+        fields=fields,
+        filters=filters,
+        order_by=order_by,
+        file_format=file_format,
+    )
+    return {"job_id": job.id if job else None}
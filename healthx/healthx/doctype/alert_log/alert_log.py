@@ -1,9 +1,171 @@
 # Copyright (c) 2025, Meghwin Dave and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
+import numpy as np
 from frappe.model.document import Document
+from frappe.utils import get_datetime, now_datetime
+
+from healthx.analytics import add_to_facts, alert_contribution, apply_contribution_change
+from healthx.healthx.doctype.alert_type.alert_type import get_alert_rules
+from healthx.utils import reserve_names
+
+OPEN_STATUSES = ("New", "Acknowledged")
+SERIES_PREFIX = "AL-"
+INSERT_FIELDS = (
+    "name",
+    "naming_series",
+    "creation",
+    "modified",
+    "owner",
+    "modified_by",
+    "docstatus",
+    "idx",
+    "patient",
+    "device",
+    "alert_type",
+    "value",
+    "timestamp_deails",
+    "status",
+    "notes",
+)
 
 
 class AlertLog(Document):
-	pass
+    def validate(self):
+        if self.status == "Resolved":
+            self.resolved_on = self.resolved_on or now_datetime()
+        else:
+            self.resolved_on = None
+
+    def after_insert(self):
+        apply_contribution_change("alerts", None, alert_contribution(self))
+
+    def on_update(self):
+        previous = self.get_doc_before_save()
+        if previous:
+            apply_contribution_change("alerts", alert_contribution(previous), alert_contribution(self))
+
+    def on_trash(self):
+        apply_contribution_change("alerts", alert_contribution(self), None)
+
+
+def on_doctype_update():
+    # A patient's alerts newest first, for the patient timeline.
+    frappe.db.add_index("Alert Log", ["patient", "timestamp_deails"])
+
+
+def evaluate_thresholds(records, rules):
+    """Evaluate every rule over a batch of readings in one vectorised pass per metric.
+
+    Returns one breach per triggered rule: the first offending reading's value and timestamp
+    plus how many readings in the batch breached the rule.
+    """
+    if not records or not rules:
+        return []
+
+    columns = {}
+    for field in {rule["field"] for rule in rules}:
+        columns[field] = np.array(
+            [np.nan if record[field] is None else record[field] for record in records], dtype=float
+        )
+
+    breaches = []
+    for rule in rules:
+        values = columns[rule["field"]]
+        if rule["field"] == "fall_detected":
+            mask = values == 1
+        else:
+            mask = np.zeros(values.shape, dtype=bool)
+            if rule["min_value"] is not None:
+                mask |= values < rule["min_value"]
+            if rule["max_value"] is not None:
+                mask |= values > rule["max_value"]
+
+        hits = np.flatnonzero(mask)
+        if not hits.size:
+            continue
+        first = int(hits[0])
+        breaches.append(
+            {
+                "alert_type": rule["alert_type"],
+                "value": records[first][rule["field"]],
+                "timestamp": records[first]["timestamp"],
+                "count": int(hits.size),
+            }
+        )
+    return breaches
+
+
+def _get_open_alert_types(device, patient):
+    return set(
+        frappe.get_all(
+            "Alert Log",
+            filters={"device": device, "patient": patient, "status": ["in", OPEN_STATUSES]},
+            pluck="alert_type",
+        )
+    )
+
+
+def raise_alerts_for_readings(device, patient, records):
+    """Insert Alert Logs for threshold breaches in ``records`` that are not already open.
+
+    Called from ingest_vitals for each batch; the new alerts are written with one multi-row
+    insert and pushed to the patient's realtime room once the batch commits. A device without
+    a patient raises no alerts, since Alert Log requires one.
+    """
+    # bulk_insert skips the mandatory check, so the reqd patient link is enforced here.
+    patient = patient or frappe.db.get_value("Device", device, "patient")
+    if not patient:
+        return []
+
+    breaches = evaluate_thresholds(records, get_alert_rules())
+    if not breaches:
+        return []
+
+    open_alert_types = _get_open_alert_types(device, patient)
+    breaches = [breach for breach in breaches if breach["alert_type"] not in open_alert_types]
+    if not breaches:
+        return []
+
+    names = reserve_names(SERIES_PREFIX, len(breaches))
+    now = now_datetime()
+    user = frappe.session.user
+    values = [
+        (
+            name,
+            SERIES_PREFIX,
+            now,
+            now,
+            user,
+            user,
+            0,
+            0,
+            patient,
+            device,
+            breach["alert_type"],
+            str(breach["value"]),
+            breach["timestamp"],
+            "New",
+            f"{breach['count']} of {len(records)} readings in the batch breached the threshold.",
+        )
+        for name, breach in zip(names, breaches, strict=True)
+    ]
+    frappe.db.bulk_insert("Alert Log", INSERT_FIELDS, values)
+    add_to_facts(
+        "alerts",
+        [
+            (get_datetime(breach["timestamp"]).date(), {"alert_type": breach["alert_type"]}, {"raised_count": 1})
+            for breach in breaches
+        ],
+    )
+
+    for name, breach in zip(names, breaches, strict=True):
+        frappe.publish_realtime(
+            "vitals_alert",
+            {"alert": name, "alert_type": breach["alert_type"], "device": device, "value": str(breach["value"])},
+            doctype="Patient",
+            docname=patient,
+            after_commit=True,
+        )
+    return names
@@ -4,6 +4,38 @@
 # import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from healthx.healthx.doctype.alert_log.alert_log import evaluate_thresholds
+
+RULES = [
+	{"alert_type": "Low SpO2", "field": "spo2", "min_value": 90, "max_value": None},
+	{"alert_type": "Heart Rate", "field": "heart_rate", "min_value": 40, "max_value": 120},
+	{"alert_type": "Fall", "field": "fall_detected", "min_value": None, "max_value": None},
+]
+
+
+def reading(heart_rate=None, spo2=None, fall_detected=0, timestamp=None):
+	return {
+		"heart_rate": heart_rate,
+		"spo2": spo2,
+		"tempreature": None,
+		"fall_detected": fall_detected,
+		"timestamp": timestamp,
+	}
+
 
 class TestAlertLog(FrappeTestCase):
-	pass
+	def test_evaluate_thresholds_reports_first_breach_per_rule(self):
+		records = [
+			reading(80, 97, timestamp=1),
+			reading(150, 85, fall_detected=1, timestamp=2),
+			reading(None, 80, timestamp=3),
+		]
+		breaches = {breach["alert_type"]: breach for breach in evaluate_thresholds(records, RULES)}
+
+		self.assertEqual(breaches["Low SpO2"]["count"], 2)
+		self.assertEqual(breaches["Low SpO2"]["timestamp"], 2)
+		self.assertEqual(breaches["Heart Rate"]["value"], 150)
+		self.assertEqual(breaches["Fall"]["count"], 1)
+
+	def test_missing_values_do_not_breach(self):
+		self.assertEqual(evaluate_thresholds([reading()], RULES), [])
@@ -1,9 +1,53 @@
 # Copyright (c) 2025, Meghwin Dave and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
+from frappe import _
 from frappe.model.document import Document
 
+ALERT_RULES_CACHE_KEY = "healthx:alert_rules"
+# Alert Type metric -> Vitals Reading column
+METRIC_FIELDS = {
+    "Heart Rate": "heart_rate",
+    "SpO2": "spo2",
+    "Temperature": "tempreature",
+    "Fall Detected": "fall_detected",
+}
+
 
 class AlertType(Document):
-	pass
+    def validate(self):
+        if self.metric and self.metric != "Fall Detected":
+            if not self.min_value and not self.max_value:
+                frappe.throw(_("Set a Lower Limit or an Upper Limit for {0} alerts.").format(self.metric))
+            if self.min_value and self.max_value and self.min_value >= self.max_value:
+                frappe.throw(_("Lower Limit must be less than Upper Limit."))
+
+    def on_update(self):
+        frappe.cache().delete_value(ALERT_RULES_CACHE_KEY)
+
+    def on_trash(self):
+        frappe.cache().delete_value(ALERT_RULES_CACHE_KEY)
+
+
+def _load_alert_rules():
+    rules = frappe.get_all(
+        "Alert Type",
+        filters={"enabled": 1, "metric": ["in", list(METRIC_FIELDS)]},
+        fields=["name", "metric", "min_value", "max_value"],
+    )
+    return [
+        {
+            "alert_type": rule.name,
+            "field": METRIC_FIELDS[rule.metric],
+            # Float columns are NOT NULL DEFAULT 0, so an empty limit reads back as 0: 0 means unset.
+            "min_value": rule.min_value or None,
+            "max_value": rule.max_value or None,
+        }
+        for rule in rules
+    ]
+
+
+def get_alert_rules():
+    """Return enabled threshold rules, cached in Redis until an Alert Type changes."""
+    return frappe.cache().get_value(ALERT_RULES_CACHE_KEY, generator=_load_alert_rules)
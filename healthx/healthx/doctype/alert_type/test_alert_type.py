@@ -1,9 +1,25 @@
 # Copyright (c) 2025, Meghwin Dave and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from healthx.healthx.doctype.alert_log.alert_log import evaluate_thresholds
+from healthx.healthx.doctype.alert_type.alert_type import get_alert_rules
+
 
 class TestAlertType(FrappeTestCase):
-	pass
+	def test_lower_only_rule_does_not_fire_on_normal_readings(self):
+		frappe.delete_doc_if_exists("Alert Type", "_Test Low SpO2")
+		alert_type = frappe.get_doc(
+			{"doctype": "Alert Type", "alert_name": "_Test Low SpO2", "metric": "SpO2", "min_value": 92}
+		).insert()
+		# The empty upper limit is stored as 0; re-saving must not read it as a real limit.
+		alert_type.reload()
+		alert_type.save()
+
+		rules = [rule for rule in get_alert_rules() if rule["alert_type"] == alert_type.name]
+		self.assertEqual(rules, [{"alert_type": alert_type.name, "field": "spo2", "min_value": 92, "max_value": None}])
+		readings = [{"spo2": 97, "timestamp": 1}, {"spo2": 99, "timestamp": 2}, {"spo2": 88, "timestamp": 3}]
+		self.assertEqual(evaluate_thresholds(readings[:2], rules), [])
+		self.assertEqual([breach["value"] for breach in evaluate_thresholds(readings, rules)], [88])
@@ -2,6 +2,8 @@ import frappe
 from frappe.model.document import Document
 from frappe import _
 
+from healthx.analytics import apply_contribution_change, visit_contribution
+
 class ClinicVisit(Document):
 
     def validate(self):
@@ -11,6 +13,18 @@ class ClinicVisit(Document):
         self.auto_set_defaults()
         self.prevent_duplicate_pending_visits()
 
+    def after_insert(self):
+        apply_contribution_change("visits", None, visit_contribution(self))
+
+    def on_update(self):
+        # on_update also runs after insert; after_insert has already counted the new visit.
+        previous = self.get_doc_before_save()
+        if previous:
+            apply_contribution_change("visits", visit_contribution(previous), visit_contribution(self))
+
+    def on_trash(self):
+        apply_contribution_change("visits", visit_contribution(self), None)
+
     def validate_links(self):
         if not frappe.db.exists("Patient", self.patient):
             frappe.throw(_("Invalid Patient selected."))
@@ -54,6 +68,10 @@ class ClinicVisit(Document):
                 _("This patient already has an active visit with this doctor ({0}).").format(existing)
             )
 
+def on_doctype_update():
+    # Duplicate open-visit check in validate.
+    frappe.db.add_index("Clinic Visit", ["patient", "doctor", "consultation_status"])
+
 # ✅ Whitelisted helper: Fetch previous visits
 @frappe.whitelist()
 def get_previous_visits(patient):
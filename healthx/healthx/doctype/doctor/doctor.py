@@ -37,6 +37,12 @@ class Doctor(Document):
         if existing:
             frappe.throw(_("A Doctor named {0} already exists.").format(self.full_name))
 
+
+def on_doctype_update():
+    # Doctor listings filter by speciality and sort by rating; lookups by name.
+    frappe.db.add_index("Doctor", ["specialization", "rating_average"])
+    frappe.db.add_index("Doctor", ["full_name"])
+
 # 💡 Optional API: Fetch doctors by specialization or rating
 @frappe.whitelist()
 def get_doctors_by_filter(specialization=None, min_rating=None):
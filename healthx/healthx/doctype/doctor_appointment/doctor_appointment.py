@@ -1,9 +1,135 @@
 # Copyright (c) 2025, Meghwin Dave and contributors
 # For license information, please see license.txt
 
-# import frappe
+from functools import partial
+
+import frappe
+from frappe import _
 from frappe.model.document import Document
+from frappe.utils import getdate, nowdate
+
+from healthx.healthx.doctype.doctor_schedule.doctor_schedule import (
+    clear_slot_cache,
+    format_minutes,
+    get_available_slots,
+    to_minutes,
+)
+
+HOLD_KEY = "healthx:slot_hold"
+HOLD_TTL = 5 * 60
 
 
 class DoctorAppointment(Document):
-	pass
+    def validate(self):
+        if to_minutes(self.start_time) >= to_minutes(self.end_time):
+            frappe.throw(_("Start Time must be earlier than End Time."))
+        if not self.booking_status:
+            self.booking_status = "Confirmed"
+        self.slot_key = None if self.booking_status == "Cancelled" else get_slot_key(
+            self.doctor, self.date, self.start_time
+        )
+
+    def on_update(self):
+        self.clear_cached_slots()
+
+    def on_trash(self):
+        self.clear_cached_slots()
+
+    def clear_cached_slots(self):
+        """Free-slot cache entries for this and the previous doctor/date are now stale.
+
+        Cleared after commit so a concurrent request cannot re-cache the pre-booking slots.
+        """
+        frappe.db.after_commit.add(partial(clear_slot_cache, self.doctor, [self.date]))
+        previous = self.get_doc_before_save()
+        if previous and (previous.doctor, previous.date) != (self.doctor, self.date):
+            frappe.db.after_commit.add(partial(clear_slot_cache, previous.doctor, [previous.date]))
+
+
+def on_doctype_update():
+    # A patient's appointments newest first, for the patient timeline.
+    frappe.db.add_index("Doctor Appointment", ["patient", "date", "start_time"])
+
+
+def get_slot_key(doctor, date, start_time):
+    return f"{doctor}|{getdate(date)}|{format_minutes(to_minutes(start_time))}"
+
+
+def _hold_cache_key(slot_key):
+    return frappe.cache().make_key(f"{HOLD_KEY}:{slot_key}")
+
+
+def _find_free_slot(doctor, date, start_time):
+    """Return the free ``(start, end)`` slot starting at ``start_time`` or throw."""
+    if getdate(date) < getdate(nowdate()):
+        frappe.throw(_("Appointments cannot be booked for a past date."), title=_("Slot Unavailable"))
+    start = format_minutes(to_minutes(start_time))
+    slots = get_available_slots(doctor=doctor, from_date=date, to_date=date).get(doctor, {})
+    for slot in slots.get(str(getdate(date)), []):
+        slot_start, slot_end = slot.split(" - ")
+        if slot_start == start:
+            return slot_start, slot_end
+    frappe.throw(_("The selected slot is not available."), title=_("Slot Unavailable"))
+
+
+@frappe.whitelist()
+def hold_slot(doctor, date, start_time):
+    """Reserve a free slot for a few minutes while the patient confirms the booking.
+
+    The hold is a Redis ``SET NX EX`` on the slot key, so only one caller can hold a slot and
+    an abandoned hold simply expires.
+    """
+    _find_free_slot(doctor, date, start_time)
+    slot_key = get_slot_key(doctor, date, start_time)
+    hold_token = frappe.generate_hash(length=16)
+    if not frappe.cache().set(_hold_cache_key(slot_key), hold_token, nx=True, ex=HOLD_TTL):
+        frappe.throw(_("This slot is being booked by someone else. Please pick another."), title=_("Slot Held"))
+    return {"hold_token": hold_token, "expires_in": HOLD_TTL}
+
+
+@frappe.whitelist()
+def book_slot(doctor, date, start_time, patient, hold_token=None, booking_source="Web"):
+    """Book a slot atomically and return the appointment name and confirmation code.
+
+    A matching ``hold_token`` from ``hold_slot`` converts the hold; without one the slot is
+    held inline. The unique ``slot_key`` on Doctor Appointment is the final guard, so two
+    concurrent bookings of the same doctor/date/start time can never both commit.
+    """
+    # The insert below ignores permissions, so only patients the caller can read may be booked.
+    frappe.has_permission("Patient", "read", doc=patient, throw=True)
+    slot_start, slot_end = _find_free_slot(doctor, date, start_time)
+    slot_key = get_slot_key(doctor, date, start_time)
+    hold_key = _hold_cache_key(slot_key)
+
+    if hold_token:
+        current = frappe.cache().get(hold_key)
+        if current is None or current.decode() != hold_token:
+            frappe.throw(_("Your hold on this slot has expired. Please pick the slot again."), title=_("Hold Expired"))
+    else:
+        hold_token = frappe.generate_hash(length=16)
+        if not frappe.cache().set(hold_key, hold_token, nx=True, ex=HOLD_TTL):
+            frappe.throw(_("This slot is being booked by someone else. Please pick another."), title=_("Slot Held"))
+
+    appointment = frappe.get_doc(
+        {
+            "doctype": "Doctor Appointment",
+            "patient": patient,
+            "doctor": doctor,
+            "date": getdate(date),
+            "start_time": f"{slot_start}:00",
+            "end_time": f"{slot_end}:00",
+            "booking_source": booking_source,
+            "booking_status": "Confirmed",
+            "confirmation_code": frappe.generate_hash(length=8).upper(),
+        }
+    )
+    try:
+        appointment.insert(ignore_permissions=True)
+    except (frappe.UniqueValidationError, frappe.DuplicateEntryError):
+        frappe.clear_last_message()
+        frappe.throw(_("The selected slot has just been booked."), title=_("Slot Unavailable"))
+    finally:
+        if frappe.cache().get(hold_key) == hold_token.encode():
+            frappe.cache().delete(hold_key)
+
+    return {"appointment": appointment.name, "confirmation_code": appointment.confirmation_code}
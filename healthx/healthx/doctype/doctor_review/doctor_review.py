@@ -1,9 +1,122 @@
 # Copyright (c) 2025, Meghwin Dave and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
+from frappe import _
 from frappe.model.document import Document
+from frappe.utils import flt
+
+from healthx.api import bump_result_cache_version
 
 
 class DoctorReview(Document):
-	pass
+    def validate(self):
+        if self.rating is not None and not 0 <= flt(self.rating) <= 1:
+            frappe.throw(_("Rating must be between 0 and 1."))
+
+    def after_insert(self):
+        apply_rating_delta(self.doctor, flt(self.rating), 1)
+
+    def on_update(self):
+        # on_update also runs after insert; after_insert has already counted the new review.
+        previous = self.get_doc_before_save()
+        if not previous:
+            return
+        if previous.doctor == self.doctor and flt(previous.rating) == flt(self.rating):
+            return
+        apply_rating_delta(previous.doctor, -flt(previous.rating), -1)
+        apply_rating_delta(self.doctor, flt(self.rating), 1)
+
+    def on_trash(self):
+        apply_rating_delta(self.doctor, -flt(self.rating), -1)
+
+
+def _after_rating_change(doctors):
+    for doctor in doctors:
+        frappe.clear_document_cache("Doctor", doctor)
+    bump_result_cache_version(frappe._dict(doctype="Doctor"))
+
+
+def apply_rating_delta(doctor, rating_delta, count_delta):
+    """Adjust a Doctor's rating totals in one atomic UPDATE.
+
+    MariaDB applies the assignments left to right, so ``rating_average`` is computed from the
+    already-updated sum and count and concurrent reviews cannot lose each other's increments.
+    ``modified`` is bumped so a Doctor form opened before the review fails ``check_if_latest``
+    instead of saving its stale totals back.
+    """
+    if not doctor:
+        return
+    frappe.db.sql(
+        """
+        UPDATE `tabDoctor`
+        SET rating_sum = GREATEST(rating_sum + %(rating)s, 0),
+            rating_count = GREATEST(rating_count + %(count)s, 0),
+            rating_average = IF(rating_count > 0, rating_sum / rating_count, 0),
+            modified = NOW(6)
+        WHERE name = %(doctor)s
+        """,
+        {"doctor": doctor, "rating": rating_delta, "count": count_delta},
+    )
+    _after_rating_change([doctor])
+
+
+AGGREGATE_SQL = """
+    SELECT doctor, COALESCE(SUM(rating), 0) AS rating_sum, COUNT(*) AS rating_count
+    FROM `tabDoctor Review`
+    WHERE doctor IS NOT NULL
+    GROUP BY doctor
+"""
+
+
+def recompute_doctor_ratings():
+    """Rebuild every Doctor's rating totals from Doctor Review (backfill and repair)."""
+    frappe.db.sql(
+        f"""
+        UPDATE `tabDoctor` doctor
+        LEFT JOIN ({AGGREGATE_SQL}) review ON review.doctor = doctor.name
+        SET doctor.rating_sum = COALESCE(review.rating_sum, 0),
+            doctor.rating_count = COALESCE(review.rating_count, 0),
+            doctor.rating_average = IF(review.rating_count > 0, review.rating_sum / review.rating_count, 0)
+        """
+    )
+    frappe.db.commit()
+    frappe.clear_document_cache("Doctor")
+    bump_result_cache_version(frappe._dict(doctype="Doctor"))
+
+
+def find_rating_drift(tolerance=1e-6):
+    """Return Doctors whose stored totals differ from an aggregate over their reviews."""
+    return frappe.db.sql(
+        f"""
+        SELECT doctor.name AS doctor,
+            doctor.rating_sum, doctor.rating_count,
+            COALESCE(review.rating_sum, 0) AS expected_sum,
+            COALESCE(review.rating_count, 0) AS expected_count
+        FROM `tabDoctor` doctor
+        LEFT JOIN ({AGGREGATE_SQL}) review ON review.doctor = doctor.name
+        WHERE doctor.rating_count != COALESCE(review.rating_count, 0)
+            OR ABS(doctor.rating_sum - COALESCE(review.rating_sum, 0)) > %s
+        """,
+        (tolerance,),
+        as_dict=True,
+    )
+
+
+def verify_doctor_ratings():
+    """Weekly scheduler job: log any drift between Doctors and their reviews, then repair it."""
+    drift = find_rating_drift()
+    if not drift:
+        return
+    frappe.log_error(
+        title="healthx.doctor_review.rating_drift",
+        message=frappe.as_json(drift[:100]),
+    )
+    recompute_doctor_ratings()
+
+
+@frappe.whitelist()
+def check_doctor_ratings():
+    """Report Doctors whose rating totals have drifted from their reviews."""
+    frappe.only_for("System Manager")
+    return find_rating_drift()
@@ -1,6 +1,9 @@
 import frappe
+from frappe import _
 from frappe.model.document import Document
+from frappe.utils import getdate, nowdate, nowtime
 from datetime import datetime, timedelta
+from functools import partial
 
 class DoctorSchedule(Document):
 
@@ -29,19 +32,45 @@ class DoctorSchedule(Document):
             frappe.throw("Slot Duration cannot exceed total available time.")
 
     def validate_overlaps(self):
-        """Ensure the doctor doesn't have overlapping schedules."""
-        overlapping = frappe.db.exists(
-            "Doctor Schedule",
-            {
-                "doctor": self.doctor,
-                "name": ["!=", self.name],
-            },
-        )
-        if overlapping:
-            frappe.msgprint(
-                f"Note: Doctor {self.doctor} already has another schedule ({overlapping})."
+        """Reject a schedule whose hours overlap another schedule of the doctor on a shared weekday."""
+        days = {_weekday_key(row.weekday) for row in self.weekdays if row.weekday}
+        if not (self.doctor and days):
+            return
+
+        others = [
+            schedule
+            for schedule in _load_schedules([self.doctor]).get(self.doctor, [])
+            if schedule.name != self.name
+        ]
+        index = build_interval_index(others)
+        start, end = to_minutes(self.start_time), to_minutes(self.end_time)
+
+        conflicts = []
+        for day in (day for day in WEEKDAY_ORDER if day in days):
+            for other_start, other_end, other_name in index.get((self.doctor, day), []):
+                if other_start >= end:
+                    break
+                if other_end > start:
+                    conflicts.append(
+                        f"{WEEKDAY_LABELS[day]}: {other_name} "
+                        f"({format_minutes(other_start)} - {format_minutes(other_end)})"
+                    )
+        if conflicts:
+            frappe.throw(
+                _("Doctor {0} already has overlapping schedules:").format(self.doctor)
+                + "<br>" + "<br>".join(conflicts),
+                title=_("Overlapping Schedule"),
             )
 
+    def on_update(self):
+        frappe.db.after_commit.add(partial(clear_slot_cache, self.doctor))
+        previous = self.get_doc_before_save()
+        if previous and previous.doctor != self.doctor:
+            frappe.db.after_commit.add(partial(clear_slot_cache, previous.doctor))
+
+    def on_trash(self):
+        frappe.db.after_commit.add(partial(clear_slot_cache, self.doctor))
+
 import frappe
 from datetime import datetime, timedelta
 
@@ -64,3 +93,256 @@ def generate_time_slots(doctor=None, start_time=None, end_time=None, slot_durati
         current += duration
 
     return slots
+
+
+SLOT_CACHE_KEY = "healthx:free_slots"
+# A doctor's slot hash is dropped once nobody has asked for their availability for this long.
+SLOT_CACHE_TTL = 7 * 24 * 60 * 60
+MAX_AVAILABILITY_DAYS = 31
+MAX_AVAILABILITY_DOCTORS = 200
+
+
+def clear_slot_cache(doctor, dates=None):
+    """Drop cached free slots for a doctor, either for specific dates or entirely."""
+    key = f"{SLOT_CACHE_KEY}:{doctor}"
+    if dates is None:
+        frappe.cache().delete_value(key)
+        return
+    for slot_date in dates:
+        frappe.cache().hdel(key, str(slot_date))
+
+
+def _trim_slot_cache(doctors, today):
+    """Drop dates before ``today`` from the doctors' slot hashes and refresh their expiry."""
+    cache = frappe.cache()
+    # Raw pipeline: the field names are plain date strings, only the values are pickled.
+    keys = [cache.make_key(f"{SLOT_CACHE_KEY}:{name}") for name in doctors]
+    pipeline = cache.pipeline()
+    for key in keys:
+        pipeline.hkeys(key)
+    fields_by_key = pipeline.execute()
+
+    pipeline = cache.pipeline()
+    for key, fields in zip(keys, fields_by_key, strict=True):
+        past = [field for field in fields if frappe.safe_decode(field) < str(today)]
+        if past:
+            pipeline.hdel(key, *past)
+        pipeline.expire(key, SLOT_CACHE_TTL)
+    pipeline.execute()
+
+
+def to_minutes(value):
+    """Convert a Time value (timedelta from the DB or "HH:MM[:SS]" string) to minutes."""
+    if isinstance(value, timedelta):
+        return int(value.total_seconds() // 60)
+    parts = str(value).split(":")
+    return int(parts[0]) * 60 + int(parts[1])
+
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+WEEKDAY_LABELS = {
+    "mon": "Monday",
+    "tue": "Tuesday",
+    "wed": "Wednesday",
+    "thu": "Thursday",
+    "fri": "Friday",
+    "sat": "Saturday",
+    "sun": "Sunday",
+}
+WEEKDAY_ORDER = list(WEEKDAY_LABELS)
+
+
+def _weekday_key(value):
+    return str(value or "").strip().lower()[:3]
+
+
+def build_interval_index(schedules):
+    """Index schedules as ``{(doctor, weekday): [(start, end, name), ...]}`` sorted by start minute.
+
+    Each schedule is expected to carry ``days`` (weekday keys), as returned by ``_load_schedules``.
+    """
+    index = {}
+    for schedule in schedules:
+        interval = (to_minutes(schedule.start_time), to_minutes(schedule.end_time), schedule.name)
+        for day in schedule.days:
+            index.setdefault((schedule.doctor, day), []).append(interval)
+    for intervals in index.values():
+        intervals.sort()
+    return index
+
+
+def find_overlaps(index):
+    """Sweep each sorted weekday list once and return every overlapping schedule pair found.
+
+    Each interval is compared with the interval reaching furthest so far, so the sweep is
+    linear per list and the whole report is dominated by the O(n log n) sort in
+    ``build_interval_index``.
+    """
+    overlaps = []
+    for (doctor, day), intervals in sorted(index.items()):
+        reach = None
+        for start, end, name in intervals:
+            if reach and start < reach[1]:
+                overlaps.append(
+                    {
+                        "doctor": doctor,
+                        "weekday": WEEKDAY_LABELS.get(day, day),
+                        "schedule": reach[2],
+                        "overlapping_schedule": name,
+                        "overlap": f"{format_minutes(start)} - {format_minutes(min(end, reach[1]))}",
+                    }
+                )
+            if not reach or end > reach[1]:
+                reach = (start, end, name)
+    return overlaps
+
+
+@frappe.whitelist()
+def get_schedule_overlaps():
+    """Report overlapping Doctor Schedules across the whole hospital."""
+    frappe.has_permission("Doctor Schedule", "read", throw=True)
+    schedules = [schedule for rows in _load_schedules().values() for schedule in rows]
+    return find_overlaps(build_interval_index(schedules))
+
+
+def compute_free_slots(start_min, end_min, duration, bookings):
+    """Return free ``(start, end)`` minute slots after removing booked intervals.
+
+    ``bookings`` must be sorted by start. Slots and bookings are walked together once, so
+    the cost is O(slots + bookings) per doctor-day.
+    """
+    free = []
+    index = 0
+    current = start_min
+    while current + duration <= end_min:
+        slot_end = current + duration
+        while index < len(bookings) and bookings[index][1] <= current:
+            index += 1
+        if index >= len(bookings) or bookings[index][0] >= slot_end:
+            free.append((current, slot_end))
+        current = slot_end
+    return free
+
+
+def _load_schedules(doctors=None):
+    """Return schedules with their weekday keys as ``days``, grouped by doctor (all doctors if None)."""
+    schedules = frappe.get_all(
+        "Doctor Schedule",
+        filters={"doctor": ["in", doctors]} if doctors is not None else None,
+        fields=["name", "doctor", "start_time", "end_time", "slot_duration_min"],
+    )
+    weekday_filters = {"parenttype": "Doctor Schedule", "parentfield": "weekdays"}
+    if doctors is not None:
+        weekday_filters["parent"] = ["in", [row.name for row in schedules] or [""]]
+    weekdays = frappe.get_all("Weekdays", filters=weekday_filters, fields=["parent", "weekday"])
+    days_by_schedule = {}
+    for row in weekdays:
+        days_by_schedule.setdefault(row.parent, set()).add(_weekday_key(row.weekday))
+
+    by_doctor = {}
+    for schedule in schedules:
+        schedule.days = days_by_schedule.get(schedule.name, set())
+        by_doctor.setdefault(schedule.doctor, []).append(schedule)
+    return by_doctor
+
+
+def _load_bookings(doctors, from_date, to_date):
+    rows = frappe.get_all(
+        "Doctor Appointment",
+        filters={
+            "doctor": ["in", doctors],
+            "date": ["between", [from_date, to_date]],
+            "booking_status": "Confirmed",
+        },
+        fields=["doctor", "date", "start_time", "end_time"],
+        order_by="start_time asc",
+    )
+    bookings = {}
+    for row in rows:
+        bookings.setdefault((row.doctor, str(row.date)), []).append(
+            (to_minutes(row.start_time), to_minutes(row.end_time))
+        )
+    return bookings
+
+
+def _build_day_slots(schedules, bookings, slot_date):
+    weekday = _weekday_key(slot_date.strftime("%A"))
+    slots = []
+    for schedule in schedules:
+        if weekday not in schedule.days:
+            continue
+        free = compute_free_slots(
+            to_minutes(schedule.start_time),
+            to_minutes(schedule.end_time),
+            int(schedule.slot_duration_min),
+            sorted(bookings),
+        )
+        slots.extend(f"{format_minutes(start)} - {format_minutes(end)}" for start, end in free)
+    return sorted(set(slots))
+
+
+@frappe.whitelist()
+def get_available_slots(doctor=None, speciality=None, from_date=None, to_date=None):
+    """Return free ``"HH:MM - HH:MM"`` slots per doctor and date.
+
+    Slots come from each Doctor Schedule's weekdays minus Confirmed Doctor Appointments. Each
+    (doctor, date) result is cached in Redis and dropped when a schedule or appointment for
+    that doctor changes, so only uncached days touch the database (three queries in total).
+    Past dates are trimmed whenever a doctor's hash is written, and idle hashes expire.
+    """
+    if not (doctor or speciality):
+        frappe.throw(_("Doctor or Speciality is required."))
+
+    today = getdate(nowdate())
+    from_date = getdate(from_date or today)
+    to_date = getdate(to_date or from_date)
+    if to_date < from_date:
+        frappe.throw(_("To Date must not be before From Date."))
+    if (to_date - from_date).days >= MAX_AVAILABILITY_DAYS:
+        frappe.throw(_("Availability can be requested for at most {0} days.").format(MAX_AVAILABILITY_DAYS))
+    # Past days cannot be booked, so they have no free slots.
+    from_date = max(from_date, today)
+    if to_date < from_date:
+        return {}
+
+    if doctor:
+        doctors = [doctor]
+    else:
+        doctors = frappe.get_all(
+            "Doctor", filters={"specialization": speciality}, pluck="name", limit=MAX_AVAILABILITY_DOCTORS
+        )
+    if not doctors:
+        return {}
+    dates = [from_date + timedelta(days=offset) for offset in range((to_date - from_date).days + 1)]
+
+    result = {name: {} for name in doctors}
+    missing = []
+    for name in doctors:
+        for slot_date in dates:
+            cached = frappe.cache().hget(f"{SLOT_CACHE_KEY}:{name}", str(slot_date))
+            if cached is None:
+                missing.append((name, slot_date))
+            else:
+                result[name][str(slot_date)] = cached
+
+    if missing:
+        missing_doctors = sorted({name for name, _slot_date in missing})
+        schedules = _load_schedules(missing_doctors)
+        bookings = _load_bookings(missing_doctors, from_date, to_date)
+        for name, slot_date in missing:
+            slots = _build_day_slots(schedules.get(name, []), bookings.get((name, str(slot_date)), []), slot_date)
+            frappe.cache().hset(f"{SLOT_CACHE_KEY}:{name}", str(slot_date), slots)
+            result[name][str(slot_date)] = slots
+        _trim_slot_cache(missing_doctors, today)
+
+    # Cached days keep every slot; hide the ones already in the past at response time.
+    now_minutes = to_minutes(nowtime())
+    for slots_by_date in result.values():
+        if str(today) in slots_by_date:
+            slots_by_date[str(today)] = [
+                slot for slot in slots_by_date[str(today)] if to_minutes(slot.split(" - ")[0]) > now_minutes
+            ]
+    return result
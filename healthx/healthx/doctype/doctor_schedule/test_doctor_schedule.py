@@ -1,9 +1,34 @@
 # Copyright (c) 2025, Meghwin Dave and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from healthx.healthx.doctype.doctor_schedule.doctor_schedule import (
+	build_interval_index,
+	compute_free_slots,
+	find_overlaps,
+)
+
 
 class TestDoctorSchedule(FrappeTestCase):
-	pass
+	def test_compute_free_slots_subtracts_bookings(self):
+		# 09:00-11:00 in 30 minute slots, 09:30-10:00 booked and a long booking from 10:15
+		free = compute_free_slots(540, 660, 30, [(570, 600), (615, 700)])
+		self.assertEqual(free, [(540, 570)])
+
+	def test_compute_free_slots_without_bookings(self):
+		self.assertEqual(compute_free_slots(540, 600, 20, []), [(540, 560), (560, 580), (580, 600)])
+
+	def test_find_overlaps_per_weekday(self):
+		schedules = [
+			frappe._dict(name="DS-1", doctor="DOC-1", start_time="09:00:00", end_time="13:00:00", days={"mon", "tue"}),
+			frappe._dict(name="DS-2", doctor="DOC-1", start_time="12:00:00", end_time="15:00:00", days={"tue"}),
+			frappe._dict(name="DS-3", doctor="DOC-1", start_time="13:00:00", end_time="17:00:00", days={"mon"}),
+			frappe._dict(name="DS-4", doctor="DOC-2", start_time="10:00:00", end_time="11:00:00", days={"tue"}),
+		]
+		overlaps = find_overlaps(build_interval_index(schedules))
+		self.assertEqual(len(overlaps), 1)
+		self.assertEqual(overlaps[0]["weekday"], "Tuesday")
+		self.assertEqual((overlaps[0]["schedule"], overlaps[0]["overlapping_schedule"]), ("DS-1", "DS-2"))
+		self.assertEqual(overlaps[0]["overlap"], "12:00 - 13:00")
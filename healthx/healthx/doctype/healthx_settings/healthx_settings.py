@@ -0,0 +1,24 @@
+# Copyright (c) 2025, Meghwin Dave and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+
+class HealthxSettings(Document):
+    def validate(self):
+        for fieldname in ("vitals_retention_days", "alert_log_retention_days"):
+            if self.get(fieldname) and self.get(fieldname) < 7:
+                frappe.throw(_("{0} must be at least 7 days.").format(self.meta.get_label(fieldname)))
+
+    def on_update(self):
+        if self.partition_vitals_reading and self.has_value_changed("partition_vitals_reading"):
+            frappe.enqueue(
+                "healthx.retention.enable_monthly_partitions",
+                queue="long",
+                timeout=6 * 60 * 60,
+                doctype="Vitals Reading",
+                job_id="healthx:partition:Vitals Reading",
+                deduplicate=True,
+            )
@@ -1,6 +1,11 @@
 import frappe
+from frappe import _
 from frappe.model.document import Document
 
+from healthx.analytics import invoice_contribution
+from healthx.billing import get_billing_key, insert_invoice_once
+from healthx.jobs import enqueue_side_effect
+
 class Invoice(Document):
     def validate(self):
         if not self.date:
@@ -15,11 +20,52 @@ class Invoice(Document):
         # Calculate after discount
         self.amount_after_discount = self.total_amount - (self.total_amount * (self.discount or 0) / 100)
 
+    def on_cancel(self):
+        # Free the billing key so the source document can be billed again after a cancellation.
+        if self.billing_key:
+            self.db_set("billing_key", None)
+        enqueue_side_effect(
+            "healthx.analytics.apply_contribution_change",
+            f"invoice_cancel_facts:{self.name}",
+            fact="revenue",
+            before=invoice_contribution(self),
+            after=None,
+        )
+
     def on_submit(self):
-        """When invoice is submitted, mark Clinic Visit as Paid if applicable."""
+        """Queue the revenue facts and, for a visit invoice, marking the Clinic Visit as Paid."""
+        enqueue_side_effect(
+            "healthx.analytics.apply_contribution_change",
+            f"invoice_submit_facts:{self.name}",
+            fact="revenue",
+            before=None,
+            after=invoice_contribution(self),
+        )
         if self.visit:
-            frappe.db.set_value("Clinic Visit", self.visit, "billing_status", "Paid")
-            frappe.msgprint(f"Marked Clinic Visit {self.visit} as Paid.")
+            enqueue_side_effect(
+                "healthx.healthx.doctype.invoice.invoice.mark_visit_paid",
+                f"invoice_submit_visit:{self.name}",
+                invoice=self.name,
+                visit=self.visit,
+                user=frappe.session.user,
+            )
+
+
+def mark_visit_paid(invoice, visit, user=None):
+    """Side effect of Invoice.on_submit; the user is notified once the visit is updated."""
+    # The invoice may have been cancelled before the job ran.
+    if frappe.db.get_value("Invoice", invoice, "docstatus") != 1:
+        return
+    frappe.db.set_value("Clinic Visit", visit, "billing_status", "Paid")
+    frappe.publish_realtime(
+        "msgprint", _("Marked Clinic Visit {0} as Paid.").format(visit), user=user, after_commit=True
+    )
+
+
+def on_doctype_update():
+    # Anti-join lookups in the billing run.
+    frappe.db.add_index("Invoice", ["visit", "docstatus"])
+    frappe.db.add_index("Invoice", ["service_request", "docstatus"])
 
 @frappe.whitelist()
 def create_invoice_from_visit(visit):
@@ -30,7 +76,7 @@ def create_invoice_from_visit(visit):
         frappe.throw("This visit has no linked patient.")
 
     # Check if already has an Invoice
-    existing_invoice = frappe.db.get_value("Invoice", {"visit": visit})
+    existing_invoice = frappe.db.get_value("Invoice", {"visit": visit, "docstatus": ["<", 2]})
     if existing_invoice:
         return existing_invoice
 
@@ -48,9 +94,7 @@ def create_invoice_from_visit(visit):
         "currency": frappe.defaults.get_user_default("currency") or "INR",
         "total_amount": consultation_fees or 0,
         "discount": 0,
-        "payment_status": "Pending"
+        "payment_status": "Pending",
+        "billing_key": get_billing_key("Clinic Visit", visit_doc.name),
     })
-    invoice.insert(ignore_permissions=True)
-    frappe.db.commit()
-
-    return invoice.name
+    return insert_invoice_once(invoice)
@@ -1,6 +1,18 @@
+import base64
+import binascii
+import heapq
+import json
+import re
+from itertools import islice
+
 import frappe
 from frappe.model.document import Document
 from frappe import _
+from frappe.utils import get_datetime
+
+from healthx.patient_search import ensure_search_indexes, get_phone_key, get_search_key
+
+PHONE_PATTERN = re.compile(r"^\+?[0-9]{7,15}$")
 
 class Patient(Document):
 
@@ -11,15 +23,14 @@ class Patient(Document):
         self.validate_email()
         self.validate_date_of_birth()
         self.check_duplicate_phone()
+        self.set_search_keys()
 
     def validate_full_name(self):
         if not self.full_name or len(self.full_name.strip()) < 3:
             frappe.throw(_("Full Name must have at least 3 characters."))
 
     def validate_phone(self):
-        import re
-        pattern = re.compile(r"^\+?[0-9]{7,15}$")
-        if not pattern.match(self.phone_number):
+        if not PHONE_PATTERN.match(self.phone_number or ""):
             frappe.throw(_("Please enter a valid Phone Number (7–15 digits)."))
 
     def validate_email(self):
@@ -39,6 +50,15 @@ class Patient(Document):
         if existing:
             frappe.throw(_("A patient with this phone number already exists: {0}").format(existing))
 
+    def set_search_keys(self):
+        """Keep the normalized keys used by ``healthx.patient_search`` in step with the record."""
+        self.phone_key = get_phone_key(self.phone_number)
+        self.search_key = get_search_key(self.full_name)
+
+
+def on_doctype_update():
+    ensure_search_indexes()
+
 # 💡 Optional custom method: fetch patients by gender or country
 @frappe.whitelist()
 def get_patients_by_filter(gender=None, country=None):
@@ -55,3 +75,164 @@ def get_patients_by_filter(gender=None, country=None):
         fields=["name", "full_name", "gender", "country", "phone_number"]
     )
     return patients
+
+
+MAX_TIMELINE_LIMIT = 200
+# Per source: the expression giving the event time, the indexed columns it is sorted and sought
+# on (``(patient, *seek)`` is indexed; defaults to the time column) and the fields returned.
+TIMELINE_SOURCES = {
+    "Clinic Visit": {
+        "time": "`creation`",
+        "fields": ["doctor", "doctor_name", "visit_type", "consultation_status", "billing_status"],
+    },
+    "Doctor Appointment": {
+        "time": "TIMESTAMP(`date`, `start_time`)",
+        "seek": ["`date`", "`start_time`"],
+        "fields": ["doctor", "date", "start_time", "end_time", "booking_status", "booking_source"],
+    },
+    "Online Consultation": {
+        "time": "`creation`",
+        "fields": ["doctor", "date", "follow_up_date", "escalate_to_senior"],
+    },
+    "Invoice": {
+        "time": "`creation`",
+        "fields": ["date", "total_amount", "amount_after_discount", "payment_status", "visit", "appointment"],
+        "condition": "`docstatus` < 2",
+    },
+    "Vitals Reading": {
+        "time": "`timestamp`",
+        "fields": ["device", "heart_rate", "spo2", "bp", "tempreature", "fall_detected"],
+    },
+    "Alert Log": {
+        "time": "`timestamp_deails`",
+        "fields": ["device", "alert_type", "value", "status"],
+    },
+}
+
+
+def _encode_timeline_cursor(entry):
+    payload = json.dumps([str(entry["timestamp"]), entry["doctype"], entry["name"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_timeline_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, doctype, name = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return get_datetime(timestamp), doctype, name
+    except (TypeError, ValueError, binascii.Error):
+        frappe.throw(_("Invalid cursor."))
+
+
+def _split_time(value, columns):
+    """Values of the seek ``columns`` for a timestamp: itself, or its date and time."""
+    return (value,) if len(columns) == 1 else (value.date(), value.time())
+
+
+def _seek_condition(columns, param, direction="<", inclusive=False):
+    """SQL for ``columns`` sorting before (``<``) or after (``>``) the ``<param>_<n>`` values.
+
+    Spelled out as OR'ed prefix comparisons rather than a row comparison so the index is used;
+    ``inclusive`` also accepts rows equal to the values.
+    """
+    clauses = []
+    for position, column in enumerate(columns):
+        operator = direction + ("=" if inclusive and position == len(columns) - 1 else "")
+        equal = [f"{previous} = %({param}_{index})s" for index, previous in enumerate(columns[:position])]
+        clauses.append(" AND ".join([*equal, f"{column} {operator} %({param}_{position})s"]))
+    return "(" + " OR ".join(f"({clause})" for clause in clauses) + ")"
+
+
+def _fetch_timeline_source(doctype, patient, since, cursor, limit):
+    """One indexed query per source: newest first, continuing strictly after the cursor position.
+
+    The merged order is (timestamp, doctype, name) descending, so at the cursor timestamp a
+    source is either entirely before the cursor, entirely after it, or seeks on name.
+    """
+    source = TIMELINE_SOURCES[doctype]
+    time_expr = source["time"]
+    seek = source.get("seek") or [time_expr]
+    conditions = ["`patient` = %(patient)s", *(f"{column} IS NOT NULL" for column in seek)]
+    values = {"patient": patient, "limit": limit}
+    if source.get("condition"):
+        conditions.append(source["condition"])
+    if since:
+        values.update({f"since_{index}": value for index, value in enumerate(_split_time(since, seek))})
+        conditions.append(_seek_condition(seek, "since", ">", inclusive=True))
+    if cursor:
+        cursor_time, cursor_doctype, cursor_name = cursor
+        values.update({f"seek_{index}": value for index, value in enumerate(_split_time(cursor_time, seek))})
+        if doctype < cursor_doctype:
+            conditions.append(_seek_condition(seek, "seek", inclusive=True))
+        elif doctype > cursor_doctype:
+            conditions.append(_seek_condition(seek, "seek"))
+        else:
+            values[f"seek_{len(seek)}"] = cursor_name
+            conditions.append(_seek_condition([*seek, "`name`"], "seek"))
+
+    fields = ", ".join(f"`{field}`" for field in source["fields"])
+    rows = frappe.db.sql(
+        f"""
+        SELECT `name`, {time_expr} AS `timestamp`, {fields}
+        FROM `tab{doctype}`
+        WHERE {" AND ".join(conditions)}
+        ORDER BY {", ".join(f"{column} DESC" for column in seek)}, `name` DESC
+        LIMIT %(limit)s
+        """,
+        values,
+        as_dict=True,
+    )
+    for row in rows:
+        row.doctype = doctype
+        row.timestamp = get_datetime(row.timestamp)
+    return rows
+
+
+def _attach_prescriptions(entries):
+    consultations = {entry.name: entry for entry in entries if entry.doctype == "Online Consultation"}
+    if not consultations:
+        return
+    items = frappe.get_all(
+        "E-Prescription Item",
+        filters={"parenttype": "Online Consultation", "parent": ["in", list(consultations)]},
+        fields=["parent", "drug_name", "dosage", "frequency", "duration", "remarks"],
+        order_by="idx asc",
+    )
+    for entry in consultations.values():
+        entry.prescription = []
+    for item in items:
+        consultations[item.pop("parent")].prescription.append(item)
+
+
+@frappe.whitelist()
+def get_patient_timeline(patient, since=None, limit=50, cursor=None):
+    """Return one page of a patient's visits, appointments, consultations, invoices, vitals and alerts.
+
+    Each source is read with a single query limited to the page size, the sorted results are
+    combined with a k-way heap merge on (timestamp, doctype, name), and ``next_cursor`` resumes
+    the timeline after the last entry returned.
+    """
+    frappe.has_permission("Patient", "read", doc=patient, throw=True)
+    limit = max(1, min(int(limit or 50), MAX_TIMELINE_LIMIT))
+    since = get_datetime(since) if since else None
+    position = _decode_timeline_cursor(cursor) if cursor else None
+
+    sources = []
+    for doctype in TIMELINE_SOURCES:
+        if not frappe.has_permission(doctype, "read"):
+            continue
+        # One extra row per source tells us whether anything remains after this page.
+        sources.append(_fetch_timeline_source(doctype, patient, since, position, limit + 1))
+
+    merged = heapq.merge(
+        *sources, key=lambda entry: (entry.timestamp, entry.doctype, entry.name), reverse=True
+    )
+    entries = list(islice(merged, limit + 1))
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    _attach_prescriptions(entries)
+
+    return {
+        "entries": entries,
+        "next_cursor": _encode_timeline_cursor(entries[-1]) if has_more else None,
+    }
@@ -1,9 +1,104 @@
 # Copyright (c) 2025, Meghwin Dave and Contributors
 # See license.txt
 
-# import frappe
+from datetime import datetime, timedelta
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from healthx.healthx.doctype.patient.patient import get_patient_timeline
+from healthx.patient_search import get_phone_key, get_search_key, rank_candidates
+
+TIMELINE_PATIENT = "TEST-TIMELINE-PATIENT"
+TIMELINE_TIME = datetime(2001, 1, 1, 9, 0)
+
+
+def insert_timeline_event(doctype, name, timestamp):
+	# Raw insert: the timeline reads the tables directly and the Device links are not needed.
+	time_field = "timestamp_deails" if doctype == "Alert Log" else "timestamp"
+	frappe.db.sql(
+		f"""
+		INSERT INTO `tab{doctype}` (name, creation, modified, owner, modified_by, docstatus, patient,
+			`{time_field}`)
+		VALUES (%s, NOW(), NOW(), 'Administrator', 'Administrator', 0, %s, %s)
+		""",
+		(name, TIMELINE_PATIENT, timestamp),
+	)
+
 
 class TestPatient(FrappeTestCase):
-	pass
+	def test_search_keys_are_normalized(self):
+		self.assertEqual(get_phone_key("+91 98765-43210"), "9876543210")
+		self.assertEqual(get_phone_key("9876543210"), "9876543210")
+		self.assertEqual(get_search_key("  José  O'Brien "), "jose o brien")
+
+	def test_rank_candidates_prefers_prefix_then_words_then_spelling(self):
+		candidates = [
+			frappe._dict(name="P-3", search_key="mary johnson"),
+			frappe._dict(name="P-1", search_key="john smith"),
+			frappe._dict(name="P-2", search_key="johan smythe"),
+			frappe._dict(name="P-4", search_key="peter parker"),
+		]
+		ranked = rank_candidates("john", candidates, 10)
+		self.assertEqual([row.name for row in ranked], ["P-1", "P-3", "P-2"])
+
+	def test_validate_chunk_rejects_invalid_and_duplicate_rows(self):
+		from healthx.patient_import import validate_chunk
+
+		columns = {"full_name": 0, "gender": 1, "phone_number": 2, "email": 3, "date_of_birth": 4}
+		rows = [
+			["Asha Rao", "Female", "+919876543210", "asha@example.com", "1990-04-01"],
+			["Al", "Male", "12345", "not-an-email", "2999-01-01"],
+			["Ravi Kumar", "Male", "9876543210", "", ""],
+			["Meera Shah", "Female", "9123456789", "", "1985-12-31 00:00:00"],
+			["Old Patient", "Other", "+447000000001", "", ""],
+			["Meera Again", "Female", "9123456789", "", ""],
+			["Late Entry", "Female", "9000000001", "late @example.com", ""],
+		]
+		# Duplicates are matched on the stored phone number, as Patient.check_duplicate_phone does.
+		known = {"+447000000001"}
+		records, rejects = validate_chunk(rows, columns, known, countries=set(), languages=set())
+
+		self.assertEqual([record["full_name"] for record in records], ["Asha Rao", "Ravi Kumar", "Meera Shah"])
+		self.assertEqual(records[0]["phone_key"], "9876543210")
+		self.assertEqual(str(records[2]["date_of_birth"]), "1985-12-31")
+		self.assertEqual([index for index, _errors in rejects], [1, 4, 5, 6])
+		self.assertEqual(len(rejects[0][1]), 4)
+		self.assertEqual(rejects[2][1], ["A patient with this phone number already exists."])
+		self.assertEqual(rejects[3][1], ["Invalid email address."])
+		self.assertIn("9123456789", known)
+
+	def test_timeline_pages_across_sources_with_equal_timestamps(self):
+		self.insert_timeline()
+		expected = ["TEST-TL-VR-2", "TEST-TL-VR-1", "TEST-TL-AL-1", "TEST-TL-VR-3"]
+
+		page = get_patient_timeline(TIMELINE_PATIENT, limit=50)
+		self.assertEqual([entry.name for entry in page["entries"]], expected)
+		self.assertIsNone(page["next_cursor"])
+
+		# One entry per page: the cursor must step through the tie at TIMELINE_TIME without
+		# skipping or repeating rows from either source.
+		names, cursor = [], None
+		for _page in range(len(expected) + 1):
+			page = get_patient_timeline(TIMELINE_PATIENT, limit=1, cursor=cursor)
+			names.extend(entry.name for entry in page["entries"])
+			cursor = page["next_cursor"]
+			if not cursor:
+				break
+		self.assertEqual(names, expected)
+
+	def test_timeline_since_excludes_older_entries(self):
+		self.insert_timeline()
+		page = get_patient_timeline(TIMELINE_PATIENT, since=str(TIMELINE_TIME), limit=50)
+		self.assertEqual(
+			[entry.name for entry in page["entries"]], ["TEST-TL-VR-2", "TEST-TL-VR-1", "TEST-TL-AL-1"]
+		)
+		self.assertIsNone(page["next_cursor"])
+
+	def insert_timeline(self):
+		for doctype in ("Vitals Reading", "Alert Log"):
+			frappe.db.delete(doctype, {"patient": TIMELINE_PATIENT})
+		insert_timeline_event("Vitals Reading", "TEST-TL-VR-1", TIMELINE_TIME)
+		insert_timeline_event("Vitals Reading", "TEST-TL-VR-2", TIMELINE_TIME)
+		insert_timeline_event("Alert Log", "TEST-TL-AL-1", TIMELINE_TIME)
+		insert_timeline_event("Vitals Reading", "TEST-TL-VR-3", TIMELINE_TIME - timedelta(hours=1))
@@ -25,6 +25,13 @@ class QueueToken(Document):
         if self.status and self.status not in ["Waiting", "In-Progress", "Completed"]:
             frappe.throw(_("Invalid Status."))
 
+    def on_update(self):
+        """Push the token change to clients watching this doctor's queue."""
+        publish_queue_delta(self)
+
+    def on_trash(self):
+        publish_queue_delta(self, removed=True)
+
     def set_token_number(self):
         """Generate sequential token per date and priority (Emergency vs Normal)."""
         if self.token_number:
@@ -34,40 +41,103 @@ class QueueToken(Document):
         if not self.date:
             self.date = frappe.utils.nowdate()
 
-        # Use DB transaction lock to prevent race conditions
-        frappe.db.sql("LOCK TABLE `tabQueue Token` WRITE")
-
-        try:
-            if self.priority == "Emergency":
-                # Get current max Emergency token for this date
-                last_token = frappe.db.sql(
-                    """
-                    SELECT MAX(CAST(SUBSTRING(token_number, 2) AS UNSIGNED))
-                    FROM `tabQueue Token`
-                    WHERE date = %s AND priority = 'Emergency'
-                    """,
-                    (self.date,),
-                )[0][0]
-                next_token = (last_token or 0) + 1
-                self.token_number = f"E{next_token}"
-
-            else:
-                # Get current max Normal token for this date
-                last_token = frappe.db.sql(
-                    """
-                    SELECT MAX(CAST(token_number AS UNSIGNED))
-                    FROM `tabQueue Token`
-                    WHERE date = %s AND (priority IS NULL OR priority = 'Normal')
-                    """,
-                    (self.date,),
-                )[0][0]
-                next_token = (last_token or 0) + 1
-                self.token_number = str(next_token)
-
-        finally:
-            frappe.db.sql("UNLOCK TABLES")
+        priority = "Emergency" if self.priority == "Emergency" else "Normal"
+        next_token = allocate_token_number(self.date, priority)
+        self.token_number = f"E{next_token}" if priority == "Emergency" else str(next_token)
+
+
+def on_doctype_update():
+    # Token numbering per date and priority, and each doctor's queue refresh.
+    frappe.db.add_index("Queue Token", ["date", "priority"])
+    frappe.db.add_index("Queue Token", ["doctor", "date", "status"])
+
+
+def allocate_token_number(date, priority="Normal"):
+    """Atomically take the next token number for a (date, priority) sequence.
+
+    The sequence lives in one ``Queue Token Counter`` row per date and priority, incremented
+    with ``INSERT ... ON DUPLICATE KEY UPDATE`` so only that row is locked instead of the whole
+    Queue Token table. LAST_INSERT_ID carries the new value back on the same connection.
+    """
+    counter = f"{date}-{priority}"
+    seed = 1
+    if not frappe.db.exists("Queue Token Counter", counter):
+        # First token of the day (or first since the counter table was introduced):
+        # continue from tokens that were already issued for this date.
+        seed = (_get_max_issued_token(date, priority) or 0) + 1
+
+    now = frappe.utils.now()
+    frappe.db.sql(
+        """
+        INSERT INTO `tabQueue Token Counter`
+            (name, date, priority, last_value, creation, modified, owner, modified_by)
+        VALUES (%(name)s, %(date)s, %(priority)s, LAST_INSERT_ID(%(seed)s), %(now)s, %(now)s, %(user)s, %(user)s)
+        ON DUPLICATE KEY UPDATE last_value = LAST_INSERT_ID(last_value + 1), modified = %(now)s
+        """,
+        {"name": counter, "date": date, "priority": priority, "seed": seed, "now": now, "user": frappe.session.user},
+    )
+    return frappe.db.sql("SELECT LAST_INSERT_ID()")[0][0]
+
+
+def _get_max_issued_token(date, priority):
+    if priority == "Emergency":
+        return frappe.db.sql(
+            """
+            SELECT MAX(CAST(SUBSTRING(token_number, 2) AS UNSIGNED))
+            FROM `tabQueue Token`
+            WHERE date = %s AND priority = 'Emergency'
+            """,
+            (date,),
+        )[0][0]
+
+    return frappe.db.sql(
+        """
+        SELECT MAX(CAST(token_number AS UNSIGNED))
+        FROM `tabQueue Token`
+        WHERE date = %s AND (priority IS NULL OR priority = 'Normal')
+        """,
+        (date,),
+    )[0][0]
+
+QUEUE_FIELDS = ("name", "token_number", "date", "visit", "priority", "status")
+
+
+def publish_queue_delta(token, removed=False):
+    """Emit a compact ``queue_token_update`` event to the doctor's realtime room.
+
+    Clients subscribe to the Doctor document room, load ``get_queue_snapshot`` once and then
+    apply these deltas instead of polling the Queue Token table.
+    """
+    delta = {field: str(token.get(field) or "") for field in QUEUE_FIELDS}
+    delta["removed"] = removed
+    frappe.publish_realtime(
+        "queue_token_update",
+        delta,
+        doctype="Doctor",
+        docname=token.doctor,
+        after_commit=True,
+    )
+
 
 @frappe.whitelist()
+def get_queue_snapshot(doctor, date=None):
+    """Return a doctor's queue for a date in serving order (Emergency tokens first)."""
+    frappe.has_permission("Queue Token", "read", throw=True)
+    date = date or frappe.utils.nowdate()
+    tokens = frappe.db.sql(
+        """
+        SELECT name, token_number, date, visit, priority, status
+        FROM `tabQueue Token`
+        WHERE doctor = %s AND date = %s
+        ORDER BY (priority = 'Emergency') DESC, creation ASC
+        """,
+        (doctor, date),
+        as_dict=True,
+    )
+    return {"doctor": doctor, "date": date, "tokens": tokens, "as_of": frappe.utils.now()}
+
+
+@frappe.whitelist(methods=["POST"])
 def create_token_for_visit(visit, doctor):
     """Create a Queue Token for a given Clinic Visit."""
     visit_doc = frappe.get_doc("Clinic Visit", visit)
@@ -80,8 +150,8 @@ def create_token_for_visit(visit, doctor):
         "priority": "Normal",  # Default, can be changed later
         "status": "Waiting"
     })
+    # The request commits on return; the queue delta is published after that commit.
     token.insert()
-    frappe.db.commit()
 
     return token.name
 
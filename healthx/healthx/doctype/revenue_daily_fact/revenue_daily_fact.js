@@ -0,0 +1,8 @@
+// Copyright (c) 2025, Meghwin Dave and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Revenue Daily Fact", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -0,0 +1,68 @@
+# Copyright (c) 2025, Meghwin Dave and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from healthx.analytics import _fact_name, apply_contribution_change, invoice_contribution, rebuild_facts
+
+FACT_DATE = "2001-01-01"
+
+
+def insert_invoice(name, payment_mode, amount, payment_status="Paid"):
+	# Raw insert: only the source row is wanted here, not the Invoice hooks.
+	frappe.db.sql(
+		"""
+		INSERT INTO `tabInvoice` (name, creation, modified, owner, modified_by, docstatus, `date`,
+			currency, payment_mode, total_amount, amount_after_discount, payment_status)
+		VALUES (%s, NOW(), NOW(), 'Administrator', 'Administrator', 1, %s, 'INR', %s, %s, %s, %s)
+		""",
+		(name, FACT_DATE, payment_mode, amount, amount, payment_status),
+	)
+
+
+def get_fact(payment_mode):
+	return frappe.db.get_value(
+		"Revenue Daily Fact",
+		_fact_name(FACT_DATE, [payment_mode, "INR"]),
+		["invoice_count", "invoiced_amount", "paid_count", "paid_amount"],
+		as_dict=True,
+	)
+
+
+class TestRevenueDailyFact(FrappeTestCase):
+	def setUp(self):
+		frappe.db.delete("Invoice", {"date": FACT_DATE})
+		frappe.db.delete("Revenue Daily Fact", {"date": FACT_DATE})
+
+	def test_rebuild_merges_null_and_empty_dimensions(self):
+		insert_invoice("TEST-FACT-INV-1", None, 100)
+		insert_invoice("TEST-FACT-INV-2", "", 50, "Pending")
+
+		rebuild_facts("revenue", FACT_DATE, FACT_DATE)
+
+		fact = get_fact("")
+		self.assertEqual(fact.invoice_count, 2)
+		self.assertEqual(fact.invoiced_amount, 150)
+		self.assertEqual(fact.paid_count, 1)
+		self.assertEqual(fact.paid_amount, 100)
+
+	def test_upserts_accumulate_and_agree_with_rebuild(self):
+		insert_invoice("TEST-FACT-INV-3", "Cash", 80)
+		insert_invoice("TEST-FACT-INV-4", "Cash", 20, "Pending")
+		paid = frappe._dict(
+			date=FACT_DATE, payment_mode="Cash", currency="INR", amount_after_discount=80, payment_status="Paid"
+		)
+		pending = frappe._dict(paid, amount_after_discount=20, payment_status="Pending")
+
+		apply_contribution_change("revenue", None, invoice_contribution(paid))
+		apply_contribution_change("revenue", None, invoice_contribution(pending))
+		upserted = get_fact("Cash")
+		self.assertEqual((upserted.invoice_count, upserted.invoiced_amount), (2, 100))
+		self.assertEqual((upserted.paid_count, upserted.paid_amount), (1, 80))
+
+		rebuild_facts("revenue", FACT_DATE, FACT_DATE)
+		self.assertEqual(get_fact("Cash"), upserted)
+
+		apply_contribution_change("revenue", invoice_contribution(pending), None)
+		self.assertEqual(get_fact("Cash").invoice_count, 1)
@@ -1,34 +1,41 @@
 import frappe
+from frappe import _
 from frappe.model.document import Document
 
+from healthx.billing import get_billing_key, get_default_currency, insert_invoice_once
+from healthx.jobs import enqueue_side_effect
+
 class ServiceRequest(Document):
     pass
 
 
 @frappe.whitelist()
-def create_invoice(service_request, patient):
-    """Create an Invoice from a Service Request"""
+def create_invoice(service_request, patient=None):
+    """Create an Invoice from a Service Request, or return the one that already bills it."""
     sr = frappe.get_doc("Service Request", service_request)
+    patient = patient or sr.patient
+    if not patient:
+        frappe.throw(_("Set the Patient on the Service Request before invoicing it."))
+
+    existing_invoice = frappe.db.get_value("Invoice", {"service_request": sr.name, "docstatus": ["<", 2]})
+    if existing_invoice:
+        return existing_invoice
 
-    existing_invoice = frappe.db.exists("Invoice", {"service_request": sr.name})
-    
     invoice = frappe.new_doc("Invoice")
     invoice.patient = patient
     invoice.date = frappe.utils.nowdate()
-    invoice.total_amount = sr.base_rate or 0
+    invoice.total_amount = sr.base_rate or frappe.db.get_value("Home Service", sr.service_type, "base_rate") or 0
     invoice.payment_status = "Pending"
     invoice.payment_mode = "Cash"
-    invoice.currency = frappe.defaults.get_global_default("currency") or "INR"
+    invoice.currency = get_default_currency()
     invoice.service_request = sr.name
-    invoice.insert(ignore_permissions=True)
-    frappe.db.commit()
-
-    return invoice.name
+    invoice.billing_key = get_billing_key("Service Request", sr.name)
+    return insert_invoice_once(invoice)
 
 
-@frappe.whitelist()
+@frappe.whitelist(methods=["POST"])
 def create_home_report(service_request, doctor, findings, recommendations=None):
-    """Create a Home Report linked to the Service Request"""
+    """Create a Home Report linked to the Service Request; its PDF is attached in the background."""
     sr = frappe.get_doc("Service Request", service_request)
 
     home_report = frappe.new_doc("Home Report")
@@ -37,6 +44,34 @@ def create_home_report(service_request, doctor, findings, recommendations=None):
     home_report.findings = findings
     home_report.recommendations = recommendations or ""
     home_report.insert(ignore_permissions=True)
-    frappe.db.commit()
+    enqueue_side_effect(
+        "healthx.healthx.doctype.service_request.service_request.attach_home_report_pdf",
+        f"home_report_pdf:{home_report.name}",
+        home_report=home_report.name,
+        user=frappe.session.user,
+    )
 
     return home_report.name
+
+
+def attach_home_report_pdf(home_report, user=None):
+    """Render the Home Report's print view to PDF and attach it to the report."""
+    file_name = f"{home_report}.pdf"
+    if frappe.db.exists(
+        "File", {"attached_to_doctype": "Home Report", "attached_to_name": home_report, "file_name": file_name}
+    ):
+        return
+    pdf = frappe.attach_print("Home Report", home_report, file_name=home_report)
+    frappe.get_doc(
+        {
+            "doctype": "File",
+            "file_name": file_name,
+            "attached_to_doctype": "Home Report",
+            "attached_to_name": home_report,
+            "is_private": 1,
+            "content": pdf["fcontent"],
+        }
+    ).insert(ignore_permissions=True)
+    frappe.publish_realtime(
+        "home_report_pdf_ready", {"home_report": home_report, "file_name": file_name}, user=user, after_commit=True
+    )
@@ -0,0 +1,30 @@
+# Copyright (c) 2025, Meghwin Dave and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from healthx.analytics import apply_contribution_change, visit_contribution
+
+
+class TestVisitDailyFact(FrappeTestCase):
+	def test_status_change_on_same_row_is_netted(self):
+		before = frappe._dict(creation="2025-11-20 10:00:00", doctor="DOC-1", consultation_status="Waiting")
+		after = frappe._dict(before, consultation_status="Completed")
+		with patch("healthx.analytics.add_to_facts") as add_to_facts:
+			apply_contribution_change("visits", visit_contribution(before), visit_contribution(after))
+		(fact, rows), _kwargs = add_to_facts.call_args
+		self.assertEqual(fact, "visits")
+		self.assertEqual(len(rows), 1)
+		self.assertEqual(rows[0][2], {"visit_count": 0, "completed_count": 1})
+
+	def test_doctor_change_moves_the_visit(self):
+		before = frappe._dict(creation="2025-11-20 10:00:00", doctor="DOC-1", consultation_status="Completed")
+		after = frappe._dict(before, doctor="DOC-2")
+		with patch("healthx.analytics.add_to_facts") as add_to_facts:
+			apply_contribution_change("visits", visit_contribution(before), visit_contribution(after))
+		rows = add_to_facts.call_args[0][1]
+		self.assertEqual([row[1]["doctor"] for row in rows], ["DOC-1", "DOC-2"])
+		self.assertEqual([row[2]["visit_count"] for row in rows], [-1, 1])
@@ -1,9 +1,92 @@
 # Copyright (c) 2025, Meghwin Dave and Contributors
 # See license.txt
 
-# import frappe
+from datetime import datetime
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from healthx.healthx.doctype.vitals_reading.vitals_reading import (
+	insert_readings,
+	parse_battery_level,
+	validate_readings,
+)
+
+DEFAULT_TIMESTAMP = datetime(2025, 11, 20, 10, 0)
+
 
 class TestVitalsReading(FrappeTestCase):
-	pass
+	def test_valid_readings_are_normalised(self):
+		records, rejected = validate_readings(
+			[
+				{"heart_rate": "72", "spo2": 98.5, "bp": "120/80", "temperature": "36.6", "timestamp": "2025-11-20 09:30:00"},
+				{"fall_detected": True},
+			],
+			DEFAULT_TIMESTAMP,
+		)
+		self.assertEqual(rejected, [])
+		self.assertEqual(
+			records[0],
+			{
+				"heart_rate": 72,
+				"spo2": 98.5,
+				"bp": "120/80",
+				"tempreature": 36.6,
+				"fall_detected": 0,
+				"timestamp": datetime(2025, 11, 20, 9, 30),
+			},
+		)
+		self.assertEqual(records[1]["fall_detected"], 1)
+		self.assertEqual(records[1]["timestamp"], DEFAULT_TIMESTAMP)
+
+	def test_invalid_rows_are_rejected_with_their_index(self):
+		records, rejected = validate_readings(
+			[
+				{"heart_rate": 80},
+				"not a reading",
+				{"heart_rate": "fast"},
+				{"spo2": 140},
+				{"bp": "120-80"},
+				{"timestamp": "yesterday-ish"},
+				{"bp": ""},
+				{"tempreature": 37.0},
+			],
+			DEFAULT_TIMESTAMP,
+		)
+		self.assertEqual(len(records), 2)
+		self.assertEqual(records[1]["tempreature"], 37.0)
+		self.assertEqual(
+			rejected,
+			[
+				{"index": 1, "error": "reading must be an object"},
+				{"index": 2, "error": "invalid or out of range value"},
+				{"index": 3, "error": "invalid or out of range value"},
+				{"index": 4, "error": "invalid or out of range value"},
+				{"index": 5, "error": "invalid or out of range value"},
+				{"index": 6, "error": "reading has no vitals"},
+			],
+		)
+
+	def test_battery_level_must_be_a_percentage(self):
+		self.assertIsNone(parse_battery_level(""))
+		self.assertEqual(parse_battery_level("80"), 80)
+		for value in ("full", "150", "-1"):
+			with self.assertRaises(frappe.ValidationError):
+				parse_battery_level(value)
+
+	def test_batch_with_a_missing_metric_is_inserted(self):
+		records, rejected = validate_readings(
+			[{"heart_rate": 72, "spo2": 97}, {"spo2": 95, "tempreature": 36.8}], DEFAULT_TIMESTAMP
+		)
+		self.assertEqual(rejected, [])
+
+		names = insert_readings("_Test Sparse Device", None, records)
+		rows = frappe.get_all(
+			"Vitals Reading",
+			filters={"name": ["in", names]},
+			fields=["heart_rate", "spo2", "tempreature"],
+			order_by="name asc",
+		)
+		self.assertEqual(
+			[(row.heart_rate, row.spo2, row.tempreature) for row in rows], [(72, 97, 0), (0, 95, 36.8)]
+		)
@@ -1,9 +1,273 @@
 # Copyright (c) 2025, Meghwin Dave and contributors
 # For license information, please see license.txt
 
-# import frappe
+import json
+
+import frappe
+import numpy as np
+from frappe import _
 from frappe.model.document import Document
+from frappe.utils import get_datetime, now_datetime
+
+from healthx.healthx.doctype.alert_log.alert_log import raise_alerts_for_readings
+from healthx.healthx.doctype.vitals_rollup.vitals_rollup import rollup_readings
+from healthx.utils import reserve_names
+
+MAX_INGEST_BATCH = 5000
+SERIES_PREFIX = "VR-"
+INSERT_FIELDS = (
+    "name",
+    "naming_series",
+    "creation",
+    "modified",
+    "owner",
+    "modified_by",
+    "docstatus",
+    "idx",
+    "device",
+    "patient",
+    "heart_rate",
+    "spo2",
+    "bp",
+    "tempreature",
+    "fall_detected",
+    "timestamp",
+)
 
 
 class VitalsReading(Document):
-	pass
+    def after_insert(self):
+        """Keep rollups current for readings saved one at a time (desk or /api/resource)."""
+        record = {
+            "heart_rate": self.heart_rate or None,
+            "spo2": self.spo2 or None,
+            "tempreature": self.tempreature or None,
+            "fall_detected": self.fall_detected,
+            "timestamp": self.timestamp or self.creation,
+        }
+        rollup_readings(self.device, self.patient, [record])
+
+
+def on_doctype_update():
+    # Per-patient vitals history ordered by time.
+    frappe.db.add_index("Vitals Reading", ["patient", "timestamp"])
+
+
+def _parse_batch(readings):
+    """Accept a list, a JSON array string or NDJSON (one reading per line)."""
+    if readings is None and getattr(frappe.local, "request", None) is not None:
+        readings = frappe.request.get_data(as_text=True)
+
+    if isinstance(readings, (list, tuple)):
+        return list(readings)
+
+    text = (readings or "").strip()
+    if not text:
+        return []
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def _object_column(rows, *keys):
+    """One field of every row as an object array; later ``keys`` are fallbacks for missing ones."""
+    column = np.empty(len(rows), dtype=object)
+    column[:] = [next((row[key] for key in keys if key in row), None) for row in rows]
+    return column
+
+
+def _blank_mask(column):
+    return (column == None) | (column == "")  # noqa: E711 - element-wise comparison
+
+
+def _numeric_column(column, low, high):
+    """Return ``(values, bad)``: float64 values (NaN when blank) and a mask of invalid cells."""
+    blank = _blank_mask(column)
+    column = column.copy()
+    column[blank] = np.nan
+    try:
+        values = column.astype(float)
+    except (TypeError, ValueError):
+        # Only a batch with an unparseable cell takes the per-cell path.
+        values = np.array([_to_float(value) for value in column], dtype=float)
+    bad = ~blank & (np.isnan(values) | (values < low) | (values > high))
+    return values, bad
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _bp_column(column):
+    """Return ``(text, bad)`` for "systolic/diastolic" blood pressure strings."""
+    blank = _blank_mask(column)
+    column = column.copy()
+    column[blank] = ""
+    text = column.astype(str)
+    parts = np.char.partition(text, "/")
+    systolic, separator, diastolic = parts[:, 0], parts[:, 1], parts[:, 2]
+    well_formed = (separator == "/") & np.char.isdigit(systolic) & np.char.isdigit(diastolic)
+    for part in (systolic, diastolic):
+        length = np.char.str_len(part)
+        well_formed &= (length >= 2) & (length <= 3)
+    return text, ~blank & ~well_formed
+
+
+def _timestamp_column(column, default_timestamp):
+    """Return ``(timestamps, bad)`` as datetime64 values; blank cells take ``default_timestamp``."""
+    column = column.copy()
+    column[_blank_mask(column)] = default_timestamp
+    try:
+        timestamps = column.astype("datetime64[us]")
+    except (TypeError, ValueError):
+        timestamps = np.array([_to_datetime64(value) for value in column], dtype="datetime64[us]")
+    return timestamps, np.isnat(timestamps)
+
+
+def _to_datetime64(value):
+    try:
+        parsed = get_datetime(value)
+    except Exception:
+        parsed = None
+    return np.datetime64(parsed, "us") if parsed else np.datetime64("NaT")
+
+
+def validate_readings(raw_readings, default_timestamp=None):
+    """Validate a batch as NumPy columns and boolean masks; return ``(records, rejected)``.
+
+    Each record holds the normalised vitals columns; each rejection is ``{"index", "error"}``.
+    Temperature is accepted as either ``temperature`` or the stored ``tempreature`` key.
+    """
+    if not raw_readings:
+        return [], []
+
+    default_timestamp = default_timestamp or now_datetime()
+    is_object = np.array([isinstance(raw, dict) for raw in raw_readings], dtype=bool)
+    rows = [raw if isinstance(raw, dict) else {} for raw in raw_readings]
+
+    heart_rate, bad_heart_rate = _numeric_column(_object_column(rows, "heart_rate"), 0, 300)
+    spo2, bad_spo2 = _numeric_column(_object_column(rows, "spo2"), 0, 100)
+    temperature, bad_temperature = _numeric_column(_object_column(rows, "temperature", "tempreature"), 25, 45)
+    bp, bad_bp = _bp_column(_object_column(rows, "bp"))
+    fall_text = np.char.lower(_object_column(rows, "fall_detected").astype(str))
+    fall_detected = np.isin(fall_text, ("1", "true"))
+    timestamps, bad_timestamp = _timestamp_column(_object_column(rows, "timestamp"), default_timestamp)
+
+    invalid = is_object & (bad_heart_rate | bad_spo2 | bad_temperature | bad_bp | bad_timestamp)
+    no_vitals = (
+        is_object
+        & ~invalid
+        & np.isnan(heart_rate)
+        & np.isnan(spo2)
+        & np.isnan(temperature)
+        & (bp == "")
+        & ~fall_detected
+    )
+    accepted = is_object & ~invalid & ~no_vitals
+
+    rejected = [{"index": int(index), "error": "reading must be an object"} for index in np.flatnonzero(~is_object)]
+    rejected += [{"index": int(index), "error": "invalid or out of range value"} for index in np.flatnonzero(invalid)]
+    rejected += [{"index": int(index), "error": "reading has no vitals"} for index in np.flatnonzero(no_vitals)]
+    rejected.sort(key=lambda rejection: rejection["index"])
+
+    timestamp_values = timestamps.tolist()
+    records = [
+        {
+            "heart_rate": None if np.isnan(heart_rate[index]) else int(heart_rate[index]),
+            "spo2": None if np.isnan(spo2[index]) else float(spo2[index]),
+            "bp": bp[index] or None,
+            "tempreature": None if np.isnan(temperature[index]) else float(temperature[index]),
+            "fall_detected": int(fall_detected[index]),
+            "timestamp": timestamp_values[index],
+        }
+        for index in np.flatnonzero(accepted)
+    ]
+    return records, rejected
+
+
+def parse_battery_level(battery_level):
+    """Return the battery level as an int from 0 to 100, None when not sent."""
+    if battery_level in (None, ""):
+        return None
+    try:
+        level = int(battery_level)
+    except (TypeError, ValueError):
+        level = None
+    if level is None or not 0 <= level <= 100:
+        frappe.throw(_("Battery level must be a whole number between 0 and 100."))
+    return level
+
+
+def insert_readings(device, patient, records):
+    """Write validated records with one multi-row INSERT and return the generated names."""
+    if not records:
+        return []
+
+    names = reserve_names(SERIES_PREFIX, len(records))
+    now = now_datetime()
+    user = frappe.session.user
+    # The Int/Float columns are NOT NULL, so a metric the device did not send is stored as 0 (as
+    # in the rollups); a NULL would fail the whole multi-row INSERT under strict mode.
+    values = [
+        (
+            name,
+            SERIES_PREFIX,
+            now,
+            now,
+            user,
+            user,
+            0,
+            0,
+            device,
+            patient,
+            record["heart_rate"] or 0,
+            record["spo2"] or 0,
+            record["bp"],
+            record["tempreature"] or 0,
+            record["fall_detected"],
+            record["timestamp"],
+        )
+        for name, record in zip(names, records, strict=True)
+    ]
+    frappe.db.bulk_insert("Vitals Reading", INSERT_FIELDS, values, chunk_size=MAX_INGEST_BATCH)
+    return names
+
+
+@frappe.whitelist(methods=["POST"])
+def ingest_vitals(device, readings=None, battery_level=None):
+    """Ingest a batch of wearable readings for one Device in a single write.
+
+    ``readings`` is a JSON array or NDJSON; when omitted the request body is read as NDJSON.
+    Invalid rows are skipped and reported, rollups are updated, threshold breaches raise
+    Alert Logs, and the Device's sync time and battery level are updated once per batch.
+    """
+    frappe.has_permission("Vitals Reading", "create", throw=True)
+    battery_level = parse_battery_level(battery_level)
+
+    device_row = frappe.db.get_value("Device", device, ["name", "patient"], as_dict=True)
+    if not device_row:
+        frappe.throw(_("Device {0} does not exist.").format(device))
+
+    try:
+        raw_readings = _parse_batch(readings)
+    except (TypeError, ValueError):
+        frappe.throw(_("Readings must be a JSON array or NDJSON."))
+
+    if len(raw_readings) > MAX_INGEST_BATCH:
+        frappe.throw(_("At most {0} readings can be ingested per call.").format(MAX_INGEST_BATCH))
+
+    records, rejected = validate_readings(raw_readings)
+    names = insert_readings(device_row.name, device_row.patient, records)
+    rollup_readings(device_row.name, device_row.patient, records)
+    alerts = raise_alerts_for_readings(device_row.name, device_row.patient, records)
+
+    if records:
+        device_update = {"last_sync_time": max(record["timestamp"] for record in records)}
+        if battery_level is not None:
+            device_update["battery_level"] = battery_level
+        frappe.db.set_value("Device", device_row.name, device_update, update_modified=False)
+
+    return {"device": device_row.name, "accepted": len(names), "rejected": rejected, "alerts": alerts}
@@ -0,0 +1,33 @@
+# Copyright (c) 2025, Meghwin Dave and Contributors
+# See license.txt
+
+from datetime import datetime, timedelta
+
+# import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from healthx.healthx.doctype.vitals_rollup.vitals_rollup import aggregate_readings
+
+
+class TestVitalsRollup(FrappeTestCase):
+	def test_aggregate_readings_fills_every_bucket(self):
+		start = datetime(2025, 1, 1, 10, 15, 30)
+		records = [
+			{"heart_rate": 80, "spo2": None, "tempreature": 37.0, "fall_detected": 0, "timestamp": start},
+			{
+				"heart_rate": 90,
+				"spo2": 95.0,
+				"tempreature": None,
+				"fall_detected": 1,
+				"timestamp": start + timedelta(minutes=1),
+			},
+		]
+		rows = aggregate_readings("DEV-00001", "PAT-00001", records)
+
+		self.assertEqual(len(rows), 4)
+		hour = rows["DEV-00001-h-202501011000"]
+		self.assertEqual(hour["reading_count"], 2)
+		self.assertEqual((hour["heart_rate_min"], hour["heart_rate_max"]), (80, 90))
+		self.assertEqual(hour["spo2_count"], 1)
+		self.assertEqual(hour["fall_count"], 1)
+		self.assertEqual(rows["DEV-00001-m-202501011015"]["heart_rate_sum"], 80)
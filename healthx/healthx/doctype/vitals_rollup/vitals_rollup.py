@@ -0,0 +1,237 @@
+# Copyright (c) 2025, Meghwin Dave and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import get_datetime, getdate, now_datetime
+
+from healthx.utils import check_vitals_access
+
+# Finest first; get_vitals_series picks the first bucket that fits the point budget.
+BUCKET_SECONDS = {"Minute": 60, "Hour": 3600, "Day": 86400}
+BUCKET_CODES = {"Minute": "m", "Hour": "h", "Day": "d"}
+BUCKET_SQL_FORMATS = {
+    "Minute": ("%%Y-%%m-%%d %%H:%%i:00", "%%Y%%m%%d%%H%%i"),
+    "Hour": ("%%Y-%%m-%%d %%H:00:00", "%%Y%%m%%d%%H00"),
+    "Day": ("%%Y-%%m-%%d 00:00:00", "%%Y%%m%%d0000"),
+}
+# Rollup metric prefix -> Vitals Reading column
+METRICS = {"heart_rate": "heart_rate", "spo2": "spo2", "temperature": "tempreature"}
+MAX_SERIES_POINTS = 2000
+UPSERT_CHUNK = 500
+
+
+class VitalsRollup(Document):
+    pass
+
+
+def on_doctype_update():
+    frappe.db.add_index("Vitals Rollup", ["patient", "bucket", "bucket_start"])
+    frappe.db.add_index("Vitals Rollup", ["device", "bucket", "bucket_start"])
+
+
+def _bucket_start(timestamp, bucket):
+    timestamp = timestamp.replace(second=0, microsecond=0)
+    if bucket in ("Hour", "Day"):
+        timestamp = timestamp.replace(minute=0)
+    if bucket == "Day":
+        timestamp = timestamp.replace(hour=0)
+    return timestamp
+
+
+def _empty_row(device, patient, bucket, bucket_start):
+    row = {
+        "name": f"{device}-{BUCKET_CODES[bucket]}-{bucket_start:%Y%m%d%H%M}",
+        "patient": patient,
+        "device": device,
+        "bucket": bucket,
+        "bucket_start": bucket_start,
+        "reading_count": 0,
+        "fall_count": 0,
+    }
+    for metric in METRICS:
+        row.update({f"{metric}_count": 0, f"{metric}_min": None, f"{metric}_max": None, f"{metric}_sum": 0.0})
+    return row
+
+
+def aggregate_readings(device, patient, records):
+    """Fold readings into Minute/Hour/Day rollup rows keyed by their deterministic name."""
+    rows = {}
+    for record in records:
+        timestamp = get_datetime(record["timestamp"])
+        for bucket in BUCKET_SECONDS:
+            start = _bucket_start(timestamp, bucket)
+            name = f"{device}-{BUCKET_CODES[bucket]}-{start:%Y%m%d%H%M}"
+            row = rows.get(name)
+            if row is None:
+                row = rows[name] = _empty_row(device, patient, bucket, start)
+
+            row["reading_count"] += 1
+            row["fall_count"] += 1 if record.get("fall_detected") else 0
+            for metric, column in METRICS.items():
+                value = record.get(column)
+                if value is None:
+                    continue
+                row[f"{metric}_count"] += 1
+                row[f"{metric}_sum"] += value
+                current_min, current_max = row[f"{metric}_min"], row[f"{metric}_max"]
+                row[f"{metric}_min"] = value if current_min is None else min(current_min, value)
+                row[f"{metric}_max"] = value if current_max is None else max(current_max, value)
+    return rows
+
+
+def _upsert_sql(row_count):
+    metric_columns = [f"{metric}_{stat}" for metric in METRICS for stat in ("count", "min", "max", "sum")]
+    columns = [
+        "name",
+        "creation",
+        "modified",
+        "owner",
+        "modified_by",
+        "docstatus",
+        "idx",
+        "patient",
+        "device",
+        "bucket",
+        "bucket_start",
+        "reading_count",
+        "fall_count",
+        *metric_columns,
+    ]
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+
+    # ON DUPLICATE KEY UPDATE assigns left to right, so min/max must read the old counts
+    # before the counts themselves are incremented.
+    updates = []
+    for metric in METRICS:
+        for stat, combine in (("min", "LEAST"), ("max", "GREATEST")):
+            column = f"{metric}_{stat}"
+            updates.append(
+                f"`{column}` = IF(`{metric}_count` = 0, VALUES(`{column}`), "
+                f"IF(VALUES(`{metric}_count`) = 0, `{column}`, {combine}(`{column}`, VALUES(`{column}`))))"
+            )
+    for metric in METRICS:
+        updates.append(f"`{metric}_sum` = `{metric}_sum` + VALUES(`{metric}_sum`)")
+        updates.append(f"`{metric}_count` = `{metric}_count` + VALUES(`{metric}_count`)")
+    updates.append("`reading_count` = `reading_count` + VALUES(`reading_count`)")
+    updates.append("`fall_count` = `fall_count` + VALUES(`fall_count`)")
+    updates.append("`modified` = VALUES(`modified`)")
+
+    return (
+        f"INSERT INTO `tabVitals Rollup` ({', '.join(f'`{column}`' for column in columns)}) VALUES "
+        + ", ".join([placeholders] * row_count)
+        + " ON DUPLICATE KEY UPDATE "
+        + ", ".join(updates)
+    ), columns
+
+
+def rollup_readings(device, patient, records):
+    """Merge a batch of readings into the rollup rows for every bucket size."""
+    rows = list(aggregate_readings(device, patient, records).values())
+    if not rows:
+        return
+
+    now = now_datetime()
+    user = frappe.session.user
+    for offset in range(0, len(rows), UPSERT_CHUNK):
+        chunk = rows[offset : offset + UPSERT_CHUNK]
+        sql, columns = _upsert_sql(len(chunk))
+        base = {"creation": now, "modified": now, "owner": user, "modified_by": user, "docstatus": 0, "idx": 0}
+        values = []
+        for row in chunk:
+            for column in columns:
+                if column in base:
+                    values.append(base[column])
+                else:
+                    value = row[column]
+                    values.append(0 if value is None else value)
+        frappe.db.sql(sql, values)
+
+
+def rebuild_rollups(from_date, to_date=None):
+    """Recompute rollups for whole days from raw readings (backfill or repair).
+
+    Only rebuild days whose raw readings are still in the table; archived days would be
+    replaced by empty rollups.
+
+    Run with ``bench --site <site> execute healthx.healthx.doctype.vitals_rollup.vitals_rollup.rebuild_rollups``.
+    """
+    start = get_datetime(getdate(from_date))
+    end = get_datetime(getdate(to_date or from_date)).replace(hour=23, minute=59, second=59)
+    frappe.db.delete("Vitals Rollup", {"bucket_start": ["between", [start, end]]})
+
+    # A metric the device did not send is stored as 0 (the columns are NOT NULL); NULLIF skips
+    # it the way rollup_readings skips a missing value, so both paths give the same rows.
+    metric_selects = []
+    for column in METRICS.values():
+        metric_selects += [
+            f"COUNT(NULLIF(`{column}`, 0))",
+            f"COALESCE(MIN(NULLIF(`{column}`, 0)), 0)",
+            f"COALESCE(MAX(NULLIF(`{column}`, 0)), 0)",
+            f"COALESCE(SUM(NULLIF(`{column}`, 0)), 0)",
+        ]
+    metric_columns = ", ".join(f"`{metric}_{stat}`" for metric in METRICS for stat in ("count", "min", "max", "sum"))
+
+    for bucket, (start_format, name_format) in BUCKET_SQL_FORMATS.items():
+        frappe.db.sql(
+            f"""
+            INSERT INTO `tabVitals Rollup`
+                (name, creation, modified, owner, modified_by, docstatus, idx, patient, device, bucket,
+                bucket_start, reading_count, fall_count, {metric_columns})
+            SELECT
+                CONCAT(device, '-{BUCKET_CODES[bucket]}-', DATE_FORMAT(`timestamp`, '{name_format}')),
+                NOW(), NOW(), %(user)s, %(user)s, 0, 0, MAX(patient), device, %(bucket)s,
+                DATE_FORMAT(`timestamp`, '{start_format}'), COUNT(*), SUM(fall_detected),
+                {", ".join(metric_selects)}
+            FROM `tabVitals Reading`
+            WHERE `timestamp` BETWEEN %(start)s AND %(end)s
+            GROUP BY device, DATE_FORMAT(`timestamp`, '{start_format}')
+            """,
+            {"user": frappe.session.user, "bucket": bucket, "start": start, "end": end},
+        )
+
+
+@frappe.whitelist()
+def get_vitals_series(patient=None, device=None, from_datetime=None, to_datetime=None, max_points=500):
+    """Return trend points for a patient or device from the finest rollup fitting ``max_points``.
+
+    A week at a 500-point budget is served from hourly buckets, a year from daily buckets,
+    so charts never pull raw readings.
+    """
+    if not (patient or device):
+        frappe.throw(_("Patient or Device is required."))
+    check_vitals_access(patient, None if patient else device)
+
+    end = get_datetime(to_datetime) if to_datetime else now_datetime()
+    start = get_datetime(from_datetime) if from_datetime else end.replace(hour=0, minute=0, second=0)
+    if start >= end:
+        frappe.throw(_("From must be earlier than To."))
+
+    max_points = max(1, min(int(max_points or 500), MAX_SERIES_POINTS))
+    span = (end - start).total_seconds()
+    bucket = next((name for name, seconds in BUCKET_SECONDS.items() if span / seconds <= max_points), "Day")
+
+    metric_selects = []
+    for metric in METRICS:
+        metric_selects += [
+            f"MIN(IF(`{metric}_count` > 0, `{metric}_min`, NULL)) AS `{metric}_min`",
+            f"MAX(IF(`{metric}_count` > 0, `{metric}_max`, NULL)) AS `{metric}_max`",
+            f"SUM(`{metric}_sum`) / NULLIF(SUM(`{metric}_count`), 0) AS `{metric}_avg`",
+        ]
+
+    owner_field, owner = ("patient", patient) if patient else ("device", device)
+    points = frappe.db.sql(
+        f"""
+        SELECT bucket_start, SUM(reading_count) AS reading_count, SUM(fall_count) AS fall_count,
+            {", ".join(metric_selects)}
+        FROM `tabVitals Rollup`
+        WHERE `{owner_field}` = %(owner)s AND bucket = %(bucket)s
+            AND bucket_start BETWEEN %(start)s AND %(end)s
+        GROUP BY bucket_start
+        ORDER BY bucket_start
+        """,
+        {"owner": owner, "bucket": bucket, "start": _bucket_start(start, bucket), "end": end},
+        as_dict=True,
+    )
+    return {"bucket": bucket, "from": start, "to": end, "points": points}
@@ -85,6 +85,8 @@ home_page = "index"
 # before_install = "healthx.install.before_install"
 # after_install = "healthx.install.after_install"
 
+after_migrate = ["healthx.api.clear_schema_cache"]
+
 # Uninstallation
 # ------------
 
@@ -145,6 +147,53 @@ home_page = "index"
 # 	}
 # }
 
+doc_events = {
+	"DocType": {
+		"on_update": "healthx.api.clear_schema_cache",
+		"on_trash": "healthx.api.clear_schema_cache",
+	},
+	"Custom Field": {
+		"on_update": "healthx.api.clear_schema_cache",
+		"on_trash": "healthx.api.clear_schema_cache",
+	},
+	# Master DocTypes served from the fetch_docs_sql result cache
+	"Doctor": {
+		"on_update": "healthx.api.bump_result_cache_version",
+		"after_rename": "healthx.api.bump_result_cache_version",
+		"on_trash": "healthx.api.bump_result_cache_version",
+	},
+	"Speciality": {
+		"on_update": "healthx.api.bump_result_cache_version",
+		"after_rename": "healthx.api.bump_result_cache_version",
+		"on_trash": "healthx.api.bump_result_cache_version",
+	},
+	"Drug": {
+		"on_update": "healthx.api.bump_result_cache_version",
+		"after_rename": "healthx.api.bump_result_cache_version",
+		"on_trash": "healthx.api.bump_result_cache_version",
+	},
+	"Device Type": {
+		"on_update": "healthx.api.bump_result_cache_version",
+		"after_rename": "healthx.api.bump_result_cache_version",
+		"on_trash": "healthx.api.bump_result_cache_version",
+	},
+	"Home Service": {
+		"on_update": "healthx.api.bump_result_cache_version",
+		"after_rename": "healthx.api.bump_result_cache_version",
+		"on_trash": "healthx.api.bump_result_cache_version",
+	},
+	"Pharmacy": {
+		"on_update": "healthx.api.bump_result_cache_version",
+		"after_rename": "healthx.api.bump_result_cache_version",
+		"on_trash": "healthx.api.bump_result_cache_version",
+	},
+	"Treatement Package": {
+		"on_update": "healthx.api.bump_result_cache_version",
+		"after_rename": "healthx.api.bump_result_cache_version",
+		"on_trash": "healthx.api.bump_result_cache_version",
+	},
+}
+
 # Scheduled Tasks
 # ---------------
 
@@ -166,6 +215,21 @@ home_page = "index"
 # 	],
 # }
 
+scheduler_events = {
+	"cron": {
+		"*/5 * * * *": [
+			"healthx.error_log.emit_error_summaries",
+		],
+	},
+	"daily_long": [
+		"healthx.retention.run_retention",
+		"healthx.analytics.reconcile_facts",
+	],
+	"weekly": [
+		"healthx.healthx.doctype.doctor_review.doctor_review.verify_doctor_ratings",
+	],
+}
+
 # Testing
 # -------
 
@@ -196,13 +260,13 @@ home_page = "index"
 
 # Request Events
 # ----------------
-# before_request = ["healthx.utils.before_request"]
-# after_request = ["healthx.utils.after_request"]
+before_request = ["healthx.metrics.before_request"]
+after_request = ["healthx.metrics.after_request", "healthx.error_log.flush"]
 
 # Job Events
 # ----------
 # before_job = ["healthx.utils.before_job"]
-# after_job = ["healthx.utils.after_job"]
+after_job = ["healthx.error_log.flush"]
 
 # User Data Protection
 # --------------------
@@ -0,0 +1,113 @@
+"""Replay a captured query log through EXPLAIN and report full scans on healthx tables.
+
+Accepts a MariaDB general or slow query log, or a plain file of ``;``-terminated statements.
+Statements are de-duplicated by fingerprint (literals replaced with ``?``), so a log with
+thousands of executions of the same query is explained once.
+"""
+
+import re
+from collections import OrderedDict
+
+import frappe
+
+EXPLAINABLE = ("select", "update", "delete")
+FULL_SCAN_TYPES = ("ALL", "index")
+GENERAL_LOG_COMMAND = re.compile(
+    r"^(?:\S+\s+)?\d+\s+(Query|Execute|Connect|Quit|Init DB|Prepare|Close stmt)\b\s*", re.IGNORECASE
+)
+TABLE_ALIAS = re.compile(
+    r"`(tab[^`]+)`(?:\s+(?:as\s+)?(?!(?:where|join|on|left|right|inner|order|group|limit|set|use|force|ignore)\b)(\w+))?",
+    re.IGNORECASE,
+)
+STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def read_statements(path):
+    """Yield statements from a general log, slow log or ``;``-separated SQL file."""
+    buffer = []
+    with open(path, encoding="utf-8", errors="replace") as log:
+        for line in log:
+            stripped = line.strip()
+            skip = not stripped or stripped.startswith(("#", "--", "/*")) or stripped.lower().startswith(
+                ("set timestamp", "use ")
+            )
+            command = GENERAL_LOG_COMMAND.match(stripped)
+            if skip or command:
+                # Comments and log headers always end the statement being collected.
+                if buffer:
+                    yield " ".join(buffer).rstrip(";")
+                    buffer = []
+                if command and command.group(1).lower() in ("query", "execute"):
+                    buffer = [stripped[command.end():]]
+                continue
+            buffer.append(stripped)
+            if stripped.endswith(";"):
+                yield " ".join(buffer).rstrip(";")
+                buffer = []
+    if buffer:
+        yield " ".join(buffer).rstrip(";")
+
+
+def fingerprint(statement):
+    statement = STRING_LITERAL.sub("?", statement)
+    statement = NUMBER_LITERAL.sub("?", statement)
+    return re.sub(r"\s+", " ", statement).strip().lower()
+
+
+def get_healthx_tables():
+    modules = frappe.get_module_list("healthx")
+    doctypes = frappe.get_all("DocType", filters={"module": ["in", modules], "issingle": 0}, pluck="name")
+    return {f"tab{doctype}" for doctype in doctypes}
+
+
+def _table_aliases(statement, tables):
+    aliases = {}
+    for table, alias in TABLE_ALIAS.findall(statement):
+        if table in tables:
+            aliases[table] = table
+            if alias:
+                aliases[alias] = table
+    return aliases
+
+
+def analyze_query_log(path, min_rows=0):
+    """Return one finding per (statement fingerprint, table) that EXPLAIN shows as a full scan."""
+    tables = get_healthx_tables()
+    statements = OrderedDict()
+    for statement in read_statements(path):
+        if not statement.lower().startswith(EXPLAINABLE):
+            continue
+        key = fingerprint(statement)
+        if key in statements:
+            statements[key]["executions"] += 1
+        else:
+            statements[key] = {"statement": statement, "executions": 1}
+
+    findings = []
+    for entry in statements.values():
+        aliases = _table_aliases(entry["statement"], tables)
+        if not aliases:
+            continue
+        try:
+            plan = frappe.db.sql(f"EXPLAIN {entry['statement']}", as_dict=True)
+        except Exception as exc:
+            findings.append({"table": None, "type": "error", "rows": 0, "error": str(exc), **entry})
+            continue
+        finally:
+            frappe.db.rollback()
+
+        for step in plan:
+            table = aliases.get(step.get("table"))
+            if table and step.get("type") in FULL_SCAN_TYPES and (step.get("rows") or 0) >= min_rows:
+                findings.append(
+                    {
+                        "table": table,
+                        "type": step.get("type"),
+                        "rows": step.get("rows") or 0,
+                        "possible_keys": step.get("possible_keys"),
+                        **entry,
+                    }
+                )
+    findings.sort(key=lambda finding: finding["executions"] * (finding["rows"] or 1), reverse=True)
+    return findings
@@ -0,0 +1,60 @@
+"""Background jobs for the secondary effects of user-facing actions.
+
+``enqueue_side_effect`` queues a function on the short queue once the request's transaction
+commits, so the request only pays for its primary write. Each side effect has a key: while a
+job for that key is still queued, enqueueing it again is a no-op. A failing job is queued
+again with exponential backoff, instead of sleeping in the worker, before it is reported as
+failed.
+"""
+
+from datetime import timedelta
+
+import frappe
+from frappe.utils.background_jobs import execute_job, get_queue
+
+MAX_ATTEMPTS = 3
+BACKOFF_SECONDS = 2
+QUEUE = "short"
+
+
+def enqueue_side_effect(method, key, **kwargs):
+    """Queue ``method(**kwargs)`` after commit, at most once per ``key`` while it is pending."""
+    frappe.enqueue(
+        "healthx.jobs.run_side_effect",
+        queue=QUEUE,
+        enqueue_after_commit=True,
+        job_id=f"healthx:side_effect:{key}",
+        deduplicate=True,
+        method=method,
+        kwargs=kwargs,
+    )
+
+
+def _retry_later(method, kwargs, attempt, delay):
+    # frappe.enqueue has no delay option, so the same execute_job call is scheduled on RQ.
+    get_queue(QUEUE).enqueue_in(
+        timedelta(seconds=delay),
+        execute_job,
+        kwargs={
+            "site": frappe.local.site,
+            "user": frappe.session.user,
+            "method": "healthx.jobs.run_side_effect",
+            "event": None,
+            "job_name": "healthx.jobs.run_side_effect",
+            "is_async": True,
+            "kwargs": {"method": method, "kwargs": kwargs, "attempt": attempt},
+        },
+    )
+
+
+def run_side_effect(method, kwargs, attempt=1):
+    """Run one side effect in its own transaction; on failure queue it again after 2s, 4s, ..."""
+    try:
+        frappe.get_attr(method)(**kwargs)
+        frappe.db.commit()
+    except Exception:
+        frappe.db.rollback()
+        if attempt >= MAX_ATTEMPTS:
+            # The worker logs the failed job with its traceback.
+            raise
+        _retry_later(method, kwargs, attempt + 1, BACKOFF_SECONDS * 2 ** (attempt - 1))
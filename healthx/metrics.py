@@ -0,0 +1,297 @@
+"""Per-endpoint metrics for healthx whitelisted methods.
+
+The ``before_request``/``after_request`` hooks instrument every ``/api/method/healthx.*`` call:
+wall time, number of SQL statements, time spent in SQL and rows fetched are recorded into
+in-memory log-linear (HDR-style) histograms, and statements slower than the slow-query
+threshold are kept as samples. Each worker merges what it recorded into Redis at most every
+``FLUSH_INTERVAL`` seconds, so a request costs a few dictionary updates and no Redis round
+trip. ``prometheus_metrics`` serves the merged histograms in the Prometheus text format.
+"""
+
+import json
+import math
+import re
+import time
+from collections import defaultdict
+
+import frappe
+from frappe.utils import now
+from werkzeug.wrappers import Response
+
+METRICS_KEY = "healthx:metrics"
+SLOW_QUERIES_KEY = "healthx:metrics:slow_queries"
+METHOD_PATH = re.compile(r"^/api/(?:v\d+/)?method/(healthx\.[\w.]+)$")
+FLUSH_INTERVAL = 10
+# Bucket upper bounds are 2 ** (index / SUB_BUCKETS): four buckets per doubling, ~19% wide.
+SUB_BUCKETS = 4
+MIN_BUCKET = -10 * SUB_BUCKETS
+# Zero (e.g. a request without SQL) gets its own bucket with an upper bound of 0.
+ZERO_BUCKET = MIN_BUCKET - 1
+# Prometheus gets a fixed bucket per doubling up to 2 ** 24 on every scrape, so each series has
+# the same ``le`` labels; larger values only reach +Inf. Percentiles here use the finer buckets.
+MAX_EXPORT_BUCKET = 24 * SUB_BUCKETS
+EXPORT_BUCKETS = (ZERO_BUCKET, *range(MIN_BUCKET, MAX_EXPORT_BUCKET + 1, SUB_BUCKETS))
+SLOW_QUERY_MS = 250
+MAX_SLOW_QUERIES = 200
+MAX_SLOW_PER_REQUEST = 5
+MAX_QUERY_LENGTH = 1000
+METRICS = {
+    "wall_ms": ("healthx_request_duration_ms", "Wall time of healthx whitelisted methods in milliseconds."),
+    "sql_count": ("healthx_request_sql_queries", "SQL statements per healthx request."),
+    "sql_ms": ("healthx_request_sql_duration_ms", "Time spent in SQL per healthx request in milliseconds."),
+    "rows": ("healthx_request_sql_rows", "Rows fetched by SQL per healthx request."),
+}
+
+# {site: {(method, metric): Histogram}} and {site: [slow query sample]}, per worker process.
+_pending = defaultdict(dict)
+_pending_slow = defaultdict(list)
+_last_flush = {}
+
+
+def get_method(path):
+    match = METHOD_PATH.match(path or "")
+    return match.group(1) if match else None
+
+
+def bucket_index(value):
+    if value <= 0:
+        return ZERO_BUCKET
+    return max(math.ceil(math.log2(value) * SUB_BUCKETS), MIN_BUCKET)
+
+
+def bucket_bound(index):
+    return 0.0 if index == ZERO_BUCKET else 2 ** (index / SUB_BUCKETS)
+
+
+class Histogram:
+    __slots__ = ("count", "counts", "total")
+
+    def __init__(self, counts=None, count=0, total=0.0):
+        self.counts = counts or {}
+        self.count = count
+        self.total = total
+
+    def record(self, value):
+        index = bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the nearest-rank percentile; None when empty."""
+        if not self.count:
+            return None
+        rank = max(math.ceil(fraction * self.count), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return bucket_bound(index)
+
+    def to_hash(self):
+        return {"count": self.count, "sum": self.total, **{str(index): n for index, n in self.counts.items()}}
+
+    @classmethod
+    def from_hash(cls, data):
+        data = {frappe.safe_decode(key): value for key, value in data.items()}
+        counts = {int(key): int(value) for key, value in data.items() if key not in ("count", "sum")}
+        return cls(counts, int(data.get("count") or 0), float(data.get("sum") or 0))
+
+
+class RequestStats:
+    __slots__ = ("method", "rows", "slow", "slow_ms", "sql_count", "sql_ms", "started")
+
+    def __init__(self, method):
+        self.method = method
+        self.started = time.perf_counter()
+        self.slow_ms = _get_slow_query_ms()
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.rows = 0
+        self.slow = []
+
+
+def _get_slow_query_ms():
+    return frappe.conf.get("healthx_slow_query_ms") or SLOW_QUERY_MS
+
+
+def _instrument_sql(db):
+    """Wrap ``db.sql`` once per connection; it records into the current request's stats, if any."""
+    if getattr(db.sql, "healthx_timed", False):
+        return
+    original_sql = db.sql
+
+    def timed_sql(query, *args, **kwargs):
+        stats = getattr(frappe.local, "healthx_request_stats", None)
+        if stats is None:
+            return original_sql(query, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            result = original_sql(query, *args, **kwargs)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            stats.sql_count += 1
+            stats.sql_ms += elapsed
+            if elapsed >= stats.slow_ms and len(stats.slow) < MAX_SLOW_PER_REQUEST:
+                stats.slow.append((round(elapsed, 1), str(query)[:MAX_QUERY_LENGTH]))
+        if isinstance(result, (list, tuple)):
+            stats.rows += len(result)
+        return result
+
+    # Shadows the method on this connection object only.
+    timed_sql.healthx_timed = True
+    db.sql = timed_sql
+
+
+def before_request():
+    method = get_method(getattr(frappe.local.request, "path", None))
+    if not method:
+        return
+    frappe.local.healthx_request_stats = RequestStats(method)
+    _instrument_sql(frappe.db)
+
+
+def after_request(response=None, request=None):
+    stats = getattr(frappe.local, "healthx_request_stats", None)
+    if stats is None:
+        return
+    frappe.local.healthx_request_stats = None
+
+    site = frappe.local.site
+    histograms = _pending[site]
+    values = {
+        "wall_ms": (time.perf_counter() - stats.started) * 1000,
+        "sql_count": stats.sql_count,
+        "sql_ms": stats.sql_ms,
+        "rows": stats.rows,
+    }
+    for metric, value in values.items():
+        histogram = histograms.get((stats.method, metric))
+        if histogram is None:
+            histogram = histograms[(stats.method, metric)] = Histogram()
+        histogram.record(value)
+
+    if stats.slow:
+        timestamp = now()
+        _pending_slow[site].extend(
+            {"method": stats.method, "ms": ms, "query": query, "at": timestamp} for ms, query in stats.slow
+        )
+        del _pending_slow[site][:-MAX_SLOW_QUERIES]
+
+    if time.monotonic() - _last_flush.get(site, 0) >= FLUSH_INTERVAL:
+        flush()
+
+
+def flush():
+    """Merge this worker's pending histograms and slow queries for the current site into Redis."""
+    site = frappe.local.site
+    _last_flush[site] = time.monotonic()
+    histograms = _pending.pop(site, None)
+    slow_queries = _pending_slow.pop(site, None)
+    if not histograms and not slow_queries:
+        return
+
+    cache = frappe.cache()
+    pipeline = cache.pipeline()
+    for (method, metric), histogram in (histograms or {}).items():
+        key = cache.make_key(f"{METRICS_KEY}:{method}:{metric}")
+        for index, count in histogram.counts.items():
+            pipeline.hincrby(key, str(index), count)
+        pipeline.hincrby(key, "count", histogram.count)
+        pipeline.hincrbyfloat(key, "sum", histogram.total)
+        pipeline.sadd(cache.make_key(METRICS_KEY), method)
+    if slow_queries:
+        slow_key = cache.make_key(SLOW_QUERIES_KEY)
+        pipeline.lpush(slow_key, *(json.dumps(sample) for sample in slow_queries))
+        pipeline.ltrim(slow_key, 0, MAX_SLOW_QUERIES - 1)
+    pipeline.execute()
+
+
+def get_histograms():
+    """Return ``{method: {metric: Histogram}}`` merged across workers."""
+    cache = frappe.cache()
+    methods = sorted(frappe.safe_decode(method) for method in cache.smembers(METRICS_KEY))
+    # Raw pipeline reads: the hashes hold plain counters, not the pickled values RedisWrapper expects.
+    pipeline = cache.pipeline()
+    for method in methods:
+        for metric in METRICS:
+            pipeline.hgetall(cache.make_key(f"{METRICS_KEY}:{method}:{metric}"))
+    results = iter(pipeline.execute())
+    return {method: {metric: Histogram.from_hash(next(results) or {}) for metric in METRICS} for method in methods}
+
+
+def _format_bound(value):
+    return f"{value:.6g}"
+
+
+def format_prometheus(histograms):
+    lines = []
+    for metric, (name, description) in METRICS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} histogram")
+        for method, method_histograms in histograms.items():
+            histogram = method_histograms[metric]
+            if not histogram.count:
+                continue
+            label = f'method="{method}"'
+            observed = sorted(histogram.counts.items())
+            cumulative, position = 0, 0
+            # Buckets nest at each doubling, so the cumulative count at an export bound is exact.
+            for bound_index in EXPORT_BUCKETS:
+                while position < len(observed) and observed[position][0] <= bound_index:
+                    cumulative += observed[position][1]
+                    position += 1
+                lines.append(f'{name}_bucket{{{label},le="{_format_bound(bucket_bound(bound_index))}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{label},le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum{{{label}}} {histogram.total:.3f}")
+            lines.append(f"{name}_count{{{label}}} {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+
+@frappe.whitelist()
+def prometheus_metrics():
+    """Serve the merged histograms as Prometheus text (scrape with a System Manager API key)."""
+    frappe.only_for("System Manager")
+    flush()
+    return Response(format_prometheus(get_histograms()), mimetype="text/plain; version=0.0.4")
+
+
+@frappe.whitelist()
+def get_latency_summary():
+    """Return request count, p50, p99 and mean latency (ms) plus mean SQL count per healthx method."""
+    frappe.only_for("System Manager")
+    flush()
+    summary = {}
+    for method, histograms in get_histograms().items():
+        wall, sql_count = histograms["wall_ms"], histograms["sql_count"]
+        summary[method] = {
+            "requests": wall.count,
+            "p50": wall.percentile(0.5),
+            "p99": wall.percentile(0.99),
+            "mean": round(wall.total / wall.count, 2) if wall.count else None,
+            "mean_queries": round(sql_count.total / sql_count.count, 1) if sql_count.count else None,
+        }
+    return summary
+
+
+@frappe.whitelist()
+def get_slow_queries(limit=50):
+    """Return the most recent SQL statements slower than the slow-query threshold, newest first."""
+    frappe.only_for("System Manager")
+    flush()
+    limit = max(1, min(int(limit), MAX_SLOW_QUERIES))
+    return [json.loads(sample) for sample in frappe.cache().lrange(SLOW_QUERIES_KEY, 0, limit - 1)]
+
+
+@frappe.whitelist(methods=["POST"])
+def reset_metrics():
+    """Drop the merged histograms and slow-query samples (e.g. before a benchmark run)."""
+    frappe.only_for("System Manager")
+    cache = frappe.cache()
+    for method in cache.smembers(METRICS_KEY):
+        method = frappe.safe_decode(method)
+        for metric in METRICS:
+            cache.delete_value(f"{METRICS_KEY}:{method}:{metric}")
+    cache.delete_value([METRICS_KEY, SLOW_QUERIES_KEY])
+    _pending.pop(frappe.local.site, None)
+    _pending_slow.pop(frappe.local.site, None)
@@ -0,0 +1,17 @@
+import frappe
+
+# New sites get these indexes from each controller's on_doctype_update; existing sites only
+# re-run it for DocTypes whose JSON changed, so call the hooks once here.
+HOOKS = (
+    "healthx.healthx.doctype.queue_token.queue_token.on_doctype_update",
+    "healthx.healthx.doctype.clinic_visit.clinic_visit.on_doctype_update",
+    "healthx.healthx.doctype.doctor.doctor.on_doctype_update",
+    "healthx.healthx.doctype.vitals_reading.vitals_reading.on_doctype_update",
+    "healthx.healthx.doctype.alert_log.alert_log.on_doctype_update",
+    "healthx.healthx.doctype.doctor_appointment.doctor_appointment.on_doctype_update",
+)
+
+
+def execute():
+    for hook in HOOKS:
+        frappe.get_attr(hook)()
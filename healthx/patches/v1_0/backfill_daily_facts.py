@@ -0,0 +1,14 @@
+import frappe
+
+from healthx.analytics import rebuild_all_facts
+
+
+def execute():
+    # Alerts resolved before resolved_on existed: their last modification is the best estimate.
+    frappe.db.sql(
+        """
+        UPDATE `tabAlert Log` SET resolved_on = modified
+        WHERE status = 'Resolved' AND resolved_on IS NULL
+        """
+    )
+    rebuild_all_facts()
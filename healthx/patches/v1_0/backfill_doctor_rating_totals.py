@@ -0,0 +1,5 @@
+from healthx.healthx.doctype.doctor_review.doctor_review import recompute_doctor_ratings
+
+
+def execute():
+    recompute_doctor_ratings()
@@ -0,0 +1,6 @@
+from healthx.patient_search import backfill_search_keys, ensure_search_indexes
+
+
+def execute():
+    ensure_search_indexes()
+    backfill_search_keys()
@@ -0,0 +1,17 @@
+import frappe
+from frappe.utils import add_months, getdate, nowdate
+
+from healthx.retention import ensure_rollups
+
+
+def execute():
+    # Rollups only start with new ingests; build them for the readings already stored, one month
+    # per transaction, so trend charts and retention see the full history.
+    oldest = frappe.db.sql("SELECT MIN(`timestamp`) FROM `tabVitals Reading`")[0][0]
+    if not oldest:
+        return
+
+    month, last_month = getdate(oldest).replace(day=1), getdate(nowdate()).replace(day=1)
+    while month <= last_month:
+        ensure_rollups(month)
+        month = add_months(month, 1)
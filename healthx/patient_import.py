@@ -0,0 +1,309 @@
+"""Streaming bulk import of legacy Patients from CSV or XLSX.
+
+The file is read in chunks. Each chunk is validated as NumPy string columns and boolean masks,
+checked for duplicate phone numbers against one in-memory set (existing patients plus rows
+accepted earlier in the file), and written with multi-row INSERTs. Nothing goes through
+``Patient.validate``, so there is no per-row duplicate query.
+"""
+
+import csv
+import os
+from datetime import date
+from itertools import islice
+
+import frappe
+import numpy as np
+from frappe import _
+from frappe.utils import getdate, now_datetime
+
+from healthx.patient_search import get_phone_key, get_search_key
+from healthx.utils import reserve_names, save_private_file
+
+DEFAULT_CHUNK_SIZE = 5000
+SERIES_PREFIX = "PAT-"
+GENDERS = frozenset(("Male", "Female", "Other"))
+IMPORT_FIELDS = (
+    "full_name",
+    "gender",
+    "date_of_birth",
+    "phone_number",
+    "email",
+    "country",
+    "address",
+    "preferred_language",
+)
+HEADER_ALIASES = {
+    "name": "full_name",
+    "patient_name": "full_name",
+    "phone": "phone_number",
+    "mobile": "phone_number",
+    "dob": "date_of_birth",
+    "language": "preferred_language",
+}
+RECORD_FIELDS = (*IMPORT_FIELDS, "phone_key", "search_key")
+INSERT_FIELDS = (
+    "name",
+    "naming_series",
+    "creation",
+    "modified",
+    "owner",
+    "modified_by",
+    "docstatus",
+    "idx",
+    *RECORD_FIELDS,
+)
+
+
+def _read_rows(path):
+    """Yield the header and then each data row as a list of cell values."""
+    if path.lower().endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            yield from (list(row) for row in workbook.active.iter_rows(values_only=True))
+        finally:
+            workbook.close()
+        return
+
+    with open(path, newline="", encoding="utf-8-sig") as csv_file:
+        yield from csv.reader(csv_file)
+
+
+def _map_columns(header):
+    columns = {}
+    for index, label in enumerate(header):
+        fieldname = frappe.scrub(str(label or "").strip())
+        fieldname = HEADER_ALIASES.get(fieldname, fieldname)
+        if fieldname in IMPORT_FIELDS and fieldname not in columns:
+            columns[fieldname] = index
+    missing = {"full_name", "gender", "phone_number"} - set(columns)
+    if missing:
+        frappe.throw(_("Import file is missing required columns: {0}").format(", ".join(sorted(missing))))
+    return columns
+
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheets store phone numbers as numbers.
+        value = int(value)
+    return str(value).strip()
+
+
+def _column(rows, columns, fieldname):
+    index = columns.get(fieldname)
+    if index is None:
+        return np.full(len(rows), "", dtype=str)
+    return np.array([_cell_text(row[index]) if index < len(row) else "" for row in rows], dtype=str)
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return getdate(value)
+
+
+def _date_column(values):
+    """Parse dates as datetime64[D]; blanks are NaT. Returns ``(dates, invalid mask)``."""
+    blank = values == ""
+    try:
+        # U10 keeps "YYYY-MM-DD" of "YYYY-MM-DD HH:MM:SS" spreadsheet cells.
+        dates = values.astype("U10").astype("datetime64[D]")
+    except ValueError:
+        # Only a chunk with a non-ISO date takes the per-cell path.
+        dates = np.array([_to_datetime64(value) for value in values], dtype="datetime64[D]")
+    return dates, ~blank & np.isnat(dates)
+
+
+def _to_datetime64(value):
+    try:
+        parsed = _parse_date(value)
+    except Exception:
+        parsed = None
+    return np.datetime64(parsed, "D") if parsed else np.datetime64("NaT")
+
+
+def _valid_phones(phones):
+    """Patient's ``PHONE_PATTERN`` as string-array operations: an optional "+" then 7-15 digits."""
+    digits = np.where(np.char.startswith(phones, "+"), np.char.replace(phones, "+", "", count=1), phones)
+    length = np.char.str_len(digits)
+    return (length >= 7) & (length <= 15) & (np.char.strip(digits, "0123456789") == "")
+
+
+def _valid_emails(emails):
+    """``local@domain.tld`` without whitespace, as string-array operations; blanks are valid."""
+    local, at, domain = (part for part in np.moveaxis(np.char.partition(emails, "@"), -1, 0))
+    dot = np.char.find(domain, ".", 1)
+    valid = (
+        (at == "@")
+        & (np.char.str_len(local) > 0)
+        & (np.char.find(domain, "@") == -1)
+        & (dot >= 1)
+        & (dot < np.char.str_len(domain) - 1)
+    )
+    for space in " \t\n\r\f\v":
+        valid &= np.char.find(emails, space) == -1
+    return (emails == "") | valid
+
+
+def validate_chunk(rows, columns, known_phones, countries, languages, today=None):
+    """Validate one chunk; return (records, rejects) and add accepted phone numbers to the set.
+
+    Each column is a NumPy string array and each rule one array operation over the chunk;
+    only rows that fail a mask are visited again to build their error messages. Duplicates
+    are matched on the raw phone number, like ``Patient.check_duplicate_phone`` and the
+    unique index on ``phone_number``.
+    """
+    today = np.datetime64(today or date.today(), "D")
+    values = {fieldname: _column(rows, columns, fieldname) for fieldname in IMPORT_FIELDS}
+    dates, date_errors = _date_column(values["date_of_birth"])
+
+    checks = {
+        _("Full Name must have at least 3 characters."): np.char.str_len(values["full_name"]) >= 3,
+        _("Gender must be Male, Female or Other."): np.isin(values["gender"], list(GENDERS)),
+        _("Invalid Phone Number (7-15 digits)."): _valid_phones(values["phone_number"]),
+        _("Invalid email address."): _valid_emails(values["email"]),
+        _("Invalid Date of Birth."): ~date_errors,
+        _("Date of Birth cannot be in the future."): np.isnat(dates) | (dates <= today),
+        _("Unknown Country."): (values["country"] == "") | np.isin(values["country"], list(countries)),
+        _("Unknown Language."): (values["preferred_language"] == "")
+        | np.isin(values["preferred_language"], list(languages)),
+    }
+    valid = np.logical_and.reduce(list(checks.values()))
+
+    # A phone already on a patient, or repeated inside the file, keeps only its first row.
+    phones = values["phone_number"]
+    candidates = np.flatnonzero(valid)
+    _unique, first = np.unique(phones[candidates], return_index=True)
+    duplicate = np.zeros(len(rows), dtype=bool)
+    duplicate[candidates] = True
+    duplicate[candidates[first]] = False
+    existing = known_phones.intersection(phones[candidates].tolist())
+    if existing:
+        duplicate |= valid & np.isin(phones, list(existing))
+    checks[_("A patient with this phone number already exists.")] = ~duplicate
+    valid &= ~duplicate
+    known_phones.update(phones[valid].tolist())
+
+    date_values = dates.astype(object)
+    records = [
+        dict(
+            {fieldname: str(values[fieldname][index]) or None for fieldname in IMPORT_FIELDS},
+            date_of_birth=date_values[index],
+            phone_key=get_phone_key(str(phones[index])),
+            search_key=get_search_key(str(values["full_name"][index])),
+        )
+        for index in np.flatnonzero(valid)
+    ]
+    rejects = [
+        (int(index), [message for message, mask in checks.items() if not mask[index]])
+        for index in np.flatnonzero(~valid)
+    ]
+    return records, rejects
+
+
+def insert_records(records, prefix=SERIES_PREFIX):
+    if not records:
+        return []
+    names = reserve_names(prefix, len(records))
+    now = now_datetime()
+    user = frappe.session.user
+    values = [
+        (name, prefix, now, now, user, user, 0, 0, *(record[field] for field in RECORD_FIELDS))
+        for name, record in zip(names, records, strict=True)
+    ]
+    frappe.db.bulk_insert("Patient", INSERT_FIELDS, values, chunk_size=len(values))
+    return names
+
+
+def _load_known_phones():
+    return set(frappe.db.sql_list("SELECT phone_number FROM `tabPatient`"))
+
+
+def import_patients(path, chunk_size=DEFAULT_CHUNK_SIZE, prefix=SERIES_PREFIX, dry_run=False, file_name=None):
+    """Import patients from a CSV/XLSX file at ``path`` and return a summary.
+
+    Each chunk is committed on its own and reported on the ``patient_import_progress``
+    realtime event. Rejected rows hold patient details, so they are written with their reasons
+    to a private File (attached to the uploaded File ``file_name``, if given) whose URL is
+    returned as ``rejects_file``.
+    """
+    chunk_size = int(chunk_size)
+    rows = _read_rows(path)
+    header = next(rows, None)
+    if not header:
+        frappe.throw(_("Import file is empty."))
+    columns = _map_columns(header)
+
+    known_phones = _load_known_phones()
+    countries = set(frappe.get_all("Country", pluck="name"))
+    languages = set(frappe.get_all("Language", pluck="name"))
+    today = getdate()
+
+    summary = {"processed": 0, "inserted": 0, "rejected": 0, "chunks": 0, "rejects_file": None}
+    base_name = os.path.splitext(os.path.basename(path))[0]
+    rejects_name = f"{base_name}-rejects-{frappe.generate_hash(length=8)}.csv"
+    rejects_path = frappe.get_site_path("private", "files", rejects_name)
+    rejects_file = rejects_writer = None
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            records, rejects = validate_chunk(chunk, columns, known_phones, countries, languages, today)
+            if not dry_run:
+                insert_records(records, prefix)
+                frappe.db.commit()
+
+            if rejects:
+                if rejects_writer is None:
+                    rejects_file = open(rejects_path, "w", newline="", encoding="utf-8")
+                    rejects_writer = csv.writer(rejects_file)
+                    rejects_writer.writerow(["row", "errors", *header])
+                for index, errors in rejects:
+                    # +2: one for the header line, one because file rows are 1-based.
+                    row_number = summary["processed"] + index + 2
+                    rejects_writer.writerow([row_number, "; ".join(errors), *chunk[index]])
+
+            summary["chunks"] += 1
+            summary["processed"] += len(chunk)
+            summary["inserted"] += len(records)
+            summary["rejected"] += len(rejects)
+            frappe.publish_realtime(
+                "patient_import_progress",
+                dict(summary, chunk_inserted=len(records), chunk_rejected=len(rejects)),
+                user=frappe.session.user,
+            )
+    finally:
+        if rejects_file:
+            rejects_file.close()
+
+    if rejects_file:
+        attachment = {"attached_to_doctype": "File", "attached_to_name": file_name} if file_name else {}
+        summary["rejects_file"] = save_private_file(rejects_path, rejects_name, **attachment).file_url
+        frappe.db.commit()
+    return summary
+
+
+@frappe.whitelist(methods=["POST"])
+def start_patient_import(file_url, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """Queue an import of an uploaded CSV/XLSX File; progress arrives as realtime events."""
+    frappe.only_for("System Manager")
+    file = frappe.get_doc("File", {"file_url": file_url})
+    job = frappe.enqueue(
+        "healthx.patient_import.import_patients",
+        queue="long",
+        timeout=4 * 60 * 60,
+        job_id=f"healthx:patient_import:{file_url}",
+        deduplicate=True,
+        path=file.get_full_path(),
+        chunk_size=int(chunk_size),
+        dry_run=frappe.parse_json(dry_run),
+        file_name=file.name,
+    )
+    return {"job_id": job.id if job else None}
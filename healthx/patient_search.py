@@ -0,0 +1,174 @@
+"""Typeahead search over Patients by phone number or name.
+
+Every Patient carries two maintained keys (set in ``Patient.validate``):
+
+- ``phone_key``: the last ``PHONE_KEY_DIGITS`` digits of the phone number, so "+91 98765 43210"
+  and "9876543210" share a key and a typed number is an indexed prefix range.
+- ``search_key``: the lower-cased, accent-stripped name with punctuation folded to spaces.
+  It has a B-tree index for "starts with" matches and a FULLTEXT index for word-prefix
+  matches anywhere in the name.
+
+Nothing here uses ``LIKE '%x%'``; each lookup is a bounded index range, and the small
+candidate pool is ranked in Python.
+"""
+
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+import frappe
+
+PHONE_KEY_DIGITS = 10
+MIN_QUERY_LENGTH = 2
+MAX_RESULTS = 20
+# InnoDB ignores shorter words in FULLTEXT indexes (innodb_ft_min_token_size).
+FULLTEXT_MIN_TOKEN = 3
+FULLTEXT_INDEX = "search_key_fulltext"
+MIN_FUZZY_RATIO = 0.6
+RESULT_FIELDS = "name, full_name, phone_number, search_key"
+
+
+def get_phone_key(phone_number):
+    digits = re.sub(r"\D", "", phone_number or "")
+    return digits[-PHONE_KEY_DIGITS:] or None
+
+
+def get_search_key(full_name):
+    decomposed = unicodedata.normalize("NFKD", full_name or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^\w]+", " ", stripped.lower()).split()) or None
+
+
+def ensure_search_indexes():
+    """Add the FULLTEXT index on ``search_key`` (the B-tree indexes come from the DocType)."""
+    if frappe.db.sql("SHOW INDEX FROM `tabPatient` WHERE Key_name = %s", (FULLTEXT_INDEX,)):
+        return
+    frappe.db.sql_ddl(f"ALTER TABLE `tabPatient` ADD FULLTEXT INDEX `{FULLTEXT_INDEX}` (`search_key`)")
+
+
+def backfill_search_keys(chunk_size=1000):
+    """Compute keys for patients saved before the keys existed, one UPDATE per keyset chunk."""
+    last_name = ""
+    while True:
+        rows = frappe.db.sql(
+            """
+            SELECT name, full_name, phone_number FROM `tabPatient`
+            WHERE name > %s ORDER BY name LIMIT %s
+            """,
+            (last_name, chunk_size),
+            as_dict=True,
+        )
+        if not rows:
+            break
+
+        values = {}
+        phone_cases, search_cases = [], []
+        for index, row in enumerate(rows):
+            values[f"n{index}"] = row.name
+            values[f"p{index}"] = get_phone_key(row.phone_number)
+            values[f"s{index}"] = get_search_key(row.full_name)
+            phone_cases.append(f"WHEN %(n{index})s THEN %(p{index})s")
+            search_cases.append(f"WHEN %(n{index})s THEN %(s{index})s")
+        names = ", ".join(f"%(n{index})s" for index in range(len(rows)))
+        frappe.db.sql(
+            f"""
+            UPDATE `tabPatient`
+            SET phone_key = CASE name {" ".join(phone_cases)} END,
+                search_key = CASE name {" ".join(search_cases)} END
+            WHERE name IN ({names})
+            """,
+            values,
+        )
+        frappe.db.commit()
+        last_name = rows[-1].name
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _fulltext_terms(tokens, length=None):
+    terms = [token[:length] if length else token for token in tokens]
+    return " ".join(f"+{term}*" for term in terms if len(term) >= FULLTEXT_MIN_TOKEN)
+
+
+def _search_by_phone(digits, limit):
+    return frappe.db.sql(
+        f"""
+        SELECT {RESULT_FIELDS} FROM `tabPatient`
+        WHERE phone_key LIKE %s
+        ORDER BY phone_key LIMIT %s
+        """,
+        (_escape_like(digits[-PHONE_KEY_DIGITS:]) + "%", limit),
+        as_dict=True,
+    )
+
+
+def _search_by_name(key, pool):
+    candidates = {}
+    for row in frappe.db.sql(
+        f"""
+        SELECT {RESULT_FIELDS} FROM `tabPatient`
+        WHERE search_key LIKE %s
+        ORDER BY search_key LIMIT %s
+        """,
+        (_escape_like(key) + "%", pool),
+        as_dict=True,
+    ):
+        candidates[row.name] = row
+
+    tokens = key.split()
+    for terms in (_fulltext_terms(tokens), _fulltext_terms(tokens, FULLTEXT_MIN_TOKEN)):
+        if len(candidates) >= pool:
+            break
+        if not terms:
+            continue
+        # The second pass keeps only each word's first three letters, so a typo later
+        # in a word ("smiht") still reaches candidates ("smith") ranked by similarity below.
+        for row in frappe.db.sql(
+            f"""
+            SELECT {RESULT_FIELDS} FROM `tabPatient`
+            WHERE MATCH(search_key) AGAINST (%s IN BOOLEAN MODE)
+            LIMIT %s
+            """,
+            (terms, pool),
+            as_dict=True,
+        ):
+            candidates.setdefault(row.name, row)
+    return list(candidates.values())
+
+
+def rank_candidates(key, candidates, limit):
+    """Order name candidates: whole-name prefix, then all words matched, then closest spelling."""
+    tokens = key.split()
+    ranked = []
+    for row in candidates:
+        search_key = row.get("search_key") or ""
+        words = search_key.split()
+        all_words = all(any(word.startswith(token) for word in words) for token in tokens)
+        ratio = SequenceMatcher(None, key, search_key[: len(key) + 2]).ratio()
+        if not all_words and ratio < MIN_FUZZY_RATIO:
+            continue
+        ranked.append(((not search_key.startswith(key), not all_words, -ratio, search_key), row))
+    ranked.sort(key=lambda item: item[0])
+    return [row for _rank, row in ranked[:limit]]
+
+
+@frappe.whitelist()
+def search_patients(query, limit=10):
+    """Return the top ``limit`` patients matching a phone number or (partial, misspelt) name."""
+    frappe.has_permission("Patient", "read", throw=True)
+    query = (query or "").strip()
+    limit = max(1, min(int(limit or 10), MAX_RESULTS))
+    if len(query) < MIN_QUERY_LENGTH:
+        return []
+
+    if re.fullmatch(r"[\d\s()+-]+", query):
+        rows = _search_by_phone(re.sub(r"\D", "", query), limit)
+    else:
+        key = get_search_key(query)
+        if not key:
+            return []
+        rows = rank_candidates(key, _search_by_name(key, min(limit * 5, 100)), limit)
+
+    return [{"name": row.name, "full_name": row.full_name, "phone_number": row.phone_number} for row in rows]
@@ -0,0 +1,354 @@
+"""Retention for high-volume tables: monthly archives, partition maintenance and federated reads.
+
+Retention is off until a retention period is set in Healthx Settings. Expired months are then
+streamed to gzip'd NDJSON under ``private/archive/<doctype>/`` and removed from the database,
+either by dropping the month's partition (Vitals Reading, when partitioned) or by chunked
+deletes. A Vitals Reading month is only removed once Vitals Rollup covers it, so trend charts
+keep their history. ``get_history`` reads the hot table and the archive as one source.
+"""
+
+import gzip
+import heapq
+import json
+import os
+from datetime import date, timedelta
+from itertools import islice
+
+import frappe
+from frappe import _
+from frappe.utils import add_months, add_to_date, get_datetime, getdate, now_datetime, nowdate
+
+from healthx.healthx.doctype.vitals_rollup.vitals_rollup import rebuild_rollups
+from healthx.utils import check_vitals_access
+
+ARCHIVE_CHUNK = 5000
+DELETE_CHUNK = 5000
+MAX_HISTORY_ROWS = 50000
+FUTURE_PARTITIONS = 3
+RETENTION_TARGETS = {
+    "Vitals Reading": {
+        "timestamp_field": "timestamp",
+        "retention_field": "vitals_retention_days",
+        "condition": "",
+        "partitionable": True,
+        "requires_rollups": True,
+    },
+    "Alert Log": {
+        "timestamp_field": "timestamp_deails",
+        "retention_field": "alert_log_retention_days",
+        # Open alerts stay in the table however old they are.
+        "condition": " AND status = 'Resolved'",
+        "partitionable": False,
+        "requires_rollups": False,
+    },
+}
+
+
+def _month_start(value) -> date:
+    return getdate(value).replace(day=1)
+
+
+def _partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+
+def _archive_dir(doctype: str) -> str:
+    path = frappe.get_site_path("private", "archive", frappe.scrub(doctype))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _archive_files(doctype: str, month: date):
+    directory = _archive_dir(doctype)
+    prefix = f"{month:%Y-%m}."
+    return sorted(
+        os.path.join(directory, filename)
+        for filename in os.listdir(directory)
+        if filename.startswith(prefix) and filename.endswith(".ndjson.gz")
+    )
+
+
+def is_partitioned(doctype: str) -> bool:
+    return bool(
+        frappe.db.sql(
+            """
+            SELECT 1 FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+            LIMIT 1
+            """,
+            (f"tab{doctype}",),
+        )
+    )
+
+
+def _has_partition(doctype: str, partition: str) -> bool:
+    return bool(
+        frappe.db.sql(
+            """
+            SELECT 1 FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME = %s
+            """,
+            (f"tab{doctype}", partition),
+        )
+    )
+
+
+def _partition_clause(month: date) -> str:
+    return f"PARTITION {_partition_name(month)} VALUES LESS THAN (TO_DAYS('{add_months(month, 1)}'))"
+
+
+def enable_monthly_partitions(doctype="Vitals Reading"):
+    """Convert a table to RANGE partitions by month on its timestamp (long background job).
+
+    MariaDB requires the partition column in every unique key, so the primary key becomes
+    ``(name, <timestamp>)`` and the timestamp is made NOT NULL (back-filled from ``creation``).
+    """
+    target = RETENTION_TARGETS[doctype]
+    if not target["partitionable"] or is_partitioned(doctype):
+        return
+
+    table, field = f"tab{doctype}", target["timestamp_field"]
+    frappe.db.sql(f"UPDATE `{table}` SET `{field}` = creation WHERE `{field}` IS NULL")
+    frappe.db.commit()
+
+    oldest = frappe.db.sql(f"SELECT MIN(`{field}`) FROM `{table}`")[0][0]
+    first_month = _month_start(oldest or nowdate())
+    last_month = add_months(_month_start(nowdate()), FUTURE_PARTITIONS)
+
+    partitions, month = [], first_month
+    while month <= last_month:
+        partitions.append(_partition_clause(month))
+        month = add_months(month, 1)
+    partitions.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+
+    frappe.db.sql_ddl(
+        f"ALTER TABLE `{table}` MODIFY `{field}` DATETIME(6) NOT NULL, "
+        f"DROP PRIMARY KEY, ADD PRIMARY KEY (`name`, `{field}`)"
+    )
+    frappe.db.sql_ddl(
+        f"ALTER TABLE `{table}` PARTITION BY RANGE (TO_DAYS(`{field}`)) ({', '.join(partitions)})"
+    )
+
+
+def _ensure_future_partitions(doctype: str):
+    table = f"tab{doctype}"
+    existing = set(
+        frappe.db.sql_list(
+            """
+            SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            """,
+            (table,),
+        )
+    )
+    month = _month_start(nowdate())
+    for _offset in range(FUTURE_PARTITIONS + 1):
+        if _partition_name(month) not in existing:
+            frappe.db.sql_ddl(
+                f"ALTER TABLE `{table}` REORGANIZE PARTITION p_future INTO "
+                f"({_partition_clause(month)}, PARTITION p_future VALUES LESS THAN MAXVALUE)"
+            )
+        month = add_months(month, 1)
+
+
+def archive_month(doctype: str, month: date, run_started) -> int:
+    """Archive and remove one month of expired rows; returns the number of rows archived.
+
+    Only rows created before ``run_started`` are touched, so readings that arrive for an
+    already-archived month during or after the run land in a later archive file instead of
+    being deleted unarchived.
+    """
+    target = RETENTION_TARGETS[doctype]
+    table, field = f"tab{doctype}", target["timestamp_field"]
+    condition = f"`{field}` >= %(start)s AND `{field}` < %(end)s AND creation <= %(run_started)s" + target["condition"]
+    params = {"start": month, "end": add_months(month, 1), "run_started": run_started}
+
+    final_path = os.path.join(_archive_dir(doctype), f"{month:%Y-%m}.{run_started:%Y%m%d%H%M%S}.ndjson.gz")
+    temp_path = final_path + ".tmp"
+    archived, last_name = 0, ""
+    with gzip.open(temp_path, "wt", encoding="utf-8") as archive:
+        while True:
+            rows = frappe.db.sql(
+                f"SELECT * FROM `{table}` WHERE {condition} AND name > %(last_name)s ORDER BY name LIMIT {ARCHIVE_CHUNK}",
+                dict(params, last_name=last_name),
+                as_dict=True,
+            )
+            if not rows:
+                break
+            for row in rows:
+                archive.write(json.dumps(row, default=str) + "\n")
+            archived += len(rows)
+            last_name = rows[-1].name
+
+    if not archived:
+        os.remove(temp_path)
+        return 0
+    os.replace(temp_path, final_path)
+
+    late_rows = frappe.db.sql(
+        f"SELECT COUNT(*) FROM `{table}` WHERE `{field}` >= %(start)s AND `{field}` < %(end)s"
+        " AND creation > %(run_started)s",
+        params,
+    )[0][0]
+    if target["partitionable"] and not late_rows and _has_partition(doctype, _partition_name(month)):
+        frappe.db.sql_ddl(f"ALTER TABLE `{table}` DROP PARTITION {_partition_name(month)}")
+    else:
+        while True:
+            frappe.db.sql(f"DELETE FROM `{table}` WHERE {condition} LIMIT {DELETE_CHUNK}", params)
+            frappe.db.commit()
+            if not frappe.db.sql(f"SELECT 1 FROM `{table}` WHERE {condition} LIMIT 1", params):
+                break
+
+    frappe.db.commit()
+    return archived
+
+
+def ensure_rollups(month: date) -> bool:
+    """Make sure Vitals Rollup covers every raw reading of ``month``; False when it cannot.
+
+    A month with no archive yet still has all its readings in the table, so its rollups can be
+    rebuilt from them. Once part of a month is archived a rebuild would lose that part, so an
+    uncovered month is left alone instead.
+    """
+    params = {"start": month, "end": add_months(month, 1)}
+    raw = frappe.db.sql(
+        "SELECT COUNT(*) FROM `tabVitals Reading` WHERE `timestamp` >= %(start)s AND `timestamp` < %(end)s",
+        params,
+    )[0][0]
+    rolled_up = frappe.db.sql(
+        """
+        SELECT COALESCE(SUM(reading_count), 0) FROM `tabVitals Rollup`
+        WHERE bucket = 'Day' AND bucket_start >= %(start)s AND bucket_start < %(end)s
+        """,
+        params,
+    )[0][0]
+    if rolled_up >= raw:
+        return True
+    if _archive_files("Vitals Reading", month):
+        return False
+    rebuild_rollups(month, add_months(month, 1) - timedelta(days=1))
+    frappe.db.commit()
+    return True
+
+
+def apply_retention(doctype: str, retention_days: int, run_started) -> int:
+    target = RETENTION_TARGETS[doctype]
+    table, field = f"tab{doctype}", target["timestamp_field"]
+    cutoff = getdate(add_to_date(run_started, days=-retention_days))
+
+    oldest = frappe.db.sql(
+        f"SELECT MIN(`{field}`) FROM `{table}` WHERE `{field}` IS NOT NULL" + target["condition"]
+    )[0][0]
+    if not oldest:
+        return 0
+
+    # Whole months only, so a month is never split between the table and the archive.
+    archived, month = 0, _month_start(oldest)
+    while add_months(month, 1) <= cutoff:
+        if target["requires_rollups"] and not ensure_rollups(month):
+            frappe.throw(
+                _("Vitals Rollup does not cover {0}; rebuild its rollups before it can be archived.").format(
+                    f"{month:%Y-%m}"
+                )
+            )
+        archived += archive_month(doctype, month, run_started)
+        month = add_months(month, 1)
+    return archived
+
+
+def run_retention():
+    """Daily scheduler job: keep partitions ahead of time and archive expired months."""
+    settings = frappe.get_cached_doc("Healthx Settings")
+    run_started = now_datetime()
+
+    if settings.partition_vitals_reading and is_partitioned("Vitals Reading"):
+        _ensure_future_partitions("Vitals Reading")
+
+    for doctype, target in RETENTION_TARGETS.items():
+        retention_days = settings.get(target["retention_field"])
+        if not retention_days:
+            continue
+        try:
+            apply_retention(doctype, int(retention_days), run_started)
+        except Exception:
+            frappe.db.rollback()
+            frappe.log_error(title=f"healthx.retention.{frappe.scrub(doctype)}")
+
+    frappe.db.set_single_value("Healthx Settings", "last_retention_run", run_started)
+    frappe.db.commit()
+
+
+def _iter_archive(doctype: str, start, end, filters: dict):
+    """Yield archived rows in the window, streaming each file line by line.
+
+    Rows are written with ``json.dumps`` defaults, so a line that lacks ``"patient": "<value>"``
+    cannot match and is skipped without being decoded.
+    """
+    field = RETENTION_TARGETS[doctype]["timestamp_field"]
+    needles = [f'"{key}": {json.dumps(value)}' for key, value in filters.items()]
+    month = _month_start(start)
+    while month <= getdate(end):
+        for path in _archive_files(doctype, month):
+            with gzip.open(path, "rt", encoding="utf-8") as archive:
+                for line in archive:
+                    if not all(needle in line for needle in needles):
+                        continue
+                    row = json.loads(line)
+                    if any(row.get(key) != value for key, value in filters.items()):
+                        continue
+                    if row.get(field) and start <= get_datetime(row[field]) <= end:
+                        yield row
+        month = add_months(month, 1)
+
+
+def _read_archive(doctype: str, start, end, filters: dict, limit: int):
+    """Return the earliest ``limit`` archived rows by time and how many rows matched in total.
+
+    Archive files are ordered by name, not time, so a bounded heap keeps memory at ``limit``
+    rows however large the window is.
+    """
+    field = RETENTION_TARGETS[doctype]["timestamp_field"]
+    heap, matched = [], 0
+    for row in _iter_archive(doctype, start, end, filters):
+        # Max-heap on time via negated ordinals; ``matched`` breaks ties so rows are never compared.
+        entry = (-get_datetime(row[field]).timestamp(), -matched, row)
+        matched += 1
+        if len(heap) < limit:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    rows = [row for _time, _order, row in sorted(heap, reverse=True)]
+    return rows, matched
+
+
+@frappe.whitelist()
+def get_history(doctype, patient=None, device=None, from_datetime=None, to_datetime=None, limit=10000):
+    """Return rows for an audit window from the live table and the archive, merged by time."""
+    if doctype not in RETENTION_TARGETS:
+        frappe.throw(_("History is not archived for {0}.").format(doctype))
+    frappe.has_permission(doctype, "read", throw=True)
+    if not (patient or device):
+        frappe.throw(_("Patient or Device is required."))
+    check_vitals_access(patient, device)
+
+    field = RETENTION_TARGETS[doctype]["timestamp_field"]
+    end = get_datetime(to_datetime) if to_datetime else now_datetime()
+    start = get_datetime(from_datetime) if from_datetime else add_to_date(end, days=-1)
+    limit = max(1, min(int(limit or 10000), MAX_HISTORY_ROWS))
+    filters = {key: value for key, value in (("patient", patient), ("device", device)) if value}
+
+    conditions = " AND ".join(f"`{key}` = %({key})s" for key in filters)
+    hot_rows = frappe.db.sql(
+        f"""
+        SELECT * FROM `tab{doctype}`
+        WHERE {conditions} AND `{field}` BETWEEN %(start)s AND %(end)s
+        ORDER BY `{field}` LIMIT {limit}
+        """,
+        dict(filters, start=start, end=end),
+        as_dict=True,
+    )
+    archived_rows, archived = _read_archive(doctype, start, end, filters, limit)
+
+    merged = heapq.merge(archived_rows, hot_rows, key=lambda row: get_datetime(row[field]))
+    rows = list(islice(merged, limit))
+    return {"rows": rows, "archived": archived, "truncated": archived + len(hot_rows) > limit}
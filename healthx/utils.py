@@ -0,0 +1,57 @@
+import hashlib
+import os
+
+import frappe
+
+
+def check_vitals_access(patient=None, device=None):
+    """Throw unless the user can read the given patient and device (and the device's patient)."""
+    if device:
+        frappe.has_permission("Device", "read", doc=device, throw=True)
+        patient_of_device = frappe.db.get_value("Device", device, "patient")
+        if patient_of_device and patient_of_device != patient:
+            frappe.has_permission("Patient", "read", doc=patient_of_device, throw=True)
+    if patient:
+        frappe.has_permission("Patient", "read", doc=patient, throw=True)
+
+
+def reserve_names(prefix, count, digits=5):
+    """Reserve ``count`` consecutive naming-series names (``PREFIX00001``) with one Series update.
+
+    Used by bulk writers that insert rows without going through ``Document.insert``.
+    """
+    frappe.db.sql(
+        """
+        INSERT INTO `tabSeries` (name, current) VALUES (%(prefix)s, LAST_INSERT_ID(%(count)s))
+        ON DUPLICATE KEY UPDATE current = LAST_INSERT_ID(current + %(count)s)
+        """,
+        {"prefix": prefix, "count": count},
+    )
+    last = frappe.db.sql("SELECT LAST_INSERT_ID()")[0][0]
+    return [f"{prefix}{number:0{digits}d}" for number in range(last - count + 1, last + 1)]
+
+
+def _file_hash(path):
+    digest = hashlib.md5()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_private_file(path, filename, **fields):
+    """Register a file already written under ``private/files`` as a private File and return it."""
+    file = frappe.get_doc(
+        {
+            "doctype": "File",
+            "file_name": filename,
+            "file_url": f"/private/files/{filename}",
+            "is_private": 1,
+            "file_size": os.path.getsize(path),
+            # Set up front so File does not read the whole file into memory to hash it.
+            "content_hash": _file_hash(path),
+            **fields,
+        }
+    )
+    file.insert(ignore_permissions=True)
+    return file
@@ -93,33 +93,88 @@
     return data;
   }
 
+  const ETAG_STORAGE_KEY = 'healthx:etag-cache';
+
+  function readEtagCache() {
+    try {
+      return JSON.parse(sessionStorage.getItem(ETAG_STORAGE_KEY)) || {};
+    } catch (_) {
+      return {};
+    }
+  }
+
+  function writeEtagCache(cache) {
+    try {
+      sessionStorage.setItem(ETAG_STORAGE_KEY, JSON.stringify(cache));
+    } catch (_) {
+      // Storage full or unavailable; conditional requests are an optimisation only.
+    }
+  }
+
   async function fetchDocs(
     doctype,
     { fields = ['name'], filters, limit = 20, order_by = 'modified desc', start = 0 } = {}
   ) {
+    const body = JSON.stringify({
+      doctype,
+      fields,
+      filters,
+      order_by,
+      limit,
+      start
+    });
+    const etagCache = readEtagCache();
+    const cached = etagCache[body];
+    const headers = {
+      'Content-Type': 'application/json',
+      Accept: 'application/json'
+    };
+    if (cached) {
+      headers['If-None-Match'] = cached.etag;
+    }
+
     const response = await fetch('/api/method/healthx.api.fetch_docs_sql', {
+      method: 'POST',
+      headers,
+      credentials: 'include',
+      body
+    });
+
+    if (response.status === 304 && cached) {
+      return cached.rows;
+    }
+
+    const data = await safeJson(response);
+    if (!response.ok) {
+      throw new Error(parseFrappeError(data) || 'Failed to load records');
+    }
+
+    const rows = data?.message || [];
+    const etag = response.headers.get('ETag');
+    if (etag) {
+      etagCache[body] = { etag, rows };
+      writeEtagCache(etagCache);
+    }
+    return rows;
+  }
+
+  async function fetchAggregates(specs) {
+    const response = await fetch('/api/method/healthx.api.fetch_aggregates_sql', {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
         Accept: 'application/json'
       },
       credentials: 'include',
-      body: JSON.stringify({
-        doctype,
-        fields,
-        filters,
-        order_by,
-        limit,
-        start
-      })
+      body: JSON.stringify({ specs })
     });
 
     const data = await safeJson(response);
     if (!response.ok) {
-      throw new Error(parseFrappeError(data) || 'Failed to load records');
+      throw new Error(parseFrappeError(data) || 'Failed to load totals');
     }
 
-    return data?.message || [];
+    return data?.message || {};
   }
 
   async function createDoc(doctype, payload) {
@@ -202,6 +257,68 @@
     }
   }
 
+  async function searchPatients(query, limit = 10) {
+    const response = await fetch('/api/method/healthx.patient_search.search_patients', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Accept: 'application/json'
+      },
+      credentials: 'include',
+      body: JSON.stringify({ query, limit })
+    });
+
+    const data = await safeJson(response);
+    if (!response.ok) {
+      throw new Error(parseFrappeError(data) || 'Failed to search patients');
+    }
+
+    return data?.message || [];
+  }
+
+  function attachPatientSearch(select, { limit = 10, delay = 200 } = {}) {
+    if (!select || select.dataset.patientSearch) return;
+    select.dataset.patientSearch = '1';
+    select.innerHTML = '<option value="">Type a name or phone number</option>';
+
+    const input = document.createElement('input');
+    input.type = 'search';
+    input.placeholder = 'Search patient by name or phone';
+    input.autocomplete = 'off';
+    select.parentNode.insertBefore(input, select);
+
+    let timer;
+    let latest = 0;
+    input.addEventListener('input', () => {
+      clearTimeout(timer);
+      timer = setTimeout(async () => {
+        const query = input.value.trim();
+        const request = ++latest;
+        if (query.length < 2) {
+          select.innerHTML = '<option value="">Type a name or phone number</option>';
+          return;
+        }
+        try {
+          const rows = await searchPatients(query, limit);
+          // Ignore responses that arrive after a newer keystroke's request.
+          if (request !== latest) return;
+          select.innerHTML = rows.length
+            ? '<option value="">Select</option>'
+            : '<option value="">No matching patients</option>';
+          rows.forEach((row) => {
+            const option = document.createElement('option');
+            option.value = row.name;
+            option.textContent = row.phone_number ? `${row.full_name} (${row.phone_number})` : row.full_name;
+            select.appendChild(option);
+          });
+          if (rows.length === 1) select.value = rows[0].name;
+        } catch (error) {
+          console.error('Patient search failed', error);
+        }
+      }, delay);
+    });
+  }
+
   function showToast(message, variant = 'success') {
     const toast = document.createElement('div');
     toast.className = 'toast';
@@ -435,6 +552,7 @@
 
   window.HealthxWeb = {
     fetchDocs,
+    fetchAggregates,
     createDoc,
     getDoc,
     updateDoc,
@@ -442,6 +560,8 @@
     renderTable,
     showToast,
     populateOptions,
+    searchPatients,
+    attachPatientSearch,
     login,
     logout,
     checkAuth,
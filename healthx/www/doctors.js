@@ -24,19 +24,19 @@
   // Load dashboard stats
   async function loadDashboardStats() {
     try {
-      const [appointments, prescriptions, consultations, tokens, reviews] = await Promise.all([
-        HealthxWeb.fetchDocs('Doctor Appointment', { fields: ['name'], limit: 1000 }),
-        HealthxWeb.fetchDocs('E Prescription Item', { fields: ['name'], limit: 1000 }),
-        HealthxWeb.fetchDocs('Online Consultation', { fields: ['name'], limit: 1000 }),
-        HealthxWeb.fetchDocs('Queue Token', { fields: ['name'], limit: 1000 }),
-        HealthxWeb.fetchDocs('Doctor Review', { fields: ['name'], limit: 1000 })
+      const counts = await HealthxWeb.fetchAggregates([
+        { key: 'appointments', doctype: 'Doctor Appointment' },
+        { key: 'prescriptions', doctype: 'E Prescription Item' },
+        { key: 'consultations', doctype: 'Online Consultation' },
+        { key: 'tokens', doctype: 'Queue Token' },
+        { key: 'reviews', doctype: 'Doctor Review' }
       ]);
 
-      document.getElementById('appointments-count').textContent = appointments.length;
-      document.getElementById('prescriptions-count').textContent = prescriptions.length;
-      document.getElementById('consultations-count').textContent = consultations.length;
-      document.getElementById('tokens-count').textContent = tokens.length;
-      document.getElementById('reviews-count').textContent = reviews.length;
+      document.getElementById('appointments-count').textContent = counts.appointments ?? 0;
+      document.getElementById('prescriptions-count').textContent = counts.prescriptions ?? 0;
+      document.getElementById('consultations-count').textContent = counts.consultations ?? 0;
+      document.getElementById('tokens-count').textContent = counts.tokens ?? 0;
+      document.getElementById('reviews-count').textContent = counts.reviews ?? 0;
     } catch (error) {
       console.error('Failed to load dashboard stats:', error);
     }
@@ -112,10 +112,10 @@
   async function populateDropdowns() {
     await Promise.all([
       HealthxWeb.populateOptions(document.getElementById('doctor-specialization'), 'Speciality', { labelField: 'speciality' }),
-      HealthxWeb.populateOptions(document.getElementById('appointment-patient'), 'Patient', { labelField: 'full_name', limit: 200 }),
-      HealthxWeb.populateOptions(document.getElementById('prescription-patient'), 'Patient', { labelField: 'full_name', limit: 200 }),
-      HealthxWeb.populateOptions(document.getElementById('visit-patient'), 'Patient', { labelField: 'full_name', limit: 200 }),
-      HealthxWeb.populateOptions(document.getElementById('vitals-patient'), 'Patient', { labelField: 'full_name', limit: 200 }),
+      HealthxWeb.attachPatientSearch(document.getElementById('appointment-patient')),
+      HealthxWeb.attachPatientSearch(document.getElementById('prescription-patient')),
+      HealthxWeb.attachPatientSearch(document.getElementById('visit-patient')),
+      HealthxWeb.attachPatientSearch(document.getElementById('vitals-patient')),
       HealthxWeb.populateOptions(document.getElementById('prescription-drug'), 'Drug', { labelField: 'drug_name', limit: 200 }),
       HealthxWeb.populateOptions(document.getElementById('vitals-device'), 'Device', { labelField: 'device_name', limit: 200 })
     ]);
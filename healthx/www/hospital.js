@@ -23,25 +23,25 @@
   // Load dashboard stats
   async function loadDashboardStats() {
     try {
-      const [doctors, patients, appointments, visits, orders, invoices, drugs, devices] = await Promise.all([
-        HealthxWeb.fetchDocs('Doctor', { fields: ['name'], limit: 1000 }),
-        HealthxWeb.fetchDocs('Patient', { fields: ['name'], limit: 1000 }),
-        HealthxWeb.fetchDocs('Doctor Appointment', { fields: ['name'], limit: 1000 }),
-        HealthxWeb.fetchDocs('Clinic Visit', { fields: ['name'], limit: 1000 }),
-        HealthxWeb.fetchDocs('Medicine Order', { fields: ['name'], limit: 1000 }),
-        HealthxWeb.fetchDocs('Invoice', { fields: ['name'], limit: 1000 }),
-        HealthxWeb.fetchDocs('Drug', { fields: ['name'], limit: 1000 }),
-        HealthxWeb.fetchDocs('Device', { fields: ['name'], limit: 1000 })
+      const counts = await HealthxWeb.fetchAggregates([
+        { key: 'doctors', doctype: 'Doctor' },
+        { key: 'patients', doctype: 'Patient' },
+        { key: 'appointments', doctype: 'Doctor Appointment' },
+        { key: 'visits', doctype: 'Clinic Visit' },
+        { key: 'orders', doctype: 'Medicine Order' },
+        { key: 'invoices', doctype: 'Invoice' },
+        { key: 'drugs', doctype: 'Drug' },
+        { key: 'devices', doctype: 'Device' }
       ]);
 
-      document.getElementById('doctors-count').textContent = doctors.length;
-      document.getElementById('patients-count').textContent = patients.length;
-      document.getElementById('appointments-count').textContent = appointments.length;
-      document.getElementById('visits-count').textContent = visits.length;
-      document.getElementById('orders-count').textContent = orders.length;
-      document.getElementById('invoices-count').textContent = invoices.length;
-      document.getElementById('drugs-count').textContent = drugs.length;
-      document.getElementById('devices-count').textContent = devices.length;
+      document.getElementById('doctors-count').textContent = counts.doctors ?? 0;
+      document.getElementById('patients-count').textContent = counts.patients ?? 0;
+      document.getElementById('appointments-count').textContent = counts.appointments ?? 0;
+      document.getElementById('visits-count').textContent = counts.visits ?? 0;
+      document.getElementById('orders-count').textContent = counts.orders ?? 0;
+      document.getElementById('invoices-count').textContent = counts.invoices ?? 0;
+      document.getElementById('drugs-count').textContent = counts.drugs ?? 0;
+      document.getElementById('devices-count').textContent = counts.devices ?? 0;
     } catch (error) {
       console.error('Failed to load dashboard stats:', error);
     }
@@ -51,11 +51,11 @@
   async function populateDropdowns() {
     await Promise.all([
       HealthxWeb.populateOptions(document.getElementById('doctor-specialization'), 'Speciality', { labelField: 'speciality' }),
-      HealthxWeb.populateOptions(document.getElementById('appointment-patient'), 'Patient', { labelField: 'full_name', limit: 200 }),
+      HealthxWeb.attachPatientSearch(document.getElementById('appointment-patient')),
       HealthxWeb.populateOptions(document.getElementById('appointment-doctor'), 'Doctor', { labelField: 'full_name', limit: 200 }),
-      HealthxWeb.populateOptions(document.getElementById('visit-patient'), 'Patient', { labelField: 'full_name', limit: 200 }),
+      HealthxWeb.attachPatientSearch(document.getElementById('visit-patient')),
       HealthxWeb.populateOptions(document.getElementById('visit-doctor'), 'Doctor', { labelField: 'full_name', limit: 200 }),
-      HealthxWeb.populateOptions(document.getElementById('invoice-patient'), 'Patient', { labelField: 'full_name', limit: 200 }),
+      HealthxWeb.attachPatientSearch(document.getElementById('invoice-patient')),
       HealthxWeb.populateOptions(document.getElementById('device-type'), 'Device Type', { labelField: 'device_type_name', limit: 200 })
     ]);
   }
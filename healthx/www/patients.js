@@ -24,19 +24,19 @@
   // Load dashboard stats
   async function loadDashboardStats() {
     try {
-      const [appointments, prescriptions, orders, services, invoices] = await Promise.all([
-        HealthxWeb.fetchDocs('Doctor Appointment', { fields: ['name'], limit: 1000 }),
-        HealthxWeb.fetchDocs('E Prescription Item', { fields: ['name'], limit: 1000 }),
-        HealthxWeb.fetchDocs('Medicine Order', { fields: ['name'], limit: 1000 }),
-        HealthxWeb.fetchDocs('Home Service', { fields: ['name'], limit: 1000 }),
-        HealthxWeb.fetchDocs('Invoice', { fields: ['name'], limit: 1000 })
+      const counts = await HealthxWeb.fetchAggregates([
+        { key: 'appointments', doctype: 'Doctor Appointment' },
+        { key: 'prescriptions', doctype: 'E Prescription Item' },
+        { key: 'orders', doctype: 'Medicine Order' },
+        { key: 'services', doctype: 'Home Service' },
+        { key: 'invoices', doctype: 'Invoice' }
       ]);
 
-      document.getElementById('appointments-count').textContent = appointments.length;
-      document.getElementById('prescriptions-count').textContent = prescriptions.length;
-      document.getElementById('orders-count').textContent = orders.length;
-      document.getElementById('services-count').textContent = services.length;
-      document.getElementById('invoices-count').textContent = invoices.length;
+      document.getElementById('appointments-count').textContent = counts.appointments ?? 0;
+      document.getElementById('prescriptions-count').textContent = counts.prescriptions ?? 0;
+      document.getElementById('orders-count').textContent = counts.orders ?? 0;
+      document.getElementById('services-count').textContent = counts.services ?? 0;
+      document.getElementById('invoices-count').textContent = counts.invoices ?? 0;
     } catch (error) {
       console.error('Failed to load dashboard stats:', error);
     }